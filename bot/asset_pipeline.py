@@ -0,0 +1,342 @@
+# bot/asset_pipeline.py (hashed CSS/JS bundles, HTML minification and precompression for the static shop)
+import glob
+import gzip
+import hashlib
+import os
+import re
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+ASSET_DIR = "assets"
+# Served with these headers by hosting (see shop/firebase.json); names change whenever content does
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Content codings we can produce, best first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz")) if BROTLI_AVAILABLE else (("gzip", ".gz"),)
+# Siblings written next to every page and bundle. Off by default: Firebase Hosting
+# never uploads them (shop/firebase.json) and compresses responses itself, so
+# only builds for a server that sends them (static_server) should pay for them.
+PRECOMPRESSED = ENCODINGS if os.getenv("PRECOMPRESS", "0") == "1" else ()
+# Part of every page digest, so changing the output stage rebuilds pages that predate it
+OUTPUT_VERSION = "min1+" + "+".join(encoding for encoding, _ in PRECOMPRESSED)
+
+# Tailwind's default palette, for the colours the shop uses
+COLORS = {
+    "amber": {50: "#fffbeb", 100: "#fef3c7", 200: "#fde68a", 300: "#fcd34d", 400: "#fbbf24",
+              500: "#f59e0b", 600: "#d97706", 700: "#b45309", 800: "#92400e", 900: "#78350f"},
+    "green": {50: "#f0fdf4", 100: "#dcfce7", 200: "#bbf7d0", 300: "#86efac", 400: "#4ade80",
+              500: "#22c55e", 600: "#16a34a", 700: "#15803d", 800: "#166534", 900: "#14532d"},
+    "gray": {50: "#f9fafb", 100: "#f3f4f6", 200: "#e5e7eb", 300: "#d1d5db", 400: "#9ca3af",
+             500: "#6b7280", 600: "#4b5563", 700: "#374151", 800: "#1f2937", 900: "#111827"},
+    "red": {50: "#fef2f2", 100: "#fee2e2", 200: "#fecaca", 300: "#fca5a5", 400: "#f87171",
+            500: "#ef4444", 600: "#dc2626", 700: "#b91c1c", 800: "#991b1b", 900: "#7f1d1d"},
+    "blue": {50: "#eff6ff", 100: "#dbeafe", 200: "#bfdbfe", 300: "#93c5fd", 400: "#60a5fa",
+             500: "#3b82f6", 600: "#2563eb", 700: "#1d4ed8", 800: "#1e40af", 900: "#1e3a8a"},
+}
+NAMED_COLORS = {"white": "#fff", "black": "#000", "transparent": "transparent"}
+
+FONT_SIZES = {
+    "xs": ("0.75rem", "1rem"), "sm": ("0.875rem", "1.25rem"), "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"), "xl": ("1.25rem", "1.75rem"), "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"), "4xl": ("2.25rem", "2.5rem"), "5xl": ("3rem", "1"),
+}
+FONT_WEIGHTS = {"light": 300, "normal": 400, "medium": 500, "semibold": 600, "bold": 700}
+MAX_WIDTHS = {"xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem", "2xl": "42rem",
+              "3xl": "48rem", "4xl": "56rem", "5xl": "64rem", "6xl": "72rem", "7xl": "80rem"}
+RADII = {"": "0.25rem", "sm": "0.125rem", "md": "0.375rem", "lg": "0.5rem", "xl": "0.75rem",
+         "2xl": "1rem", "3xl": "1.5rem", "full": "9999px"}
+SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0 / 0.05)",
+    "": "0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)",
+    "xl": "0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)",
+}
+BREAKPOINTS = {"sm": 640, "md": 768, "lg": 1024, "xl": 1280, "2xl": 1536}
+PSEUDO_VARIANTS = {"hover": ":hover", "focus": ":focus"}
+
+STATIC_UTILITIES = {
+    "block": "display:block", "inline-block": "display:inline-block", "flex": "display:flex",
+    "inline-flex": "display:inline-flex", "grid": "display:grid", "hidden": "display:none",
+    "flex-1": "flex:1 1 0%", "flex-wrap": "flex-wrap:wrap",
+    "items-center": "align-items:center", "items-start": "align-items:flex-start",
+    "justify-between": "justify-content:space-between", "justify-center": "justify-content:center",
+    "absolute": "position:absolute", "relative": "position:relative",
+    "overflow-hidden": "overflow:hidden", "object-cover": "object-fit:cover",
+    "text-center": "text-align:center", "leading-relaxed": "line-height:1.625",
+    "line-through": "text-decoration-line:line-through", "underline": "text-decoration-line:underline",
+    "w-full": "width:100%", "h-full": "height:100%", "min-h-screen": "min-height:100vh",
+    "mx-auto": "margin-left:auto;margin-right:auto",
+    "border": "border-width:1px",
+    "outline-none": "outline:2px solid transparent;outline-offset:2px",
+    "transition-colors": "transition-property:color,background-color,border-color,text-decoration-color,fill,stroke;"
+                         "transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms",
+    "ring-2": "box-shadow:0 0 0 2px var(--ring-color,rgb(59 130 246 / 0.5))",
+}
+
+SPACING_PROPS = {
+    "p": ("padding",), "px": ("padding-left", "padding-right"), "py": ("padding-top", "padding-bottom"),
+    "pt": ("padding-top",), "pb": ("padding-bottom",), "pl": ("padding-left",), "pr": ("padding-right",),
+    "m": ("margin",), "mx": ("margin-left", "margin-right"), "my": ("margin-top", "margin-bottom"),
+    "mt": ("margin-top",), "mb": ("margin-bottom",), "ml": ("margin-left",), "mr": ("margin-right",),
+    "w": ("width",), "h": ("height",), "gap": ("gap",), "top": ("top",), "right": ("right",),
+    "bottom": ("bottom",), "left": ("left",),
+}
+
+# Compact Tailwind preflight: the parts the templates rely on
+PREFLIGHT = """
+*,::before,::after{box-sizing:border-box;border:0 solid #e5e7eb}
+html{line-height:1.5;-webkit-text-size-adjust:100%;tab-size:4;font-family:ui-sans-serif,system-ui,sans-serif}
+body{margin:0;line-height:inherit}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+h1,h2,h3,h4,h5,h6,p,figure,blockquote{margin:0}
+a{color:inherit;text-decoration:inherit}
+button,input{font-family:inherit;font-size:100%;line-height:inherit;color:inherit;margin:0;padding:0}
+button{background-color:transparent;background-image:none;cursor:pointer}
+img,video{display:block;max-width:100%;height:auto}
+[hidden]{display:none}
+"""
+
+_SPACING = re.compile(r"^(" + "|".join(sorted(SPACING_PROPS, key=len, reverse=True)) + r")-(\d+(?:\.5)?|px)$")
+_COLOR = re.compile(r"^(text|bg|border|ring)-([a-z]+)(?:-(\d+))?$")
+_CANDIDATE = re.compile(r"[a-z0-9][a-z0-9:.\-]*")
+
+
+def _spacing(value: str) -> str:
+    return "1px" if value == "px" else ("0px" if value == "0" else f"{float(value) * 0.25:g}rem")
+
+
+def _color(name: str, shade: str):
+    if shade is None:
+        return NAMED_COLORS.get(name)
+    return COLORS.get(name, {}).get(int(shade))
+
+
+def utility_body(name: str) -> str:
+    """CSS declarations for one utility class name (without variants), or None if unknown"""
+    if name in STATIC_UTILITIES:
+        return STATIC_UTILITIES[name]
+    match = _SPACING.match(name)
+    if match:
+        value = _spacing(match.group(2))
+        return ";".join(f"{prop}:{value}" for prop in SPACING_PROPS[match.group(1)])
+    if name.startswith("text-") and name[5:] in FONT_SIZES:
+        size, line_height = FONT_SIZES[name[5:]]
+        return f"font-size:{size};line-height:{line_height}"
+    if name.startswith("font-") and name[5:] in FONT_WEIGHTS:
+        return f"font-weight:{FONT_WEIGHTS[name[5:]]}"
+    if name.startswith("max-w-") and name[6:] in MAX_WIDTHS:
+        return f"max-width:{MAX_WIDTHS[name[6:]]}"
+    if name == "rounded" or (name.startswith("rounded-") and name[8:] in RADII):
+        return f"border-radius:{RADII[name[8:]]}"
+    if name == "shadow" or (name.startswith("shadow-") and name[7:] in SHADOWS):
+        return f"box-shadow:{SHADOWS[name[7:]]}"
+    if name.startswith("grid-cols-") and name[10:].isdigit():
+        return f"grid-template-columns:repeat({name[10:]},minmax(0,1fr))"
+    if name.startswith("border-") and name[7:].isdigit():
+        return f"border-width:{name[7:]}px"
+    match = _COLOR.match(name)
+    if match:
+        color = _color(match.group(2), match.group(3))
+        if color:
+            prop = {"text": "color", "bg": "background-color", "border": "border-color", "ring": "--ring-color"}
+            return f"{prop[match.group(1)]}:{color}"
+    return None
+
+
+def _escape(name: str) -> str:
+    return re.sub(r"([:.\/])", r"\\\1", name)
+
+
+def utility_rule(candidate: str):
+    """(breakpoint or None, rule) for a class like "md:grid-cols-2" or "hover:bg-green-700" """
+    *variants, name = candidate.split(":")
+    breakpoint, pseudo = None, ""
+    for variant in variants:
+        if variant in BREAKPOINTS and breakpoint is None:
+            breakpoint = variant
+        elif variant in PSEUDO_VARIANTS:
+            pseudo += PSEUDO_VARIANTS[variant]
+        else:
+            return None
+    if name == "container":
+        return breakpoint, ".container{width:100%}" + "".join(
+            f"@media (min-width:{px}px){{.container{{max-width:{px}px}}}}" for px in BREAKPOINTS.values())
+    if name.startswith("space-x-") or name.startswith("space-y-"):
+        if not re.fullmatch(r"\d+(?:\.5)?|px", name[8:]):
+            return None
+        value = _spacing(name[8:])
+        side = "left" if name[6] == "x" else "top"
+        return breakpoint, f".{_escape(candidate)}{pseudo}>:not([hidden])~:not([hidden]){{margin-{side}:{value}}}"
+    body = utility_body(name)
+    if body is None:
+        return None
+    return breakpoint, f".{_escape(candidate)}{pseudo}{{{body}}}"
+
+
+def collect_classes(sources: list) -> list:
+    """Every token in the sources that names a known utility, like Tailwind's content scan"""
+    found = set()
+    for text in sources:
+        for token in _CANDIDATE.findall(text):
+            token = token.rstrip(".:-")
+            if token not in found and utility_rule(token):
+                found.add(token)
+    return sorted(found)
+
+
+def utilities_css(classes: list) -> str:
+    """Base utilities first, then each breakpoint in ascending order, as Tailwind orders them"""
+    base, responsive = [], {name: [] for name in BREAKPOINTS}
+    for candidate in classes:
+        breakpoint, rule = utility_rule(candidate)
+        (responsive[breakpoint] if breakpoint else base).append(rule)
+    css = "".join(base)
+    for name, rules in responsive.items():
+        if rules:
+            css += f"@media (min-width:{BREAKPOINTS[name]}px){{{''.join(rules)}}}"
+    return css
+
+
+_CSS_TOKEN = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)|([^\"'/\s]+|/)", re.S)
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and collapse whitespace, leaving quoted strings untouched"""
+    out = []
+    for string, comment, space, other in _CSS_TOKEN.findall(css):
+        if string:
+            out.append(string)
+        elif space:
+            out.append(" ")
+        elif other:
+            out.append(other)
+    css = "".join(out)
+    parts = re.split(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')", css)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r"\s*([{};,>~])\s*", r"\1", parts[i])
+        part = re.sub(r":\s+", ":", part)
+        parts[i] = part.replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def minify_js(js: str) -> str:
+    """Conservative: strip indentation, blank lines and whole-line // comments, keep line breaks"""
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+_RAW_ELEMENT = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.S | re.I)
+_TAG = re.compile(r"(<[^>]+>)")
+_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+
+
+def _minify_markup(html: str) -> str:
+    """Collapse whitespace in text between tags; a run with a newline stays one newline so inline spacing renders the same"""
+    parts = _TAG.split(_COMMENT.sub("", html))
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", lambda m: "\n" if "\n" in m.group() else " ", parts[i])
+    return "".join(parts)
+
+
+def minify_html(html: str) -> str:
+    """Minify a page without changing how it renders.
+
+    Tags and attribute values are left as written. <pre> and <textarea> keep their
+    text exactly, inline <style> and <script> go through the CSS/JS minifiers.
+    """
+    out, pos = [], 0
+    for match in _RAW_ELEMENT.finditer(html):
+        out.append(_minify_markup(html[pos:match.start()]))
+        open_tag, name, body, close_tag = match.groups()
+        name = name.lower()
+        if name == "style":
+            body = minify_css(body)
+        elif name == "script" and not re.search(r"\btype=[\"']?(?!(?:text|application)/javascript|module)", open_tag, re.I):
+            body = minify_js(body)
+        out.append(open_tag + body + close_tag)
+        pos = match.end()
+    out.append(_minify_markup(html[pos:]))
+    return "".join(out).strip() + "\n"
+
+
+def compress(data: bytes, encoding: str, fast: bool = False) -> bytes:
+    """Maximum-level compression, or a cheap level for on-demand responses; gzip with a zero mtime
+    so unchanged input gives identical bytes"""
+    if encoding == "br":
+        return brotli.compress(data, quality=5 if fast else 11)
+    return gzip.compress(data, compresslevel=6 if fast else 9, mtime=0)
+
+
+def _write_bytes(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_precompressed(path: str, data: bytes) -> dict:
+    """Write data and its PRECOMPRESSED siblings atomically; returns {"raw"/"br"/"gzip": bytes written}.
+
+    Siblings of the other encodings are removed, so none is left stale.
+    """
+    sizes = {"raw": len(data)}
+    _write_bytes(path, data)
+    for encoding, suffix in ENCODINGS:
+        if (encoding, suffix) in PRECOMPRESSED:
+            packed = compress(data, encoding)
+            _write_bytes(path + suffix, packed)
+            sizes[encoding] = len(packed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return sizes
+
+
+def remove_with_variants(path: str):
+    for candidate in [path] + [path + suffix for _, suffix in ENCODINGS]:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def _hashed_name(stem: str, ext: str, content: str) -> str:
+    return f"{stem}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]}.{ext}"
+
+
+def build_bundles(template_dir: str) -> dict:
+    """{"css": (name, content), "js": (name, content)} from the templates and their assets"""
+    source_dir = os.path.join(template_dir, ASSET_DIR)
+    with open(os.path.join(source_dir, "site.css"), "r", encoding="utf-8") as f:
+        site_css = f.read()
+    with open(os.path.join(source_dir, "site.js"), "r", encoding="utf-8") as f:
+        site_js = f.read()
+
+    sources = [site_js]
+    for path in glob.glob(os.path.join(template_dir, "**", "*.html"), recursive=True):
+        with open(path, "r", encoding="utf-8") as f:
+            sources.append(f.read())
+
+    css = minify_css(PREFLIGHT + site_css) + utilities_css(collect_classes(sources))
+    js = minify_js(site_js)
+    return {"css": (_hashed_name("site", "css", css), css), "js": (_hashed_name("site", "js", js), js)}
+
+
+def write_assets(out_dir: str, bundles: dict) -> list:
+    """Write bundles and their compressed siblings into out/assets once per content hash, drop stale ones"""
+    asset_dir = os.path.join(out_dir, ASSET_DIR)
+    os.makedirs(asset_dir, exist_ok=True)
+    current = {name for name, _ in bundles.values()}
+    written = []
+    for name, content in bundles.values():
+        path = os.path.join(asset_dir, name)
+        if not all(os.path.exists(path + suffix) for suffix in [""] + [s for _, s in PRECOMPRESSED]):
+            write_precompressed(path, content.encode("utf-8"))
+            written.append(name)
+    kept = {suffix for _, suffix in PRECOMPRESSED}
+    for path in glob.glob(os.path.join(asset_dir, "site.*")):
+        match = re.search(r"\.(gz|br)$", path)
+        if re.sub(r"\.(gz|br)$", "", os.path.basename(path)) not in current or (match and match.group() not in kept):
+            os.remove(path)
+    return written
@@ -0,0 +1,1198 @@
+# bot/bench.py (offline benchmarks, run with: python bench.py <name>)
+import argparse
+import inspect
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def bench_llm_cache(args):
+    """Hit rate and wall time of the Gemini response cache against a fake model"""
+    from llm_cache import FakeModel, ResponseCache, make_cache_key
+
+    rng = random.Random(42)
+    prompts = [f"Analyze this handmade product #{i}" for i in range(args.distinct)]
+    # Zipf-like popularity: a few prompts (retries, repeated edits) dominate
+    weights = [1 / (i + 1) for i in range(args.distinct)]
+    workload = rng.choices(prompts, weights=weights, k=args.requests)
+
+    def run(cache):
+        fake = FakeModel(latency=args.latency)
+
+        def call(prompt):
+            if cache is None:
+                return fake.generate_content(prompt).text
+            key = make_cache_key("fake", prompt)
+            return cache.get_or_compute(key, lambda: fake.generate_content(prompt).text)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(call, workload))
+        return time.perf_counter() - start, fake.calls
+
+    elapsed, calls = run(None)
+    print(f"uncached : {args.requests} requests, {calls} model calls, {elapsed:.2f}s")
+
+    cache = ResponseCache(max_entries=args.entries)
+    elapsed, calls = run(cache)
+    print(f"cached   : {args.requests} requests, {calls} model calls, {elapsed:.2f}s")
+    print(f"           hit rate {cache.hit_rate():.1%}, stats {cache.stats}")
+
+
+def bench_rate_governor(args):
+    """Throughput and quota errors against a simulated quota-limited model, with and without the governor"""
+    from rate_limit import QuotaLimitedModel, RateGovernor, INTERACTIVE, BULK
+
+    # Quota scaled down to a one-second window so the run finishes quickly
+    def run(governor):
+        model = QuotaLimitedModel(rpm=args.quota, latency=args.latency, window=1.0)
+        failures = 0
+
+        def call(i):
+            nonlocal failures
+            priority = INTERACTIVE if i % 4 == 0 else BULK
+            try:
+                if governor is None:
+                    model.generate_content(f"prompt {i}")
+                else:
+                    governor.call(lambda: model.generate_content(f"prompt {i}"), tokens=400, priority=priority)
+            except Exception:
+                failures += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(call, range(args.requests)))
+        elapsed = time.perf_counter() - start
+        ok = args.requests - failures
+        return elapsed, ok, failures, model.rejections
+
+    elapsed, ok, failures, rejections = run(None)
+    print(f"ungoverned: {ok}/{args.requests} ok in {elapsed:.2f}s ({ok / elapsed:.1f} req/s), "
+          f"{failures} failed, {rejections} quota errors")
+
+    # Stay just under the quota: per-second rate with no burst
+    governor = RateGovernor(rpm=int(args.quota * 60 * 0.95), tpm=10 ** 9,
+                            max_concurrency=args.max_concurrency, max_wait=60, burst=1)
+    elapsed, ok, failures, rejections = run(governor)
+    print(f"governed  : {ok}/{args.requests} ok in {elapsed:.2f}s ({ok / elapsed:.1f} req/s), "
+          f"{failures} failed, {rejections} quota errors")
+    for lane, stats in governor.metrics()["lanes"].items():
+        print(f"            {lane}: {stats}")
+
+
+def _legacy_extract(description: str):
+    """The three regex extractors that process_image_async used to call in sequence"""
+    import re
+
+    price = 350
+    price_match = re.search(r'₹?\s*(\d+)\s*-\s*₹?\s*(\d+)', description)
+    if price_match:
+        price = (int(price_match.group(1)) + int(price_match.group(2))) // 2
+    else:
+        single_price_match = re.search(r'₹?\s*(\d+)', description)
+        if single_price_match:
+            price = int(single_price_match.group(1))
+
+    title = "Beautiful Handmade Craft"
+    first_sentence = description.split('.')[0]
+    if len(first_sentence) > 10:
+        candidate = re.sub(r'Hindi:.*|Price:.*|Tags:.*', '', first_sentence).strip()
+        if candidate and len(candidate) > 5:
+            title = candidate[:50]
+
+    category = "handmade"
+    description_lower = description.lower()
+    for name in ["pottery", "textiles", "jewelry", "paintings", "wooden",
+                 "metalwork", "leather", "papercraft", "home-decor", "accessories"]:
+        if name in description_lower:
+            category = name
+            break
+    return title, price, category
+
+
+def _load_descriptions(products_file: str) -> list:
+    with open(products_file, "r", encoding="utf-8") as f:
+        return [p.get("description", "") for p in json.load(f).get("products", []) if p.get("description")]
+
+
+def bench_extract(args):
+    """Legacy three-pass extractors vs the single-pass extractor over real catalog descriptions"""
+    from product_extract import extract_product_info
+
+    corpus = _load_descriptions(args.products)
+    print(f"corpus: {len(corpus)} descriptions from {args.products}")
+
+    for description in corpus:
+        title, price, category = _legacy_extract(description)
+        info = extract_product_info(description)
+        print(f"  legacy: {title[:40]!r:44} ₹{price:<6} {category}")
+        print(f"  single: {info.title[:40]!r:44} ₹{info.price:<6} {info.category} {info.language} #{len(info.hashtags)}")
+
+    for name, fn in (("legacy", _legacy_extract), ("single", extract_product_info)):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for description in corpus:
+                fn(description)
+        elapsed = time.perf_counter() - start
+        per_call = elapsed / (args.rounds * len(corpus)) * 1e6
+        print(f"{name}: {per_call:.1f} µs per description")
+
+
+def bench_categorize(args):
+    """Batch re-categorization of a catalog scaled up from products.json: substring loop vs automaton"""
+    from category_classifier import CATEGORIES, classifier, recategorize_products
+
+    with open(args.products, "r", encoding="utf-8") as f:
+        base = json.load(f).get("products", [])
+    products = [dict(base[i % len(base)], category="handmade") for i in range(args.size)]
+
+    start = time.perf_counter()
+    naive = 0
+    for product in products:
+        text = product.get("description", "").lower()
+        if any(category in text for category in CATEGORIES):
+            naive += 1
+    naive_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    changes = recategorize_products(products)
+    elapsed = time.perf_counter() - start
+
+    print(f"substring loop: {naive}/{len(products)} categorized in {naive_elapsed * 1000:.0f} ms")
+    print(f"automaton     : {len(changes)}/{len(products)} categorized in {elapsed * 1000:.0f} ms "
+          f"({len(products) / elapsed:.0f} products/s, {len(classifier._goto)} states)")
+
+
+def bench_pricing(args):
+    """Pricing engine at catalog scale: vectorized fit, incremental add and suggest latency vs the dict lookup"""
+    from pricing import PricingEngine, BASE_PRICES, static_price
+
+    rng = random.Random(7)
+    categories = list(BASE_PRICES) + ["metalwork", "leather", "home-decor"]
+    materials = [m for ms in BASE_PRICES.values() for m in ms] + [None]
+    products = [
+        {"price": int(rng.lognormvariate(6.5, 0.6)), "category": rng.choice(categories), "material": rng.choice(materials)}
+        for _ in range(args.size)
+    ]
+
+    engine = PricingEngine()
+    start = time.perf_counter()
+    engine.fit(products)
+    print(f"fit     : {args.size} products in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    for product in products[:args.adds]:
+        engine.add(product)
+    print(f"add     : {(time.perf_counter() - start) / args.adds * 1e6:.2f} µs per product")
+
+    queries = [(rng.choice(categories), rng.choice(materials)) for _ in range(args.queries)]
+    # The first query per group recomputes stats after the adds above; measure warm lookups
+    for category, material in queries:
+        engine.suggest(category, material)
+
+    for name, fn in (("dict    ", static_price), ("engine  ", engine.suggest)):
+        start = time.perf_counter()
+        for category, material in queries:
+            fn(category, material)
+        print(f"{name}: {(time.perf_counter() - start) / len(queries) * 1e6:.2f} µs per suggestion")
+    print(f"example : pottery/clay -> {engine.suggest('pottery', 'clay')}")
+
+
+def _load_baseline_module(name: str, rev: str, deps: tuple = ()):
+    """Import bot/<name>.py as it was at a git revision, for before/after runs.
+
+    Modules named in deps are loaded at the same revision and seen by its imports.
+    """
+    import subprocess
+    import types
+
+    source = subprocess.run(["git", "show", f"{rev}:bot/{name}.py"], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    module = types.ModuleType(f"{name}_{rev}")
+    module.__file__ = os.path.abspath(f"{name}.py")
+    saved = {dep: sys.modules.get(dep) for dep in deps}
+    try:
+        for dep in deps:
+            sys.modules[dep] = _load_baseline_module(dep, rev)
+        exec(compile(source, module.__file__, "exec"), module.__dict__)
+    finally:
+        for dep, current in saved.items():
+            if current is None:
+                sys.modules.pop(dep, None)
+            else:
+                sys.modules[dep] = current
+    return module
+
+
+def _synthetic_catalog(products_file: str, size: int) -> dict:
+    """Scale the real catalog up to size products spread over size/20 sellers"""
+    with open(products_file, "r", encoding="utf-8") as f:
+        base = json.load(f).get("products", [])
+    sellers = max(1, size // 20)
+    products = []
+    for i in range(size):
+        product = dict(base[i % len(base)])
+        product.update(id=f"bench-{i:06d}", artisan_phone=f"+9190000{i % sellers:05d}",
+                       artisan_name=f"Artisan {i % sellers}")
+        products.append(product)
+    return {
+        "products": products,
+        "sellers": [{"phone": f"+9190000{i:05d}", "name": f"Artisan {i}", "region": "India",
+                     "skills": ["pottery", "weaving"]} for i in range(sellers)],
+        "reels": [{"video_url": "https://example.com/r.mp4", "caption": "Making a diya", "seller_name": "Artisan 0",
+                   "likes": 3, "comments": 1} for _ in range(10)],
+    }
+
+
+def _discard_page(path: str, html: str) -> dict:
+    return {}
+
+
+class _DiscardHtml:
+    """open() stand-in that drops .html writes, to time rendering without disk I/O"""
+
+    def __call__(self, path, mode="r", *args, **kwargs):
+        import io
+
+        if "w" in mode and str(path).endswith(".html"):
+            return io.StringIO()
+        return open(path, mode, *args, **kwargs)
+
+
+def _build_site(module, catalog: dict, root: str, write: bool = True) -> tuple:
+    """Render every product page plus the index and seller pages under root/shop/out"""
+    import contextlib
+    import io
+    import shutil
+
+    options = {}
+    if not write:
+        module.open = _DiscardHtml()
+        # Pages go through temp files, minification and compression: hand in a writer that skips all of it
+        if "write" in inspect.signature(module.create_shop_index).parameters:
+            options["write"] = _discard_page
+    out_dir = os.path.join(root, "shop", "out")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(root, "bot"), exist_ok=True)
+    os.chdir(os.path.join(root, "bot"))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Product pages first, before products.json exists, so the per-call catalog
+            # re-read in older build_and_host does not dominate: this times render + write only
+            start = time.perf_counter()
+            if hasattr(module, "publish_products"):
+                module.publish_products(catalog["products"], **options)
+            else:
+                for product in catalog["products"]:
+                    module.build_and_host(product["id"], product["description"], product["images"],
+                                          product["title"], product["price"])
+            product_elapsed = time.perf_counter() - start
+
+            for name in ("products", "sellers", "reels"):
+                with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+                    json.dump({name: catalog[name]}, f)
+            start = time.perf_counter()
+            module.create_shop_index(**options)
+            index_elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+    return product_elapsed, index_elapsed
+
+
+def bench_render(args):
+    """Pages per second for a full static rebuild: f-string pages at --baseline vs the compiled templates"""
+    import tempfile
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    seller_pages = len(catalog["sellers"]) + 1
+    runs = []
+    if args.baseline:
+        runs.append((f"baseline {args.baseline}", _load_baseline_module("deploy_shop", args.baseline)))
+    import deploy_shop
+    runs.append(("templates", deploy_shop))
+
+    with tempfile.TemporaryDirectory() as root:
+        for name, module in runs:
+            product_elapsed, index_elapsed = _build_site(module, catalog, root, write=not args.no_write)
+            total = product_elapsed + index_elapsed
+            pages = args.size + seller_pages
+            print(f"{name:18}: {args.size} product pages in {product_elapsed:.2f}s "
+                  f"({args.size / product_elapsed:.0f} pages/s), create_shop_index "
+                  f"({seller_pages - 1} sellers) in {index_elapsed:.2f}s; {pages / total:.0f} pages/s overall")
+
+
+def bench_rebuild(args):
+    """Incremental rebuild from the build manifest: cold build, no-op, one product edit, one removal"""
+    import tempfile
+    from site_build import rebuild_site
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    products, sellers, reels = catalog["products"], catalog["sellers"], catalog["reels"]
+
+    with tempfile.TemporaryDirectory() as root:
+        out_dir = os.path.join(root, "shop", "out")
+
+        def run(label):
+            report = rebuild_site(products, sellers, reels, out_dir=out_dir, jobs=args.jobs)
+            print(f"{label:14}: {report.summary()}")
+            if len(report.dirty) + len(report.removed) <= 5:
+                print(f"{'':14}  dirty {report.dirty}, removed {report.removed}")
+
+        run("cold build")
+        run("no changes")
+        # An edit to an older product that is not on the home page
+        products[0] = dict(products[0], price=products[0]["price"] + 100)
+        run("edit product")
+        products[-1] = dict(products[-1], title="Edited title")
+        run("edit latest")
+        del products[1]
+        run("remove product")
+
+
+def bench_deploy(args):
+    """Deploys triggered by a burst of edits: one inline deploy per edit vs the coalescing scheduler"""
+    from deploy_scheduler import DeployScheduler
+
+    def fake_deploy():
+        time.sleep(args.deploy_time)
+        return True
+
+    start = time.perf_counter()
+    for _ in range(args.edits):
+        time.sleep(args.gap)
+        fake_deploy()
+    print(f"inline   : {args.edits} edits -> {args.edits} deploys, {time.perf_counter() - start:.2f}s of handler time")
+
+    scheduler = DeployScheduler(fake_deploy, window=args.window, debounce=args.debounce)
+    start = time.perf_counter()
+    blocked = 0.0
+    for i in range(args.edits):
+        time.sleep(args.gap)
+        mark = time.perf_counter()
+        scheduler.mark_dirty(f"edit {i}")
+        blocked += time.perf_counter() - mark
+    scheduler.flush()
+    scheduler.stop()
+    print(f"scheduled: {args.edits} edits -> {scheduler.stats['deploys']} deploys, {blocked * 1000:.1f} ms of handler time, "
+          f"all live after {time.perf_counter() - start:.2f}s")
+
+
+def bench_publish(args):
+    """Differential publish of a rebuilt site to a directory and an HTTP stand-in: full, no-op and one edit"""
+    import shutil
+    import tempfile
+    from publish import DirectoryTarget, HttpTarget, Publisher, StandInHttpServer
+    from site_build import rebuild_site
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    products, sellers, reels = catalog["products"], catalog["sellers"], catalog["reels"]
+
+    with tempfile.TemporaryDirectory() as root, StandInHttpServer() as server:
+        out_dir = os.path.join(root, "shop", "out")
+        rebuild_site(products, sellers, reels, out_dir=out_dir)
+
+        start = time.perf_counter()
+        shutil.copytree(out_dir, os.path.join(root, "full-copy"))
+        print(f"whole-site copy : {time.perf_counter() - start:.2f}s")
+
+        targets = [
+            ("directory", Publisher(DirectoryTarget(os.path.join(root, "published")), out_dir,
+                                    os.path.join(root, "dir-state.json"))),
+            ("http", Publisher(HttpTarget(server.url), out_dir, os.path.join(root, "http-state.json"))),
+        ]
+        for label in ("first publish", "no changes", "one edit"):
+            if label == "one edit":
+                products[0] = dict(products[0], price=products[0]["price"] + 100)
+                rebuild_site(products, sellers, reels, out_dir=out_dir)
+            for name, publisher in targets:
+                print(f"{label:14} -> {name:9}: {publisher.publish().summary()}")
+        print(f"http stand-in handled {server.requests} requests")
+
+
+def bench_assets(args):
+    """Bytes downloaded for a browsing session: CSS/JS inlined in every page vs hashed bundles fetched once"""
+    import re
+    from asset_pipeline import collect_classes, minify_css, minify_js
+    from renderer import ASSET_BUNDLES, TEMPLATE_DIR, render_product
+
+    with open(args.products, "r", encoding="utf-8") as f:
+        products = json.load(f)["products"]
+    with open(os.path.join(TEMPLATE_DIR, "assets", "site.css"), "r", encoding="utf-8") as f:
+        raw_css = f.read()
+    with open(os.path.join(TEMPLATE_DIR, "assets", "site.js"), "r", encoding="utf-8") as f:
+        raw_js = f.read()
+
+    pages = [render_product(product).encode("utf-8") for product in products[:args.views]]
+    # What each page used to carry: the stylesheet and its script inline, plus the Tailwind CDN runtime
+    inline = f"<style>{raw_css}</style><script>{raw_js}</script>".encode("utf-8")
+    before = sum(len(page) + len(inline) for page in pages)
+    bundles = sum(len(content.encode("utf-8")) for _, content in ASSET_BUNDLES.values())
+    after = sum(len(page) for page in pages) + bundles
+
+    css = ASSET_BUNDLES["css"][1]
+    sources = [raw_js] + [open(os.path.join(folder, name), encoding="utf-8").read()
+                          for folder, _, files in os.walk(TEMPLATE_DIR) for name in files if name.endswith(".html")]
+    print(f"bundles : {ASSET_BUNDLES['css'][0]} {len(css)} B ({len(collect_classes(sources))} utilities kept), "
+          f"{ASSET_BUNDLES['js'][0]} {len(ASSET_BUNDLES['js'][1])} B")
+    print(f"minify  : css {len(raw_css)} -> {len(minify_css(raw_css))} B, js {len(raw_js)} -> {len(minify_js(raw_js))} B")
+    print(f"inline  : {len(pages)} page views, {before / 1024:.1f} KB (+ Tailwind CDN runtime and in-browser JIT per view)")
+    print(f"bundled : {len(pages)} page views, {after / 1024:.1f} KB, bundles cached after the first view")
+    print(f"          no <style>/<script> left in pages: {not any(re.search(rb'<style|<script>', page) for page in pages)}")
+
+
+def bench_pages(args):
+    """On-demand page serving: Zipf-distributed buyer views against the rendered-page LRU"""
+    import tempfile
+    from page_server import PageServer
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    rng = random.Random(7)
+    ids = [product["id"] for product in catalog["products"]]
+    weights = [1 / (i + 1) for i in range(len(ids))]
+    views = rng.choices(ids, weights=weights, k=args.views)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name in ("products", "sellers", "reels"):
+            with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+                json.dump({name: catalog[name]}, f)
+        server = PageServer(out_dir, max_bytes=args.cache_mb * 1024 * 1024)
+        server.catalog()
+
+        timings = {"miss": [], "hit": []}
+        for product_id in views:
+            path = f"product/{product_id}.html"
+            kind = "hit" if server.cache._entries.get(path) else "miss"
+            start = time.perf_counter()
+            server.respond(path, "br, gzip")
+            timings[kind].append(time.perf_counter() - start)
+
+        status = server.status()
+        for kind, samples in timings.items():
+            if samples:
+                print(f"{kind:5}: {len(samples)} requests, {sum(samples) / len(samples) * 1000:.3f} ms avg")
+        print(f"rendered {status['misses']} distinct pages for {args.views} views of a {args.size}-product catalog "
+              f"({len(set(views))} distinct viewed); cache {status['pages']} pages, {status['bytes'] / 1024:.0f} KB, "
+              f"{status['evictions']} evictions")
+
+        # An edit is visible on the very next request, without a rebuild or deploy
+        catalog["products"][0]["title"] = "Edited title"
+        with open(os.path.join(out_dir, "products.json"), "w") as f:
+            json.dump({"products": catalog["products"]}, f)
+        start = time.perf_counter()
+        _, body, _ = server.respond(f"product/{ids[0]}.html")
+        print(f"edit : visible on next request ({b'Edited title' in body}), "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms including catalog reload")
+
+
+def bench_home(args):
+    """Home-page inputs after each new product: full catalog scan vs the incrementally maintained aggregates"""
+    from catalog import HomeAggregates
+    from site_build import index_page
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    products, reels = catalog["products"], catalog["reels"]
+    new_products = [dict(products[i % len(products)], id=f"new-{i:06d}") for i in range(args.adds)]
+
+    start = time.perf_counter()
+    scanned = list(products)
+    for product in new_products:
+        scanned.append(product)
+        full_digest, _ = index_page(HomeAggregates().fit(scanned, reels))
+    scan_elapsed = time.perf_counter() - start
+
+    home = HomeAggregates().fit(products, reels)
+    start = time.perf_counter()
+    for product in new_products:
+        home.add_product(product)
+        digest, _ = index_page(home)
+    incremental_elapsed = time.perf_counter() - start
+
+    print(f"full refit : {args.adds} adds to a {args.size}-product catalog, {scan_elapsed / args.adds * 1000:.2f} ms per index")
+    print(f"incremental: {args.adds} adds, {incremental_elapsed / args.adds * 1000:.3f} ms per index, "
+          f"same page: {digest == full_digest}")
+
+
+def bench_search(args):
+    """Search index size, build time and per-query download for catalogs of several sizes"""
+    import gzip
+    import shutil
+    import tempfile
+
+    from search_index import build_search_index, search, tokenize, update_search_index, write_search_index
+
+    rng = random.Random(7)
+    # The real catalog repeats; give each copy a few extra words so the vocabulary grows with it
+    syllables = ["ka", "la", "ma", "ri", "to", "sa", "ne", "vu", "di", "pa", "go", "rhe", "shi", "ban", "tar"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)]
+    for size in args.sizes:
+        products = _synthetic_catalog(args.products, size)["products"]
+        for product in products:
+            extra = " ".join(vocabulary[int(rng.paretovariate(1.1)) % len(vocabulary)] for _ in range(3))
+            product["description"] = f"{product.get('description') or ''} {extra}"
+        catalog_bytes = len(json.dumps({"products": products}).encode("utf-8"))
+
+        start = time.perf_counter()
+        manifest, files = build_search_index(products)
+        build_elapsed = time.perf_counter() - start
+        root = tempfile.mkdtemp(prefix="bench-search-")
+        try:
+            first = write_search_index(products, root)
+            products[-1] = dict(products[-1], title="Blue pottery vase")
+            again = write_search_index(products, root)
+            # What a product edit or a new product costs now: only the files it touches
+            edited = dict(products[len(products) // 2], title="Blue pottery vase")
+            edit = update_search_index([edited], root)
+            added = dict(products[0], id="bench-new", title="Terracotta horse")
+            add = update_search_index([added], root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+        sizes = {name: len(content.encode("utf-8")) for name, content in files.items()}
+        packed = {name: len(gzip.compress(content.encode("utf-8"))) for name, content in files.items()}
+        queries = [" ".join(tokenize(p.get("title"))[:2]) for p in rng.sample(products, 50)]
+        fetched = []
+        for query in queries:
+            names = {manifest["shards"].get(word[:manifest["prefix"]]) for word in tokenize(query)}
+            names.add(manifest["doc_chunks"][-1])  # results are newest first, so at least the last chunk
+            fetched.append(sum(packed.get(name, 0) for name in names if name))
+        hits = sum(bool(search(query, manifest, files)) for query in queries)
+
+        print(f"{size:>7} products: {first.terms} terms in {first.shards} shards + {len(manifest['doc_chunks'])} doc chunks, "
+              f"{sum(sizes.values()) / 1024:.0f} KB ({sum(packed.values()) / 1024:.0f} KB gzipped) vs products.json "
+              f"{catalog_bytes / 1024:.0f} KB")
+        print(f"         build {build_elapsed:.2f}s, first write {first.elapsed:.2f}s ({len(first.written)} files), "
+              f"full rewrite after one edit {again.elapsed:.2f}s ({len(again.written)} files)")
+        print(f"         incremental: edit {edit.elapsed * 1000:.1f} ms ({len(edit.written)} files), "
+              f"new product {add.elapsed * 1000:.1f} ms ({len(add.written)} files)")
+        print(f"         per query: {sum(fetched) / len(fetched) / 1024:.1f} KB gzipped fetched on average, "
+              f"largest shard {first.largest_shard / 1024:.1f} KB, {hits}/{len(queries)} sample queries matched")
+
+
+def bench_partitions(args):
+    """First-paint bytes and files rewritten per change: products.json vs category/month partitions"""
+    import gzip
+    import shutil
+    import tempfile
+
+    from partitions import INDEX_NAME, PARTITION_DIR, write_partitions
+
+    products = _synthetic_catalog(args.products, args.size)["products"]
+    for i, product in enumerate(products):
+        # Spread the catalog over two years so there are month partitions to split into
+        month = i * 24 // len(products)
+        product["created_at"] = f"{2024 + month // 12}-{1 + month % 12:02d}-15T10:00:00"
+    monolith = json.dumps({"products": products}, indent=2).encode("utf-8")
+
+    root = tempfile.mkdtemp(prefix="bench-partitions-")
+    try:
+        first = write_partitions(products, root)
+        start = time.perf_counter()
+        written = 0
+        for i in range(args.adds):
+            products.append(dict(products[-1], id=f"new-{i:06d}"))
+            written += len(write_partitions(products, root).written)
+        add_elapsed = time.perf_counter() - start
+
+        with open(os.path.join(root, PARTITION_DIR, INDEX_NAME), "rb") as f:
+            index_data = f.read()
+        with open(os.path.join(root, PARTITION_DIR, json.loads(index_data)["latest"]), "rb") as f:
+            latest_data = f.read()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    first_paint = len(gzip.compress(index_data)) + len(gzip.compress(latest_data))
+    print(f"products.json : {len(monolith) / 1024:.0f} KB ({len(gzip.compress(monolith)) / 1024:.0f} KB gzipped) per visit and poll")
+    print(f"partitions    : {first.pages} pages, first paint {first_paint / 1024:.1f} KB gzipped "
+          f"(index {len(index_data) / 1024:.1f} KB + latest page {len(latest_data) / 1024:.1f} KB raw)")
+    print(f"per new product: {written / args.adds:.1f} files rewritten, {add_elapsed / args.adds * 1000:.0f} ms")
+
+
+WEBHOOK_COMMANDS = {
+    "welcome": "hi",
+    "help": "help",
+    "categories": "categories",
+    "prompt": "is anyone there?",
+    "myproducts": "myproducts",
+    "edit": "edit 00000000 price 500",
+}
+
+
+async def _post_form(app, path: str, form: dict) -> int:
+    """One POST through the full ASGI stack (routing, form parsing, handler); returns the status"""
+    from urllib.parse import urlencode
+
+    body = urlencode(form).encode("utf-8")
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"content-type", b"application/x-www-form-urlencoded"),
+                         (b"content-length", str(len(body)).encode())],
+             "client": ("127.0.0.1", 5000), "server": ("127.0.0.1", 8000)}
+    sent = {"body": False}
+    status = {}
+
+    async def receive():
+        if sent["body"]:
+            return {"type": "http.disconnect"}
+        sent["body"] = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code", 0)
+
+
+def bench_webhook(args):
+    """Webhook requests per second per command type: handler at --baseline vs the fast path"""
+    import asyncio
+    import logging
+
+    # Logs go through formatting and a handler, but not to the terminal
+    devnull = open(os.devnull, "w")
+    logging.basicConfig(stream=devnull, level=logging.INFO, force=True)
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+    made_static = not os.path.isdir("static")
+    os.makedirs("static", exist_ok=True)
+    try:
+        runs = []
+        if args.baseline:
+            runs.append((f"baseline {args.baseline}", _load_baseline_module("main", args.baseline).app))
+        import main
+        runs.append(("fast path", main.app))
+
+        async def run(app, body):
+            form = {"From": "whatsapp:+919876543210", "To": "whatsapp:+14155238886", "Body": body,
+                    "NumMedia": "0", "MessageSid": "SMbench", "AccountSid": "ACbench", "ProfileName": "Bench"}
+            for _ in range(args.warmup):
+                await _post_form(app, "/whatsapp", form)
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                assert await _post_form(app, "/whatsapp", form) == 200
+            return args.requests / (time.perf_counter() - start)
+
+        print(f"{'command':<12}" + "".join(f"{label:>20}" for label, _ in runs))
+        for command, body in WEBHOOK_COMMANDS.items():
+            rates = [asyncio.run(run(app, body)) for _, app in runs]
+            print(f"{command:<12}" + "".join(f"{rate:>16.0f} rps" for rate in rates))
+    finally:
+        if made_static:
+            os.rmdir("static")
+        devnull.close()
+
+
+def _stub_slow_io(module, delay: float):
+    """Replace a main module's file, media and Twilio calls with sleeps: no network, no catalog writes"""
+    class _Messages:
+        def create(self, **kwargs):
+            return None
+
+    def slow(result=None):
+        def call(*args, **kwargs):
+            time.sleep(delay)
+            return result
+        return call
+
+    module.twilio_client = type("Client", (), {"messages": _Messages()})()
+    if hasattr(module, "outbound"):
+        from outbound import FakeTransport
+        module.outbound.transport = FakeTransport()
+    module.handle_edit_command = slow("✅ Updated price for product 00000000")
+    module.download_twilio_media = slow(b"")
+    module.save_image = lambda content, filename: filename
+    for name in ("update_products_json", "create_shop_index", "schedule_deploy", "get_seller_profile"):
+        setattr(module, name, lambda *args, **kwargs: None)
+    module.publish_product = lambda product: "https://example.com/p.html"
+    module.GEMINI_AVAILABLE = module.IMAGEN_AVAILABLE = False
+
+
+def bench_webhook_load(args):
+    """Latency of quick webhooks ("hi") while slow edits and photo uploads are in flight"""
+    import asyncio
+    import logging
+    import statistics
+
+    devnull = open(os.devnull, "w")
+    logging.basicConfig(stream=devnull, level=logging.INFO, force=True)
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+    made_static = not os.path.isdir("static")
+    os.makedirs("static", exist_ok=True)
+    try:
+        runs = []
+        if args.baseline:
+            runs.append((f"baseline {args.baseline}",
+                         _load_baseline_module("main", args.baseline, deps=("command_router",))))
+        import main
+        runs.append(("offloaded", main))
+
+        sender = {"From": "whatsapp:+919876543210", "NumMedia": "0"}
+        slow_forms = [
+            dict(sender, Body="edit 00000000 price 500"),
+            dict(sender, Body="", NumMedia="1", MediaUrl0="https://example.com/m", MediaContentType0="image/jpeg"),
+        ]
+
+        async def run(module):
+            async def timed(form, sent):
+                # From when the message was sent, so time spent waiting for a blocked loop counts
+                await _post_form(module.app, "/whatsapp", form)
+                return time.perf_counter() - sent
+
+            slow = [asyncio.create_task(timed(slow_forms[i % 2], time.perf_counter())) for i in range(args.slow)]
+            quick = []
+            for _ in range(args.quick):
+                hi = dict(sender, From="whatsapp:+911111111111", Body="hi")
+                quick.append(asyncio.create_task(timed(hi, time.perf_counter())))
+                await asyncio.sleep(args.interval)
+            quick_latency = await asyncio.gather(*quick)
+            await asyncio.gather(*slow)
+            # Let queued background work finish before the loop closes
+            while module.media_jobs.status()["pending"] or module.media_jobs.stats["completed"] + \
+                    module.media_jobs.stats["failed"] < module.media_jobs.stats["submitted"]:
+                await asyncio.sleep(0.05)
+            return sorted(quick_latency)
+
+        print(f"{args.slow} slow requests ({args.delay * 1000:.0f} ms of blocking I/O each, half edits, half photos) "
+              f"alongside {args.quick} 'hi' messages")
+        for label, module in runs:
+            _stub_slow_io(module, args.delay)
+            latency = asyncio.run(run(module))
+            p95 = latency[int(len(latency) * 0.95) - 1]
+            print(f"{label:<20} hi p50 {statistics.median(latency) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+                  f"max {latency[-1] * 1000:7.1f} ms")
+    finally:
+        if made_static:
+            os.rmdir("static")
+        devnull.close()
+
+
+def bench_webhook_retries(args):
+    """Products created when Twilio redelivers photo webhooks, before and after a restart"""
+    import asyncio
+    import logging
+    import random
+    import shutil
+    import tempfile
+
+    devnull = open(os.devnull, "w")
+    logging.basicConfig(stream=devnull, level=logging.INFO, force=True)
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+    ledger_dir = tempfile.mkdtemp(prefix="ledger-")
+    os.environ["WEBHOOK_DEDUP_DIR"] = ledger_dir
+    made_static = not os.path.isdir("static")
+    os.makedirs("static", exist_ok=True)
+    try:
+        runs = []
+        if args.baseline:
+            runs.append((f"baseline {args.baseline}",
+                         _load_baseline_module("main", args.baseline, deps=("command_router",))))
+        import main
+        runs.append(("ledger", main))
+
+        forms = [{"From": f"whatsapp:+9198765{i:05d}", "Body": "", "NumMedia": "1", "MessageSid": f"SM{i:032x}",
+                  "MediaUrl0": f"https://example.com/m{i}", "MediaContentType0": "image/jpeg"}
+                 for i in range(args.messages)]
+
+        async def deliver(module, created):
+            # Each message once, plus retries spread over the next few hundred ms, some overlapping the first
+            rng = random.Random(7)
+            async def post(form, after):
+                await asyncio.sleep(after)
+                return await _post_form(module.app, "/whatsapp", form)
+            tasks = [post(form, 0 if attempt == 0 else rng.uniform(0, args.spread))
+                     for form in forms for attempt in range(args.retries + 1)]
+            replies = await asyncio.gather(*tasks)
+            while module.media_jobs.stats["completed"] + module.media_jobs.stats["failed"] < \
+                    module.media_jobs.stats["submitted"]:
+                await asyncio.sleep(0.05)
+            return len(replies), created[0]
+
+        print(f"{args.messages} photo messages, each delivered {args.retries + 1} times within {args.spread * 1000:.0f} ms")
+        for label, module in runs:
+            _stub_slow_io(module, args.delay)
+            created = [0]
+            def publish(product, created=created):
+                created[0] += 1
+                return "https://example.com/p.html"
+            module.publish_product = publish
+            posts, products = asyncio.run(deliver(module, created))
+            print(f"{label:<20} {posts} webhooks -> {products} products")
+            if hasattr(module, "message_ledger"):
+                print(f"{'':<20} {module.message_ledger.status()}")
+                # A restart between delivery and retry: a fresh ledger on the same directory
+                module.message_ledger = type(module.message_ledger)(disk_dir=ledger_dir)
+                created[0] = 0
+                posts, products = asyncio.run(deliver(module, created))
+                print(f"{'after restart':<20} {posts} webhooks -> {products} products "
+                      f"({module.message_ledger.stats['disk_hits']} answered from disk)")
+    finally:
+        if made_static:
+            os.rmdir("static")
+        shutil.rmtree(ledger_dir, ignore_errors=True)
+        devnull.close()
+
+
+def bench_fairness(args):
+    """Time-to-shop-link for ordinary senders while one artisan sends a burst of photos"""
+    import asyncio
+    import logging
+    import statistics
+
+    devnull = open(os.devnull, "w")
+    logging.basicConfig(stream=devnull, level=logging.INFO, force=True)
+    os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACbench")
+    os.environ.setdefault("TWILIO_AUTH_TOKEN", "bench")
+    made_static = not os.path.isdir("static")
+    os.makedirs("static", exist_ok=True)
+    try:
+        runs = []
+        if args.baseline:
+            runs.append((f"baseline {args.baseline}",
+                         _load_baseline_module("main", args.baseline, deps=("command_router",)), None))
+        import main
+        from rate_limit import SenderLimiter
+        runs.append(("fair queue", main, SenderLimiter(per_minute=1e6, burst=1e6)))
+        runs.append(("fair queue + limits", main, main.whatsapp_limits))
+
+        def photo(phone):
+            return {"From": f"whatsapp:{phone}", "Body": "", "NumMedia": "1",
+                    "MediaUrl0": "https://example.com/m", "MediaContentType0": "image/jpeg"}
+
+        async def run(module):
+            sent, linked, products = {}, {}, {}
+            def publish(product):
+                linked.setdefault(product["artisan_phone"], time.perf_counter())
+                products[product["artisan_phone"]] = products.get(product["artisan_phone"], 0) + 1
+                return "https://example.com/p.html"
+            module.publish_product = publish
+
+            heavy = "+919000000000"
+            await asyncio.gather(*(_post_form(module.app, "/whatsapp", photo(heavy)) for _ in range(args.burst)))
+            for i in range(args.others):
+                phone = f"+91800000{i:04d}"
+                sent[phone] = time.perf_counter()
+                await _post_form(module.app, "/whatsapp", photo(phone))
+                await asyncio.sleep(args.interval)
+            while module.media_jobs.stats["completed"] + module.media_jobs.stats["failed"] < \
+                    module.media_jobs.stats["submitted"]:
+                await asyncio.sleep(0.05)
+            return products.get(heavy, 0), sorted(linked[phone] - sent[phone] for phone in sent)
+
+        print(f"one sender bursts {args.burst} photos, then {args.others} others send one each, "
+              f"{args.delay * 1000:.0f} ms of I/O per photo")
+        for label, module, limits in runs:
+            _stub_slow_io(module, args.delay)
+            if limits is not None:
+                module.whatsapp_limits = limits
+            accepted, latency = asyncio.run(run(module))
+            p95 = latency[int(len(latency) * 0.95) - 1]
+            print(f"{label:<22} burst products {accepted:3d}   others to shop link p50 {statistics.median(latency):5.2f}s   "
+                  f"p95 {p95:5.2f}s   max {latency[-1]:5.2f}s")
+    finally:
+        if made_static:
+            os.rmdir("static")
+        devnull.close()
+
+
+def bench_outbound(args):
+    """Follow-up WhatsApp messages: inline sends in the media job vs the outbound dispatcher"""
+    import statistics
+
+    from outbound import FakeTransport, OutboundDispatcher
+
+    recipients = [f"whatsapp:+91700000{i:04d}" for i in range(args.recipients)]
+    # Every tenth recipient's first send is throttled, as Twilio does under load
+    failures = {to: [429] for to in recipients[::10]}
+
+    def check_order(transport):
+        received = {}
+        for to, body in transport.sent:
+            received.setdefault(to, []).extend(body.split("\n\n"))
+        expected = [f"message {n}" for n in range(args.messages)]
+        return sum(received.get(to) == expected for to in recipients)
+
+    # Before: each job sent its messages one after another, with no retry
+    transport = FakeTransport(args.latency, failures)
+    def job(to):
+        start = time.perf_counter()
+        for n in range(args.messages):
+            try:
+                transport.send(to, f"message {n}")
+            except Exception:
+                pass
+        return time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        critical = list(pool.map(job, recipients))
+    wall = time.perf_counter() - start
+    print(f"{args.recipients} recipients x {args.messages} messages, {args.latency * 1000:.0f} ms per send, "
+          f"{len(failures)} recipients throttled once")
+    print(f"{'inline':<18} job time in sends {statistics.mean(critical) * 1000:7.1f} ms   all sent in {wall:5.2f}s   "
+          f"requests {transport.calls:4d}   complete and in order {check_order(transport)}/{args.recipients}")
+
+    for merge in (False, True):
+        transport = FakeTransport(args.latency, failures)
+        dispatcher = OutboundDispatcher(transport, workers=args.workers, rate=args.rate, retry_backoff=0.05, merge=merge)
+        dispatcher.start()
+        start = time.perf_counter()
+        critical = []
+        for to in recipients:
+            job_start = time.perf_counter()
+            for n in range(args.messages):
+                dispatcher.send(to, f"message {n}")
+            critical.append(time.perf_counter() - job_start)
+        dispatcher.flush()
+        wall = time.perf_counter() - start
+        dispatcher.stop()
+        label = "dispatcher + merge" if merge else "dispatcher"
+        print(f"{label:<18} job time in sends {statistics.mean(critical) * 1000:7.1f} ms   all sent in {wall:5.2f}s   "
+              f"requests {transport.calls:4d}   complete and in order {check_order(transport)}/{args.recipients}")
+
+
+def bench_notify(args):
+    """Bulk tracking notifications: one send per call vs a job on the dispatcher's bulk lane"""
+    import statistics
+
+    import outbound
+    import rate_limit
+    import sms
+
+    items = [{"phone": f"+91600000{i:04d}", "awb": f"DL{i:08X}", "language": ("hi", "en", "kn")[i % 3]}
+             for i in range(args.items)]
+
+    transport = outbound.FakeTransport(args.latency)
+    start = time.perf_counter()
+    for item in items:
+        transport.send(sms.whatsapp_address(item["phone"]), sms.render_tracking(item["awb"], item["language"]))
+    inline = time.perf_counter() - start
+    print(f"{args.items} tracking messages, {args.latency * 1000:.0f} ms per send, {args.rate:.0f} sends/s allowed, "
+          f"{args.replies} replies to users during the batch")
+    print(f"{'one call each':<16} request held {inline:6.2f}s")
+
+    for label, lane in (("bulk, one lane", rate_limit.INTERACTIVE), ("bulk lane", rate_limit.BULK)):
+        outbound.outbound = outbound.OutboundDispatcher(outbound.FakeTransport(args.latency), workers=args.workers,
+                                                        rate=args.rate)
+        sms.BULK = lane
+        start = time.perf_counter()
+        job = sms.notify_tracking(items)
+        held = time.perf_counter() - start
+        replies = []
+        for i in range(args.replies):
+            sent = time.perf_counter()
+            future = outbound.send_message(f"whatsapp:+91911111{i:04d}", "🛍️ Your shop is ready")
+            future.add_done_callback(lambda f, sent=sent: replies.append(time.perf_counter() - sent))
+            time.sleep(args.interval)
+        while not sms.tracking_job_status(job["job_id"])["done"]:
+            time.sleep(0.01)
+        total = time.perf_counter() - start
+        outbound.outbound.flush()
+        counts = sms.tracking_job_status(job["job_id"])["counts"]
+        replies.sort()
+        print(f"{label:<16} request held {held:6.2f}s   batch done in {total:5.2f}s {counts}   "
+              f"reply p50 {statistics.median(replies) * 1000:6.0f} ms   p95 {replies[int(len(replies) * 0.95) - 1] * 1000:6.0f} ms")
+    sms.BULK = rate_limit.BULK
+
+
+def bench_ship_batch(args):
+    """Shipping labels for many orders: one request and catalog lookup per order vs one batch"""
+    import tempfile
+
+    import ship
+
+    catalog = _synthetic_catalog(args.products, args.size)
+    orders = [{"product_id": f"bench-{i * 7 % args.size:06d}", "buyer_name": f"Buyer {i}",
+               "buyer_address": "12 MG Road, Bengaluru", "buyer_phone": f"+91600000{i:04d}"}
+              for i in range(args.orders)]
+    carrier = ship.DemoCarrier(latency=args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        products_file = os.path.join(tmp, "products.json")
+        with open(products_file, "w", encoding="utf-8") as f:
+            json.dump({"products": catalog["products"]}, f)
+
+        def load_products():
+            with open(products_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("products", [])
+
+        # Before: each order was its own request, reading products.json to find its product
+        start = time.perf_counter()
+        for order in orders:
+            product = next((p for p in load_products() if p.get("id") == order["product_id"]), None)
+            if product:
+                carrier.create_label(order["buyer_name"], order["buyer_address"])
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        valid, invalid = ship.validate_orders(orders, load_products())
+        validated = time.perf_counter() - start
+        with ThreadPoolExecutor(args.workers) as pool:
+            labels = list(pool.map(lambda item: carrier.create_label(item[1]["buyer_name"], item[1]["buyer_address"]),
+                                   valid))
+        batch = time.perf_counter() - start
+
+    print(f"{args.orders} orders against {args.size} products, {args.latency * 1000:.0f} ms per carrier call")
+    print(f"{'one per request':<16} {single:6.2f}s")
+    print(f"{'batch':<16} {batch:6.2f}s   (catalog validated in {validated * 1000:.0f} ms, "
+          f"{len(labels)} labels with {args.workers} workers, {len(invalid)} invalid)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KalaaSaarathi offline benchmarks")
+    sub = parser.add_subparsers(dest="name", required=True)
+
+    p = sub.add_parser("llm-cache", help=bench_llm_cache.__doc__)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--distinct", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--latency", type=float, default=0.02)
+    p.add_argument("--entries", type=int, default=256)
+    p.set_defaults(func=bench_llm_cache)
+
+    p = sub.add_parser("rate-governor", help=bench_rate_governor.__doc__)
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--quota", type=int, default=20, help="calls allowed per simulated window")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--max-concurrency", type=int, default=8)
+    p.add_argument("--latency", type=float, default=0.05)
+    p.set_defaults(func=bench_rate_governor)
+
+    p = sub.add_parser("extract", help=bench_extract.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--rounds", type=int, default=2000)
+    p.set_defaults(func=bench_extract)
+
+    p = sub.add_parser("categorize", help=bench_categorize.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.set_defaults(func=bench_categorize)
+
+    p = sub.add_parser("pricing", help=bench_pricing.__doc__)
+    p.add_argument("--size", type=int, default=100000)
+    p.add_argument("--adds", type=int, default=10000)
+    p.add_argument("--queries", type=int, default=100000)
+    p.set_defaults(func=bench_pricing)
+
+    p = sub.add_parser("render", help=bench_render.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    p.add_argument("--no-write", action="store_true", help="discard page writes and time rendering only")
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser("rebuild", help=bench_rebuild.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.add_argument("--jobs", type=int, default=1)
+    p.set_defaults(func=bench_rebuild)
+
+    p = sub.add_parser("deploy", help=bench_deploy.__doc__)
+    p.add_argument("--edits", type=int, default=10)
+    p.add_argument("--gap", type=float, default=0.05, help="seconds between edits")
+    p.add_argument("--deploy-time", type=float, default=0.5)
+    p.add_argument("--window", type=float, default=2.0)
+    p.add_argument("--debounce", type=float, default=0.2)
+    p.set_defaults(func=bench_deploy)
+
+    p = sub.add_parser("publish", help=bench_publish.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.set_defaults(func=bench_publish)
+
+    p = sub.add_parser("assets", help=bench_assets.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--views", type=int, default=9)
+    p.set_defaults(func=bench_assets)
+
+    p = sub.add_parser("pages", help=bench_pages.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.add_argument("--views", type=int, default=20000)
+    p.add_argument("--cache-mb", type=int, default=16)
+    p.set_defaults(func=bench_pages)
+
+    p = sub.add_parser("home", help=bench_home.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=100000)
+    p.add_argument("--adds", type=int, default=20)
+    p.set_defaults(func=bench_home)
+
+    p = sub.add_parser("search", help=bench_search.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    p.set_defaults(func=bench_search)
+
+    p = sub.add_parser("partitions", help=bench_partitions.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=10000)
+    p.add_argument("--adds", type=int, default=20)
+    p.set_defaults(func=bench_partitions)
+
+    p = sub.add_parser("webhook", help=bench_webhook.__doc__)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--warmup", type=int, default=100)
+    p.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    p.set_defaults(func=bench_webhook)
+
+    p = sub.add_parser("webhook-load", help=bench_webhook_load.__doc__)
+    p.add_argument("--slow", type=int, default=8, help="slow edits/photos sent at once")
+    p.add_argument("--delay", type=float, default=0.5, help="seconds of blocking I/O per slow request")
+    p.add_argument("--quick", type=int, default=100)
+    p.add_argument("--interval", type=float, default=0.01, help="seconds between quick messages")
+    p.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    p.set_defaults(func=bench_webhook_load)
+
+    p = sub.add_parser("webhook-retries", help=bench_webhook_retries.__doc__)
+    p.add_argument("--messages", type=int, default=20)
+    p.add_argument("--retries", type=int, default=2, help="redeliveries of each message")
+    p.add_argument("--spread", type=float, default=0.3, help="seconds over which retries arrive")
+    p.add_argument("--delay", type=float, default=0.05, help="seconds of I/O per media download")
+    p.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    p.set_defaults(func=bench_webhook_retries)
+
+    p = sub.add_parser("fairness", help=bench_fairness.__doc__)
+    p.add_argument("--burst", type=int, default=40, help="photos from the heavy sender, all at once")
+    p.add_argument("--others", type=int, default=20, help="senders with one photo each")
+    p.add_argument("--interval", type=float, default=0.1, help="seconds between the other senders")
+    p.add_argument("--delay", type=float, default=0.2, help="seconds of I/O per photo download")
+    p.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    p.set_defaults(func=bench_fairness)
+
+    p = sub.add_parser("outbound", help=bench_outbound.__doc__)
+    p.add_argument("--recipients", type=int, default=40)
+    p.add_argument("--messages", type=int, default=4, help="messages per recipient, as one photo sends")
+    p.add_argument("--latency", type=float, default=0.1, help="seconds per Twilio request")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--rate", type=float, default=50, help="global sends per second")
+    p.set_defaults(func=bench_outbound)
+
+    p = sub.add_parser("notify", help=bench_notify.__doc__)
+    p.add_argument("--items", type=int, default=200)
+    p.add_argument("--latency", type=float, default=0.05, help="seconds per Twilio request")
+    p.add_argument("--rate", type=float, default=50, help="global sends per second")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--replies", type=int, default=20, help="replies to users sent while the batch drains")
+    p.add_argument("--interval", type=float, default=0.1, help="seconds between those replies")
+    p.set_defaults(func=bench_notify)
+
+    p = sub.add_parser("ship-batch", help=bench_ship_batch.__doc__)
+    p.add_argument("--products", default="../shop/out/products.json")
+    p.add_argument("--size", type=int, default=2000, help="catalog size")
+    p.add_argument("--orders", type=int, default=60)
+    p.add_argument("--latency", type=float, default=0.2, help="seconds per carrier call")
+    p.add_argument("--workers", type=int, default=8)
+    p.set_defaults(func=bench_ship_batch)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# bot/catalog.py (home-page aggregates kept up to date on every catalog write)
+import bisect
+import json
+import os
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from itertools import islice
+
+LATEST_PRODUCTS = 12
+LATEST_REELS = 6
+FEATURED_SELLERS = 6
+
+
+class HomeAggregates:
+    """What the home page shows, maintained incrementally instead of recomputed per build.
+
+    Matches the old full scans exactly: the latest products and reels are the tail
+    of the catalog, featured sellers are the first sellers in catalog order (each
+    described by their earliest product), and category counts cover every product.
+    Writes cost O(log sellers) plus O(shown) when a shown item is removed; reads are
+    O(items shown).
+    """
+
+    def __init__(self, latest: int = LATEST_PRODUCTS, reels: int = LATEST_REELS, featured: int = FEATURED_SELLERS):
+        self.featured = featured
+        self.signature = None
+        self._lock = threading.RLock()
+        self._latest = deque(maxlen=latest)
+        self._reels = deque(maxlen=reels)
+        self.fit([], [])
+
+    def fit(self, products: list, reels: list) -> "HomeAggregates":
+        """Rebuild everything from full catalog lists (once per process, or after an outside write)"""
+        with self._lock:
+            self._seq = 0
+            self._products = {}          # id -> product, in catalog order
+            self._positions = {}         # id -> sequence number (catalog position)
+            self._by_seller = {}         # phone -> {id: None} in catalog order
+            self._seller_order = []      # sorted (first product's position, phone)
+            self._categories = Counter()
+            self._latest.clear()
+            for product in products:
+                if product.get("id") in self._products:
+                    self._detach(product["id"])
+                self._append(product)
+            self._reels.clear()
+            self._reels.extend(reels)
+        return self
+
+    def _append(self, product: dict):
+        product_id = product.get("id")
+        if not product_id:
+            return
+        self._seq += 1
+        self._products[product_id] = product
+        self._positions[product_id] = self._seq
+        self._categories[product.get("category")] += 1
+        self._latest.append(product_id)
+        phone = product.get("artisan_phone")
+        if phone:
+            owned = self._by_seller.get(phone)
+            if owned is None:
+                self._by_seller[phone] = {product_id: None}
+                bisect.insort(self._seller_order, (self._seq, phone))
+            else:
+                owned[product_id] = None
+
+    def _detach(self, product_id: str):
+        product = self._products.pop(product_id)
+        position = self._positions.pop(product_id)
+        self._categories[product.get("category")] -= 1
+        if not self._categories[product.get("category")]:
+            del self._categories[product.get("category")]
+        phone = product.get("artisan_phone")
+        if phone:
+            owned = self._by_seller[phone]
+            was_first = next(iter(owned)) == product_id
+            del owned[product_id]
+            if was_first:
+                self._seller_order.pop(bisect.bisect_left(self._seller_order, (position, phone)))
+                if owned:
+                    bisect.insort(self._seller_order, (self._positions[next(iter(owned))], phone))
+                else:
+                    del self._by_seller[phone]
+        if product_id in self._latest:
+            # Refill from the catalog tail; only the last few entries are touched
+            tail = list(islice(reversed(self._products), self._latest.maxlen))
+            self._latest.clear()
+            self._latest.extend(reversed(tail))
+
+    def add_product(self, product: dict):
+        """A product appended to the catalog (an existing id is moved to the end, as update_products_json does)"""
+        with self._lock:
+            if product.get("id") in self._products:
+                self._detach(product["id"])
+            self._append(product)
+
+    def update_product(self, product: dict):
+        """A product edited in place, keeping its catalog position"""
+        with self._lock:
+            product_id = product.get("id")
+            old = self._products.get(product_id)
+            if old is None:
+                return self._append(product)
+            if old.get("artisan_phone") != product.get("artisan_phone"):
+                # Rare (a product moved to another seller): refit at the same catalog position
+                products = [product if pid == product_id else p for pid, p in self._products.items()]
+                return self.fit(products, list(self._reels))
+            self._products[product_id] = product
+            self._categories[old.get("category")] -= 1
+            if not self._categories[old.get("category")]:
+                del self._categories[old.get("category")]
+            self._categories[product.get("category")] += 1
+
+    def remove_product(self, product_id: str):
+        with self._lock:
+            if product_id in self._products:
+                self._detach(product_id)
+
+    def add_reel(self, reel: dict):
+        with self._lock:
+            self._reels.append(reel)
+
+    def latest_products(self) -> list:
+        with self._lock:
+            return [self._products[product_id] for product_id in self._latest]
+
+    def latest_reels(self) -> list:
+        with self._lock:
+            return list(self._reels)
+
+    def featured_sellers(self) -> list:
+        """(phone, earliest product, product count) for the first sellers in catalog order"""
+        with self._lock:
+            featured = []
+            for _, phone in self._seller_order[:self.featured]:
+                owned = self._by_seller[phone]
+                featured.append((phone, self._products[next(iter(owned))], len(owned)))
+            return featured
+
+    def category_counts(self) -> dict:
+        with self._lock:
+            return {category: count for category, count in self._categories.items() if category}
+
+    def __len__(self):
+        return len(self._products)
+
+
+def _signature(out_dir: str) -> tuple:
+    signature = []
+    for name in ("products.json", "reels.json"):
+        try:
+            stat = os.stat(os.path.join(out_dir, name))
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _read_list(path: str, key: str) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f).get(key, [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [item for item in items if isinstance(item, dict)]
+
+
+home = HomeAggregates()
+_loaded_from = None
+_write_lock = threading.RLock()
+
+
+def load_home(out_dir: str = "../shop/out") -> HomeAggregates:
+    """The shared aggregates, refitted only if the catalog files changed behind our back"""
+    global _loaded_from
+    with _write_lock:
+        signature = _signature(out_dir)
+        if _loaded_from != out_dir or home.signature != signature:
+            home.fit(_read_list(os.path.join(out_dir, "products.json"), "products"),
+                     _read_list(os.path.join(out_dir, "reels.json"), "reels"))
+            home.signature = signature
+            _loaded_from = out_dir
+        return home
+
+
+@contextmanager
+def catalog_write(out_dir: str = "../shop/out"):
+    """Wrap a products.json / reels.json write: yields the aggregates to update alongside it.
+
+    On exit the files' new state is recorded as in sync, so the next load_home()
+    keeps the incremental state instead of re-reading the catalog.
+    """
+    with _write_lock:
+        aggregates = load_home(out_dir)
+        yield aggregates
+        aggregates.signature = _signature(out_dir)
@@ -0,0 +1,240 @@
+# bot/category_classifier.py (Aho-Corasick keyword classifier for product categories)
+import json
+import os
+import sys
+from collections import deque
+
+CATEGORIES = [
+    "pottery", "textiles", "jewelry", "paintings", "wooden",
+    "metalwork", "leather", "papercraft", "home-decor", "accessories"
+]
+DEFAULT_CATEGORY = "handmade"
+
+# term -> weight per category. A trailing "*" matches any word ending
+# ("weav*" matches weaver, weaving); other Latin terms must end at a word
+# boundary, optionally followed by a plural "s". Devanagari terms match anywhere.
+DEFAULT_LEXICON = {
+    "pottery": {
+        "pottery": 3, "potter*": 2, "pot": 2, "terracotta": 3, "ceramic*": 3, "clay": 2,
+        "stoneware": 3, "earthen*": 2, "diya": 2, "kulhad": 3, "matka": 3, "mitti": 2,
+        "wheel thrown": 2, "glaze*": 1,
+        "मिट्टी": 2, "मिट्टी के बर्तन": 3, "मटका": 3, "कुल्हड़": 3, "दीया": 2, "बर्तन": 1,
+    },
+    "textiles": {
+        "textile*": 3, "saree": 3, "sari": 3, "kurta": 3, "dupatta": 3, "shawl": 3, "stole": 2,
+        "handloom": 3, "loom": 2, "weav*": 2, "fabric": 2, "cloth": 2, "cotton": 1, "silk": 2,
+        "khadi": 3, "embroider*": 2, "kantha": 3, "phulkari": 3, "ikat": 3, "bandhani": 3,
+        "chikankari": 3, "quilt": 2, "block print*": 2,
+        "साड़ी": 3, "कुर्ता": 3, "दुपट्टा": 3, "शॉल": 3, "हथकरघा": 3, "कढ़ाई": 2, "कपड़ा": 2,
+        "saadi": 2, "kapda": 2,
+    },
+    "jewelry": {
+        "jewelry": 3, "jewellery": 3, "necklace": 3, "earring": 3, "bangle": 3, "bracelet": 3,
+        "ring": 2, "anklet": 3, "payal": 3, "jhumka": 3, "jhumki": 3, "nose pin": 3, "pendant": 3,
+        "kundan": 3, "oxidised": 2, "oxidized": 2, "bead": 2, "choker": 3,
+        "गहने": 3, "झुमका": 3, "चूड़ी": 3, "कंगन": 3, "पायल": 3, "हार": 1,
+        "gehne": 3, "choodi": 3, "kangan": 3,
+    },
+    "paintings": {
+        "painting": 3, "painted": 1, "canvas": 2, "portrait": 3, "sketch": 2, "madhubani": 3,
+        "warli": 3, "pattachitra": 3, "tanjore": 3, "gond": 3, "kalamkari": 2, "watercolor": 2,
+        "watercolour": 2, "line art": 2, "mural": 2, "artwork": 1,
+        "चित्र": 2, "चित्रकला": 3, "पेंटिंग": 3, "chitra": 2,
+    },
+    "wooden": {
+        "wooden": 3, "wood": 2, "woodcarving": 3, "wood carving": 3, "teak": 2, "rosewood": 2,
+        "sandalwood": 2, "bamboo": 2, "carv*": 2, "channapatna": 3,
+        "लकड़ी": 3, "lakdi": 3, "lakadi": 3,
+    },
+    "metalwork": {
+        "metalwork": 3, "metal": 2, "brass": 3, "copper": 2, "bronze": 3, "bidri": 3, "dhokra": 3,
+        "dokra": 3, "iron": 1, "pewter": 2,
+        "पीतल": 3, "तांबा": 3, "धातु": 2, "peetal": 3, "pital": 3, "tamba": 3,
+    },
+    "leather": {
+        "leather": 3, "kolhapuri": 3, "jutti": 3, "mojari": 3,
+        "चमड़ा": 3, "चमड़े": 3, "chamda": 3,
+    },
+    "papercraft": {
+        "papercraft": 3, "paper": 2, "origami": 3, "papier*": 3, "quilling": 3,
+        "कागज़": 2, "कागज": 2, "kagaz": 2,
+    },
+    "home-decor": {
+        "home-decor": 3, "home decor": 3, "homedecor": 3, "decor": 2, "candle": 2, "lamp": 2,
+        "lantern": 2, "cushion": 2, "wall hanging": 3, "vase": 2, "toran": 3, "string art": 2,
+        "dreamcatcher": 2, "rangoli": 1,
+        "मोमबत्ती": 3, "दीपक": 2, "तोरण": 3, "sajavat": 3,
+    },
+    "accessories": {
+        "accessor*": 3, "bag": 2, "clutch": 2, "purse": 2, "potli": 3, "wallet": 2,
+        "keychain": 2, "hair clip": 2, "scarf": 1,
+        "थैला": 2, "बटुआ": 2, "jhola": 2,
+    },
+}
+
+
+def load_lexicon(path: str = None) -> dict:
+    """Default lexicon, extended or overridden by a JSON file of {category: {term: weight}}"""
+    lexicon = {category: dict(terms) for category, terms in DEFAULT_LEXICON.items()}
+    path = path or os.getenv("CATEGORY_LEXICON")
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for category, terms in json.load(f).items():
+                    lexicon.setdefault(category, {}).update(terms)
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to load category lexicon {path}: {e}")
+    return lexicon
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() and char.isascii()
+
+
+class CategoryClassifier:
+    """Weighted multi-pattern automaton scoring every category in one pass over the text"""
+
+    def __init__(self, lexicon: dict, default: str = DEFAULT_CATEGORY, min_score: float = 2):
+        self.default = default
+        self.min_score = min_score
+        self.categories = list(lexicon)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for category, terms in lexicon.items():
+            for term, weight in terms.items():
+                self._add(term.lower(), category, weight)
+        self._build_failure_links()
+
+    def _add(self, term: str, category: str, weight: float):
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        state = 0
+        for char in term:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        # Boundary checks only make sense for Latin-script terms
+        bounded = _is_word_char(term[0])
+        self._out[state].append((category, weight, len(term), prefix, bounded))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state:
+                    fallback = self._fail[state]
+                    while fallback and char not in self._goto[fallback]:
+                        fallback = self._fail[fallback]
+                    self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        # Resolve failure links into a full transition table so scanning is one dict lookup per character
+        self._delta = [None] * len(self._goto)
+        self._delta[0] = dict(self._goto[0])
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+            queue.extend(self._goto[state].values())
+
+    @staticmethod
+    def _starts_word(text: str, start: int) -> bool:
+        if start == 0:
+            return True
+        before, first = text[start - 1], text[start]
+        # CamelCase hashtags: #HandmadeJewelry starts a word at "J"
+        return not _is_word_char(before) or (before.islower() and first.isupper())
+
+    @staticmethod
+    def _ends_word(text: str, end: int) -> bool:
+        if end >= len(text):
+            return True
+        after = text[end]
+        if not _is_word_char(after) or (after.isupper() and text[end - 1].islower()):
+            return True
+        if after in "sS":
+            return end + 1 >= len(text) or not _is_word_char(text[end + 1]) or text[end + 1].isupper()
+        return False
+
+    def score(self, text: str) -> dict:
+        """Return {category: (score, first_position)} for every category found in text"""
+        scores = {}
+        if not text:
+            return scores
+        lowered = text.lower()
+        original = text if len(lowered) == len(text) else lowered
+        delta, out = self._delta, self._out
+        state = 0
+        for i, char in enumerate(lowered):
+            state = delta[state].get(char, 0)
+            if not out[state]:
+                continue
+            for category, weight, length, prefix, bounded in out[state]:
+                start = i - length + 1
+                if bounded and not (self._starts_word(original, start) and (prefix or self._ends_word(original, i + 1))):
+                    continue
+                total, first = scores.get(category, (0, start))
+                scores[category] = (total + weight, first)
+        return scores
+
+    def classify(self, text: str) -> str:
+        """Highest-scoring category (earliest match wins ties), or the default below min_score"""
+        scores = self.score(text)
+        if not scores:
+            return self.default
+        category, (total, _) = max(scores.items(), key=lambda item: (item[1][0], -item[1][1]))
+        return category if total >= self.min_score else self.default
+
+
+# Compiled once at import
+classifier = CategoryClassifier(load_lexicon())
+
+
+def classify_category(text: str) -> str:
+    return classifier.classify(text)
+
+
+def recategorize_products(products: list, only_default: bool = True) -> list:
+    """Re-run classification over catalog records in place; returns (id, old, new) for changes"""
+    changes = []
+    for product in products:
+        old = product.get("category") or DEFAULT_CATEGORY
+        if only_default and old != DEFAULT_CATEGORY:
+            continue
+        text = f"{product.get('title', '')}\n{product.get('description', '')}\n{' '.join(product.get('tags') or [])}"
+        new = classifier.classify(text)
+        if new != old:
+            product["category"] = new
+            changes.append((product.get("id"), old, new))
+    return changes
+
+
+def recategorize_catalog(products_file: str = "../shop/out/products.json", only_default: bool = True,
+                         write: bool = False) -> list:
+    """Batch mode over products.json; writes the file back atomically when write=True"""
+    with open(products_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    changes = recategorize_products(data.get("products", []), only_default)
+    if write and changes:
+        tmp_file = f"{products_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, products_file)
+    return changes
+
+
+if __name__ == "__main__":
+    # python category_classifier.py [products.json] [--all] [--write]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    products_file = args[0] if args else "../shop/out/products.json"
+    changes = recategorize_catalog(products_file, only_default="--all" not in sys.argv, write="--write" in sys.argv)
+    for product_id, old, new in changes:
+        print(f"{product_id}: {old} -> {new}")
+    print(f"✅ {len(changes)} products recategorized" + ("" if "--write" in sys.argv else " (dry run, pass --write to save)"))
@@ -39,13 +39,13 @@ except Exception as e:
     def remove_bg_and_upload(path): return [f"https://storage.googleapis.com/craftlink-images/fallback{i}.jpg" for i in range(1,5)]
 
 try:
-    from deploy_shop import build_and_host, update_products_json
+    from deploy_shop import publish_product, update_products_json
     DEPLOY_AVAILABLE = True
     logger.info("Deploy shop loaded successfully")
 except Exception as e:
     logger.error(f"Deploy shop not available: {e}")
     DEPLOY_AVAILABLE = False
-    def build_and_host(product_id, description, images): return f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
+    def publish_product(product): return f"https://neethi-saarathi-ids.web.app/product/{product['id']}.html"
     def update_products_json(data): pass
 
 # Set Google credentials
@@ -171,10 +171,7 @@ def handle_edit_command(phone_number: str, message: str, media_url: str = None)
             # Redeploy the shop with updated product
             product_data = get_product(product_id)
             if product_data:
-                if DEPLOY_AVAILABLE:
-                    build_and_host(product_id, product_data.get('description', ''), product_data.get('images', []))
-                else:
-                    build_and_host(product_id, product_data.get('description', ''), product_data.get('images', []))
+                publish_product(product_data)
             return f"✅ Updated {field} for product {product_id[:8]}"
         else:
             return "❌ Product not found. Check the product ID."
@@ -264,17 +261,7 @@ async def process_image_async(media_url: str, phone_number: str):
             logger.error(f"Image processing failed: {e}")
             image_urls = [f"https://storage.googleapis.com/craftlink-images/fallback{i}.jpg" for i in range(1,5)]
         
-        # Step 3: Generate shop URL
         product_id = str(uuid.uuid4())
-        try:
-            if DEPLOY_AVAILABLE:
-                shop_url = build_and_host(product_id, analysis, image_urls)
-            else:
-                shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
-            logger.info(f"Shop URL generated: {shop_url}")
-        except Exception as e:
-            logger.error(f"Deployment failed: {e}")
-            shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
         
         # Update products.json with user reference
         product_data = {
@@ -290,6 +277,17 @@ async def process_image_async(media_url: str, phone_number: str):
         }
         update_products_json(product_data)
         
+        # Step 3: Render the page from the record just saved
+        try:
+            if DEPLOY_AVAILABLE:
+                shop_url = publish_product(product_data)
+            else:
+                shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
+            logger.info(f"Shop URL generated: {shop_url}")
+        except Exception as e:
+            logger.error(f"Deployment failed: {e}")
+            shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
+        
         # Send shop link
         twilio_client.messages.create(
             body=f"🛍️ Your shop is ready: {shop_url}",
@@ -451,7 +449,7 @@ async def api_create_product(
         
         # Build product page
         if DEPLOY_AVAILABLE:
-            shop_url = build_and_host(product_id, description, image_urls)
+            shop_url = publish_product(product_data)
         else:
             shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
         
@@ -0,0 +1,230 @@
+# bot/command_router.py (WhatsApp commands matched by first word, cheap ones inline, heavy ones in the background)
+import asyncio
+import inspect
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# An inline handler slower than this is logged: it should be declared blocking or heavy
+CHEAP_BUDGET = 0.25
+
+
+@dataclass
+class Message:
+    """One incoming WhatsApp message, as the webhook form describes it"""
+    phone: str
+    body: str = ""
+    num_media: str = "0"
+    media_url: Optional[str] = None
+    media_type: Optional[str] = None
+
+    def __post_init__(self):
+        self.text = self.body.strip().lower()
+        first, _, rest = self.body.strip().partition(" ")
+        self.token = first.lower()
+        # The words after the command, as typed
+        self.args = rest.strip()
+
+    @property
+    def media(self) -> Optional[str]:
+        """"video", "image" or None"""
+        if self.num_media == "0" or not self.media_url:
+            return None
+        return "video" if self.media_type and "video" in self.media_type else "image"
+
+
+@dataclass(frozen=True)
+class Command:
+    """A handler and how it may be run.
+
+    Cheap handlers answer within the webhook: inline on the event loop, or on the
+    router's bounded thread pool if they are blocking (file I/O, renders). Heavy ones
+    are acknowledged with ack straight away and run by the background workers, their
+    text result (if any) sent to the user afterwards. media picks the messages a
+    variant applies to: None for any, "none" for text only, "image", "video" or "any".
+    """
+    name: str
+    handler: Callable
+    heavy: bool = False
+    ack: object = None
+    media: Optional[str] = None
+    blocking: bool = False
+
+    def accepts(self, media: Optional[str]) -> bool:
+        if self.media is None:
+            return True
+        if self.media == "none":
+            return media is None
+        return media is not None and self.media in ("any", media)
+
+
+class BackgroundJobs:
+    """A fixed number of asyncio workers taking heavy handler calls round-robin across senders.
+
+    Each sender has its own FIFO lane and workers take one job from each lane
+    in turn, so one artisan sending forty photos waits behind their own photos,
+    not in front of everyone else's. Sync handlers run in a thread so they never
+    block the event loop; async ones are awaited. submit() returns False when
+    all lanes together hold max_pending jobs or the sender's lane holds
+    max_per_sender, so a burst is refused up front instead of piling up.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 100, max_per_sender: int = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_sender = max_per_sender or max_pending
+        self._lanes = OrderedDict()      # sender -> deque of jobs; the next lane to serve first
+        self._pending = 0
+        self._ready = None               # counts queued jobs; a worker acquires one per job
+        self._tasks = []
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def _start(self):
+        if self._ready is None or not self._tasks or all(task.done() for task in self._tasks):
+            self._lanes.clear()
+            self._pending = 0
+            self._ready = asyncio.Semaphore(0)
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def submit(self, name: str, handler: Callable, arg, deliver: Callable = None, sender: str = "") -> bool:
+        """Queue handler(arg) in sender's lane; a str result goes to deliver(result). Must be called from the event loop."""
+        self._start()
+        lane = self._lanes.get(sender)
+        if self._pending >= self.max_pending or (lane is not None and len(lane) >= self.max_per_sender):
+            self.stats["rejected"] += 1
+            return False
+        if lane is None:
+            lane = self._lanes[sender] = deque()
+        lane.append((name, handler, arg, deliver))
+        self._pending += 1
+        self.stats["submitted"] += 1
+        self._ready.release()
+        return True
+
+    async def _next(self):
+        await self._ready.acquire()
+        sender, lane = next(iter(self._lanes.items()))
+        job = lane.popleft()
+        if lane:
+            self._lanes.move_to_end(sender)
+        else:
+            del self._lanes[sender]
+        self._pending -= 1
+        return job
+
+    async def _work(self):
+        while True:
+            name, handler, arg, deliver = await self._next()
+            try:
+                if inspect.iscoroutinefunction(handler):
+                    result = await handler(arg)
+                else:
+                    result = await asyncio.to_thread(handler, arg)
+                if deliver and isinstance(result, str):
+                    await asyncio.to_thread(deliver, result)
+                self.stats["completed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Background job {name} failed: {e}")
+
+    def status(self) -> dict:
+        return {"workers": self.workers, "pending": self._pending, "senders": len(self._lanes), **self.stats}
+
+
+class CommandRouter:
+    """Dispatch table for WhatsApp messages.
+
+    Whole-message phrases ("my items") are looked up first, then the first word,
+    each in one dict; messages matching no command go to the media fallbacks and
+    then the default handler.
+    """
+
+    def __init__(self, jobs: BackgroundJobs, deliver: Callable = None, busy_reply: object = None, threads: int = 8):
+        self.jobs = jobs
+        self.deliver = deliver
+        self.busy_reply = busy_reply
+        # Bounded, and separate from the background jobs, so slow media work can't starve replies
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="command")
+        self._commands = {}      # first word -> [Command variants]
+        self._phrases = {}       # whole message -> [Command variants]
+        self._fallbacks = []     # media-only commands for messages naming no command
+        self._default = None
+
+    def _check(self, command: Command):
+        if command.heavy and command.ack is None:
+            raise ValueError(f"Heavy command {command.name} needs an ack reply")
+        if not command.heavy and inspect.iscoroutinefunction(command.handler):
+            raise ValueError(f"Command {command.name} is async; register it as heavy")
+        if command.heavy and command.blocking:
+            raise ValueError(f"Command {command.name}: heavy commands already run off the event loop")
+        return command
+
+    def command(self, name: str, *aliases: str, heavy: bool = False, ack: object = None, media: str = None,
+                blocking: bool = False):
+        """Decorator registering handler(message) under a first word and its aliases.
+
+        Multi-word aliases match the whole message. Register more specific media
+        variants before the catch-all one: the first variant that accepts wins.
+        """
+        def register(handler):
+            command = self._check(Command(name, handler, heavy, ack, media, blocking))
+            for word in (name, *aliases):
+                table = self._phrases if " " in word else self._commands
+                table.setdefault(word.lower(), []).append(command)
+            return handler
+        return register
+
+    def fallback(self, name: str, media: str, heavy: bool = False, ack: object = None):
+        """Decorator for messages that name no command but carry media"""
+        def register(handler):
+            self._fallbacks.append(self._check(Command(name, handler, heavy, ack, media)))
+            return handler
+        return register
+
+    def default(self, name: str = "message"):
+        def register(handler):
+            self._default = self._check(Command(name, handler))
+            return handler
+        return register
+
+    def route(self, message: Message) -> Optional[Command]:
+        media = message.media
+        for variants in (self._phrases.get(message.text), self._commands.get(message.token)):
+            for command in variants or ():
+                if command.accepts(media):
+                    return command
+        for command in self._fallbacks:
+            if command.accepts(media):
+                return command
+        return self._default
+
+    async def dispatch(self, message: Message) -> tuple:
+        """(command name, reply): cheap handlers run now, heavy ones are queued behind their ack"""
+        command = self.route(message)
+        if command.heavy:
+            deliver = (lambda text: self.deliver(message.phone, text)) if self.deliver else None
+            if not self.jobs.submit(command.name, command.handler, message, deliver, sender=message.phone):
+                return command.name, self.busy_reply
+            return command.name, command.ack
+
+        if command.blocking:
+            reply = await asyncio.get_running_loop().run_in_executor(self.executor, command.handler, message)
+            return command.name, reply
+
+        start = time.perf_counter()
+        reply = command.handler(message)
+        elapsed = time.perf_counter() - start
+        if elapsed > CHEAP_BUDGET:
+            logger.warning(f"Inline command {command.name} took {elapsed * 1000:.0f} ms and held up the event loop; "
+                           f"mark it blocking or heavy")
+        return command.name, reply
+
+    def commands(self) -> dict:
+        """Registered first words and phrases -> command names, for help and debugging"""
+        table = {**self._commands, **self._phrases}
+        return {word: sorted({c.name for c in variants}) for word, variants in table.items()}
@@ -5,8 +5,9 @@ import uuid
 import os
 from datetime import datetime
 from .imagen_helper import remove_bg_and_upload
-from .deploy_shop import build_and_host
+from .deploy_shop import publish_product, update_products_json
 from .gemini_helper import analyze_product_description
+from .pricing import load_pricing_engine
 
 app = FastAPI()
 
@@ -18,7 +19,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def analyze_product_with_ai(title: str, description: str, category: str):
+def analyze_product_with_ai(title: str, description: str, category: str, material: str = None):
     """Use AI to enhance product description and suggest improvements"""
     prompt = f"""Analyze this handmade product and enhance the description:
 
@@ -40,32 +41,17 @@ Format as JSON with: enhanced_description, price_suggestions, features, tags"""
         return json.loads(response)
     except:
         # Fallback if AI is unavailable
+        suggestion = load_pricing_engine().suggest(category, material)
         return {
             "enhanced_description": f"✨ {description} Beautiful handmade {category} crafted with care and tradition.",
-            "price_suggestions": [299, 499, 799],
+            "price_suggestions": [suggestion["budget"], suggestion["standard"], suggestion["premium"]],
             "features": ["Handmade", "Eco-friendly", "Traditional craftsmanship"],
             "tags": ["handmade", category, "artisan"]
         }
 
 def suggest_pricing(category: str, material: str):
     """Suggest pricing based on category and material"""
-    base_prices = {
-        'pottery': {'clay': 399, 'terracotta': 499, 'ceramic': 699},
-        'textiles': {'cotton': 599, 'silk': 1299, 'wool': 899},
-        'jewelry': {'silver': 799, 'gold': 2999, 'beads': 399},
-        'paintings': {'canvas': 999, 'paper': 499, 'wall': 1499},
-        'wooden': {'teak': 899, 'rosewood': 1299, 'bamboo': 499},
-        'default': 499
-    }
-    
-    material = material.lower() if material else ''
-    category_data = base_prices.get(category, base_prices['default'])
-    
-    for mat, price in category_data.items():
-        if mat in material:
-            return price
-    
-    return category_data.get('default', 499)
+    return load_pricing_engine().suggest(category, material)["standard"]
 
 @app.post("/api/create-product")
 async def create_product(
@@ -83,7 +69,7 @@ async def create_product(
 ):
     try:
         # Analyze product with AI
-        ai_analysis = analyze_product_with_ai(title, description, category)
+        ai_analysis = analyze_product_with_ai(title, description, category, material)
         
         # Process images
         image_urls = []
@@ -122,22 +108,17 @@ async def create_product(
             "whatsapp_number": whatsapp_number
         }
         
-        # Update products.json
-        products_file = "../shop/out/products.json"
-        if os.path.exists(products_file):
-            with open(products_file, "r") as f:
-                data = json.load(f)
-        else:
-            data = {"products": []}
+        # Fit the pricing engine before the write, so add() is the only place the product is counted
+        pricing = load_pricing_engine()
         
-        data["products"].append(product_data)
-        data["products"] = data["products"][-50:]  # Keep last 50 products
+        # Update products.json, the partitions, search index and home aggregates; no product is dropped
+        update_products_json(product_data)
         
-        with open(products_file, "w") as f:
-            json.dump(data, f, indent=2)
+        # Keep price statistics current
+        pricing.add(product_data)
         
         # Create product page
-        shop_url = build_and_host(product_id, product_data['description'], product_data['images'])
+        shop_url = publish_product(product_data)
         
         return {
             "success": True,
@@ -0,0 +1,255 @@
+# bot/deploy_scheduler.py (debounced, single-flight deploys of the static shop)
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class DirectoryDeployer:
+    """Mirror shop/out into a local directory: an rsync stand-in for Firebase in tests"""
+
+    def __init__(self, target: str, source: str = "../shop/out"):
+        self.source = source
+        self.target = target
+
+    def __call__(self) -> bool:
+        os.makedirs(self.target, exist_ok=True)
+        if shutil.which("rsync"):
+            result = subprocess.run(
+                ["rsync", "-a", "--delete", f"{self.source}/", f"{self.target}/"],
+                capture_output=True, text=True, timeout=300
+            )
+            if result.returncode != 0:
+                print(f"❌ rsync failed: {result.stderr}")
+            return result.returncode == 0
+        self._mirror()
+        return True
+
+    def _mirror(self):
+        """Pure-Python fallback: copy new or changed files, delete ones gone from the source"""
+        seen = set()
+        for folder, _, files in os.walk(self.source):
+            rel_folder = os.path.relpath(folder, self.source)
+            os.makedirs(os.path.join(self.target, rel_folder), exist_ok=True)
+            for name in files:
+                rel = os.path.normpath(os.path.join(rel_folder, name))
+                seen.add(rel)
+                src, dst = os.path.join(self.source, rel), os.path.join(self.target, rel)
+                src_stat = os.stat(src)
+                if os.path.exists(dst):
+                    dst_stat = os.stat(dst)
+                    if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime >= src_stat.st_mtime:
+                        continue
+                shutil.copy2(src, dst)
+        for folder, _, files in os.walk(self.target):
+            for name in files:
+                rel = os.path.normpath(os.path.relpath(os.path.join(folder, name), self.target))
+                if rel not in seen:
+                    os.remove(os.path.join(self.target, rel))
+
+
+def make_deployer(target: str = None):
+    """DEPLOY_TARGET: "firebase" (default), "dir:/path" or "http://host" for a differential
+    publish, or "rsync:/path" for a plain directory mirror.
+
+    Firebase stays the default because it is where the shop is hosted, and it is
+    differential too: the CLI hashes every file and uploads only the hashes the
+    hosting backend does not already hold. The other targets need a host that
+    exposes a writable directory or the publish API, which Firebase does not.
+    """
+    target = target or os.getenv("DEPLOY_TARGET", "firebase")
+    if target.startswith("rsync:"):
+        return DirectoryDeployer(target[len("rsync:"):])
+    if target.startswith("dir:"):
+        from publish import DirectoryTarget, Publisher
+        return Publisher(DirectoryTarget(target[len("dir:"):]))
+    if target.startswith(("http://", "https://")):
+        from publish import HttpTarget, Publisher
+        return Publisher(HttpTarget(target))
+    from deploy_shop import deploy_to_firebase
+    return deploy_to_firebase
+
+
+class DeployScheduler:
+    """Coalesces site changes into debounced deploys, one at a time.
+
+    mark_dirty() only records the change. A single worker thread deploys once
+    changes have been quiet for `debounce` seconds (or have waited `window`
+    seconds), and never starts two deploys less than `window` seconds apart.
+    Failed deploys are retried with exponential backoff.
+    """
+
+    def __init__(self, deployer=None, window: float = 60, debounce: float = 5,
+                 max_retries: int = 3, retry_backoff: float = 10):
+        # Resolved on first deploy, so importing this module never imports deploy_shop
+        self.deployer = deployer
+        self.window = window
+        self.debounce = debounce
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._pending = 0
+        self._reasons = deque(maxlen=20)
+        self._first_change = None
+        self._last_change = None
+        self._last_start = None
+        self._retry_at = None
+        self._attempts = 0
+        self._state = "idle"
+        self._generation = 0
+        self._deployed_generation = 0
+        self.history = deque(maxlen=20)
+        self.stats = {"changes": 0, "deploys": 0, "failures": 0, "coalesced": 0}
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="deploy-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self, flush: bool = False, timeout: float = None):
+        if flush:
+            self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def mark_dirty(self, reason: str = "update"):
+        """Record a change to the site; returns immediately"""
+        self.start()
+        now = time.monotonic()
+        with self._cond:
+            if self._pending:
+                self.stats["coalesced"] += 1
+            self._pending += 1
+            self._generation += 1
+            self._first_change = self._first_change or now
+            self._last_change = now
+            self._reasons.append(f"{datetime.now().strftime('%H:%M:%S')} {reason}")
+            self.stats["changes"] += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Deploy pending changes now (still one at a time) and wait; True if they went out"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            target = self._generation
+            self._first_change = self._last_change = self._last_start = self._retry_at = None
+            self._cond.notify_all()
+            while self._deployed_generation < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self.history or self.history[-1]["ok"]
+
+    def _due_in(self, now: float) -> float:
+        """Seconds until the pending batch may deploy (0 = now)"""
+        if self._retry_at is not None:
+            return max(0.0, self._retry_at - now)
+        if self._first_change is None:
+            return 0.0
+        quiet = self._last_change + self.debounce
+        waited_enough = self._first_change + self.window
+        due = min(quiet, waited_enough)
+        if self._last_start is not None:
+            due = max(due, self._last_start + self.window)
+        return max(0.0, due - now)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if self._pending:
+                        wait = self._due_in(time.monotonic())
+                        if wait <= 0:
+                            break
+                        self._state = "backoff" if self._retry_at else "waiting"
+                        self._cond.wait(wait)
+                    else:
+                        self._state = "idle"
+                        self._cond.wait()
+                if self._stopping:
+                    self._state = "stopped"
+                    return
+                # Take the whole batch; changes arriving during the deploy start a new one
+                batch, generation = self._pending, self._generation
+                reasons = list(self._reasons)
+                self._pending = 0
+                self._reasons.clear()
+                self._first_change = self._last_change = self._retry_at = None
+                self._last_start = time.monotonic()
+                self._state = "deploying"
+
+            started = time.monotonic()
+            try:
+                if self.deployer is None:
+                    self.deployer = make_deployer()
+                ok, detail = bool(self.deployer()), ""
+            except Exception as e:
+                ok, detail = False, str(e)
+            duration = time.monotonic() - started
+
+            with self._cond:
+                self.history.append({
+                    "started_at": datetime.now().isoformat(timespec="seconds"),
+                    "duration": round(duration, 2),
+                    "changes": batch,
+                    "ok": ok,
+                    "attempt": self._attempts + 1,
+                    "detail": detail,
+                })
+                if ok:
+                    self.stats["deploys"] += 1
+                    self._attempts = 0
+                    self._deployed_generation = generation
+                else:
+                    self.stats["failures"] += 1
+                    self._attempts += 1
+                    if self._attempts <= self.max_retries:
+                        # Put the batch back and retry after a backoff
+                        self._pending += batch
+                        self._reasons.extendleft(reversed(reasons))
+                        self._retry_at = time.monotonic() + self.retry_backoff * 2 ** (self._attempts - 1)
+                    else:
+                        print(f"❌ Deploy failed {self._attempts} times, giving up until the next change")
+                        self._attempts = 0
+                        self._deployed_generation = generation
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "state": self._state,
+                "pending_changes": self._pending,
+                "pending_reasons": list(self._reasons),
+                "next_deploy_in": round(self._due_in(now), 1) if self._pending else None,
+                "retry_attempt": self._attempts,
+                "window": self.window,
+                "debounce": self.debounce,
+                "last_deploy": self.history[-1] if self.history else None,
+                "history": list(self.history),
+                **self.stats,
+            }
+
+
+deploy_scheduler = DeployScheduler(
+    window=float(os.getenv("DEPLOY_WINDOW", "60")),
+    debounce=float(os.getenv("DEPLOY_DEBOUNCE", "5")),
+    max_retries=int(os.getenv("DEPLOY_RETRIES", "3")),
+)
+
+
+def schedule_deploy(reason: str = "update"):
+    deploy_scheduler.mark_dirty(reason)
@@ -2,16 +2,60 @@
 import os
 import vertexai
 import json
-import re
 from vertexai.preview.generative_models import GenerativeModel, Part
+from llm_cache import ResponseCache, make_cache_key
+from rate_limit import RateGovernor, INTERACTIVE, BULK, estimate_tokens
+from product_extract import ProductInfo, extract_product_info, parse_structured_response, STRUCTURED_PROMPT
 
 # Configure Google Cloud
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
 vertexai.init(project="craftlink-2025", location="asia-south1")
 
-model = GenerativeModel("gemini-1.5-flash")
+MODEL_NAME = "gemini-1.5-flash"
+model = GenerativeModel(MODEL_NAME)
 
-def describe_image(image_path: str) -> str:
+# Ask the model for JSON (title, price band, category, tags) instead of free text
+STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED", "0") == "1"
+
+# Response cache: memory LRU in front of a disk tier, identical in-flight prompts share one call
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("GEMINI_CACHE_ENTRIES", "256")),
+    ttl=float(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600))),
+    disk_dir=os.getenv("GEMINI_CACHE_DIR", "cache/gemini") or None,
+    stale_while_revalidate=os.getenv("GEMINI_CACHE_STALE", "0") == "1"
+)
+
+# Shared governor for every model call: quota buckets, max concurrency, priority lanes
+governor = RateGovernor(
+    rpm=int(os.getenv("GEMINI_RPM", "60")),
+    tpm=int(os.getenv("GEMINI_TPM", "60000")),
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+    max_wait=float(os.getenv("GEMINI_MAX_WAIT", "30"))
+)
+
+def set_model(new_model, model_name: str = None):
+    """Swap the underlying model (e.g. llm_cache.FakeModel for offline runs)"""
+    global model, MODEL_NAME
+    model = new_model
+    if model_name:
+        MODEL_NAME = model_name
+
+def generate_cached(contents, prompt: str, attachment: bytes = None, priority: int = BULK) -> str:
+    """Call the model through the response cache; cache misses go through the rate governor"""
+    key = make_cache_key(MODEL_NAME, prompt, attachment)
+    tokens = estimate_tokens(prompt, has_image=attachment is not None)
+    return response_cache.get_or_compute(
+        key, lambda: governor.call(lambda: model.generate_content(contents).text, tokens, priority)
+    )
+
+def get_llm_metrics() -> dict:
+    """Cache and rate governor metrics for the /api/metrics/llm endpoint"""
+    return {
+        "cache": dict(response_cache.stats, hit_rate=round(response_cache.hit_rate(), 3)),
+        "governor": governor.metrics()
+    }
+
+def describe_image(image_path: str, priority: int = INTERACTIVE) -> str:
     with open(image_path, "rb") as f:
         image_bytes = f.read()
     
@@ -20,66 +64,34 @@ def describe_image(image_path: str) -> str:
     Suggest 5 SEO hashtags.
     Price: ₹price_low-price_high. Tags: #tag1 #tag2 #tag3 #tag4 #tag5"""
     
-    response = model.generate_content([Part.from_data(image_bytes, "image/jpeg"), prompt])
-    return response.text
+    return generate_cached([Part.from_data(image_bytes, "image/jpeg"), prompt], prompt, image_bytes, priority)
+
+def describe_product(image_path: str, priority: int = INTERACTIVE) -> ProductInfo:
+    """Describe the image and extract title, price band, category and tags in one go"""
+    if not STRUCTURED_OUTPUT:
+        return extract_product_info(describe_image(image_path, priority))
+
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    text = generate_cached([Part.from_data(image_bytes, "image/jpeg"), STRUCTURED_PROMPT], STRUCTURED_PROMPT, image_bytes, priority)
+    return parse_structured_response(text)
 
 def extract_price_from_description(description: str) -> int:
     """Extract price from AI-generated description"""
-    try:
-        # Look for price patterns like ₹200-400 or 200-400
-        price_match = re.search(r'₹?\s*(\d+)\s*-\s*₹?\s*(\d+)', description)
-        if price_match:
-            low, high = int(price_match.group(1)), int(price_match.group(2))
-            return (low + high) // 2  # Return average price
-        
-        # Look for single price like ₹350
-        single_price_match = re.search(r'₹?\s*(\d+)', description)
-        if single_price_match:
-            return int(single_price_match.group(1))
-    except:
-        pass
-    
-    # Default price if none found
-    return 350
+    return extract_product_info(description).price
 
 def extract_title_from_description(description: str) -> str:
     """Extract a title from the AI-generated description"""
-    try:
-        # Get the first sentence as title
-        first_sentence = description.split('.')[0]
-        if len(first_sentence) > 10:  # Ensure it's meaningful
-            # Remove Hindi and price parts
-            title = re.sub(r'Hindi:.*|Price:.*|Tags:.*', '', first_sentence)
-            title = title.strip()
-            if title and len(title) > 5:
-                return title[:50]  # Limit length
-    except:
-        pass
-    
-    return "Beautiful Handmade Craft"
+    return extract_product_info(description).title
 
 def extract_category_from_description(description: str) -> str:
     """Extract category from AI-generated description"""
-    try:
-        categories = [
-            "pottery", "textiles", "jewelry", "paintings", "wooden",
-            "metalwork", "leather", "papercraft", "home-decor", "accessories"
-        ]
-        
-        description_lower = description.lower()
-        for category in categories:
-            if category in description_lower:
-                return category
-    except:
-        pass
-    
-    return "handmade"
+    return extract_product_info(description).category
 
-def analyze_product_description(prompt: str) -> str:
+def analyze_product_description(prompt: str, priority: int = BULK) -> str:
     """Analyze product description and suggest improvements"""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_cached(prompt, prompt, priority=priority)
     except Exception as e:
         # Fallback response
         return json.dumps({
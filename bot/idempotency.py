@@ -0,0 +1,154 @@
+# bot/idempotency.py (Twilio webhook retries answered once, keyed by MessageSid)
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm_cache import DiskCache
+
+
+class MessageLedger:
+    """MessageSid -> the TwiML first returned for it, kept for ttl seconds.
+
+    Twilio retries a webhook when the reply is slow, with the same MessageSid.
+    The first delivery claims the sid and is processed; a retry arriving while
+    it is still running waits for its reply, and one arriving later gets the
+    stored reply back, so neither starts another model call or upload. Entries
+    live in a bounded in-memory LRU and, with disk_dir, in a DiskCache so a
+    restart between delivery and retry does not reprocess the message. The
+    async path never touches the disk on the event loop: reads go through
+    asyncio.to_thread and writes through one background writer thread.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_entries: int = 10000, disk_dir: str = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk = DiskCache(disk_dir) if disk_dir else None
+        self._disk_writes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger") if disk_dir else None
+        self._entries = OrderedDict()    # sid -> (future, claimed_at)
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+        self.stats = {"processed": 0, "duplicates": 0, "waited": 0, "disk_hits": 0, "failed": 0, "pruned": 0}
+
+    @staticmethod
+    def _key(sid: str) -> str:
+        # DiskCache shards by the first two characters, and every sid starts with "SM"
+        return hashlib.sha256(sid.encode("utf-8")).hexdigest()
+
+    def _claimed(self, sid: str, now: float):
+        """Future of a live in-memory claim on sid, or None; call with the lock held"""
+        entry = self._entries.get(sid)
+        if entry is None or now - entry[1] >= self.ttl:
+            return None
+        self._entries.move_to_end(sid)
+        self.stats["duplicates"] += 1
+        if not entry[0].done():
+            self.stats["waited"] += 1
+        return entry[0]
+
+    def _stored(self, sid: str):
+        return self.disk.get(self._key(sid)) if self.disk else None
+
+    def claim(self, sid: str):
+        """None if the caller should process the message, else a Future of the original reply.
+
+        Reads the disk inline on a memory miss; async callers use claim_or_wait.
+        """
+        now = time.time()
+        with self._lock:
+            original = self._claimed(sid, now)
+        if original is not None:
+            return original
+        return self._claim_stored(sid, now, self._stored(sid))
+
+    def _claim_stored(self, sid: str, now: float, stored):
+        """Finish a claim once the disk has been read: answer from the stored reply or take the sid"""
+        with self._lock:
+            # Another delivery may have claimed it while the disk was read
+            original = self._claimed(sid, now)
+            if original is not None:
+                return original
+            future = Future()
+            if stored is not None and now - stored[1] < self.ttl:
+                future.set_result(stored[0].encode("utf-8"))
+                self._remember(sid, future, stored[1])
+                self.stats["duplicates"] += 1
+                self.stats["disk_hits"] += 1
+                return future
+            self._remember(sid, future, now)
+        return None
+
+    async def claim_or_wait(self, sid: str):
+        """None if the caller should process the message, else the reply of the delivery that did.
+
+        A delivery that was evicted before replying resolves its waiters with
+        None; they then claim the sid again, so exactly one of them takes over
+        and the rest wait for its reply.
+        """
+        while True:
+            now = time.time()
+            with self._lock:
+                original = self._claimed(sid, now)
+            if original is None:
+                # Only a sid this process has not seen reaches the disk, and the read runs off the event loop
+                stored = await asyncio.to_thread(self._stored, sid) if self.disk else None
+                original = self._claim_stored(sid, now, stored)
+                if original is None:
+                    return None
+            content = await asyncio.wrap_future(original)
+            if content is not None:
+                return content
+
+    def _remember(self, sid: str, future: Future, claimed_at: float):
+        self._entries[sid] = (future, claimed_at)
+        self._entries.move_to_end(sid)
+        while len(self._entries) > self.max_entries:
+            _, (oldest, _) = self._entries.popitem(last=False)
+            if not oldest.done():
+                oldest.set_result(None)
+
+    def complete(self, sid: str, content: bytes):
+        """Record the reply for a claimed sid and hand it to any retries waiting on it"""
+        with self._lock:
+            entry = self._entries.get(sid)
+            self.stats["processed"] += 1
+        if entry is not None and not entry[0].done():
+            entry[0].set_result(content)
+        if self.disk:
+            # Waiters already have the reply; the disk copy only matters after a restart
+            self._disk_writes.submit(self.disk.set, self._key(sid), content.decode("utf-8"), entry[1] if entry else None)
+        if time.time() - self._pruned_at > self.ttl:
+            self._pruned_at = time.time()
+            threading.Thread(target=self.prune, daemon=True).start()
+
+    def fail(self, sid: str, content: bytes):
+        """Answer waiting retries with content but forget the sid, so a later retry is processed again"""
+        with self._lock:
+            entry = self._entries.pop(sid, None)
+            self.stats["failed"] += 1
+        if entry is not None and not entry[0].done():
+            entry[0].set_result(content)
+
+    def prune(self):
+        """Delete expired entries from the disk store"""
+        if not self.disk or not os.path.isdir(self.disk.directory):
+            return
+        cutoff = time.time() - self.ttl
+        for shard in os.listdir(self.disk.directory):
+            shard_dir = os.path.join(self.disk.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                path = os.path.join(shard_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        self.stats["pruned"] += 1
+                except OSError:
+                    pass
+
+    def status(self) -> dict:
+        return {"tracked": len(self._entries), "ttl": self.ttl, **self.stats}
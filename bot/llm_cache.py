@@ -0,0 +1,214 @@
+# bot/llm_cache.py (prompt-keyed response cache for Gemini calls)
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so cosmetic prompt differences share a cache entry"""
+    return _WHITESPACE.sub(" ", prompt or "").strip()
+
+
+def make_cache_key(model_name: str, prompt: str, attachment: bytes = None) -> str:
+    """Build a cache key from model name, normalized prompt and optional attachment bytes"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    if attachment is not None:
+        digest.update(b"\x00")
+        digest.update(hashlib.sha256(attachment).digest())
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU of key -> (value, created_at)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, created_at: float = None):
+        with self._lock:
+            self._entries[key] = (value, created_at if created_at is not None else time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """One JSON file per key, sharded by the first two hex characters"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["value"], data["created_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, value, created_at: float = None):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"value": value, "created_at": created_at or time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ Failed to write LLM cache entry: {e}")
+
+
+class ResponseCache:
+    """Memory LRU in front of an optional disk tier, with single-flight coalescing.
+
+    Concurrent callers asking for the same key while a computation is running
+    wait on that computation instead of starting their own. With
+    ``stale_while_revalidate`` an expired entry is returned immediately and
+    refreshed in a background thread.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 7 * 24 * 3600,
+                 disk_dir: str = None, stale_while_revalidate: bool = False):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(disk_dir) if disk_dir else None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "errors": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry, "hits"
+        if self.disk:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry[0], entry[1])
+                return entry, "disk_hits"
+        return None, None
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return self.ttl is None or time.time() - created_at < self.ttl
+
+    def get_or_compute(self, key: str, compute):
+        """Return the cached value for key, calling compute() at most once per key at a time"""
+        entry, tier = self._lookup(key)
+        if entry is not None:
+            value, created_at = entry
+            if self._is_fresh(created_at):
+                self._count(tier)
+                return value
+            if self.stale_while_revalidate:
+                self._count("stale_served")
+                self._revalidate(key, compute)
+                return value
+
+        self._count("misses")
+        return self._single_flight(key, compute)
+
+    def _single_flight(self, key, compute):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            created_at = time.time()
+            self.memory.set(key, value, created_at)
+            if self.disk:
+                self.disk.set(key, value, created_at)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            self._count("errors")
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _revalidate(self, key, compute):
+        with self._lock:
+            if key in self._inflight:
+                return
+
+        def refresh():
+            try:
+                self._single_flight(key, compute)
+            except Exception as e:
+                print(f"❌ Background LLM cache refresh failed: {e}")
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups that did not start a new model call"""
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["stale_served"] + self.stats["misses"]
+        model_calls = self.stats["misses"] - self.stats["coalesced"]
+        return 1 - model_calls / lookups if lookups else 0.0
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Offline stand-in for GenerativeModel with configurable latency"""
+
+    def __init__(self, latency: float = 0.05, responder=None):
+        self.latency = latency
+        self.responder = responder or (lambda contents: f"Fake response for: {str(contents)[-60:]}")
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self.responder(contents))
@@ -4,9 +4,9 @@ import random
 import uuid
 from fastapi import FastAPI, Form, Response, Request, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
 import requests
 from requests.auth import HTTPBasicAuth
 import json
@@ -22,18 +22,36 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Import our modules
+from product_extract import extract_product_info
+from catalog import catalog_write
+from deploy_scheduler import deploy_scheduler, schedule_deploy
+from command_router import BackgroundJobs, CommandRouter, Message
+from webhook_log import WebhookLogger
+from idempotency import MessageLedger
+from rate_limit import SenderLimiter
+from outbound import outbound
+
+# One JSON line per webhook message with phone numbers masked; only a sample of INFO events is kept
+webhook_log = WebhookLogger(logger, sample_rate=float(os.getenv("WEBHOOK_LOG_SAMPLE", "0.1")))
+
+# Replies by MessageSid, so a Twilio retry gets the first reply instead of a second product
+message_ledger = MessageLedger(
+    ttl=float(os.getenv("WEBHOOK_DEDUP_TTL", str(24 * 3600))),
+    max_entries=int(os.getenv("WEBHOOK_DEDUP_ENTRIES", "10000")),
+    disk_dir=os.getenv("WEBHOOK_DEDUP_DIR", "cache/webhooks") or None
+)
+
 try:
-    from gemini_helper import describe_image, analyze_product_description, extract_price_from_description, extract_title_from_description, extract_category_from_description
+    from gemini_helper import describe_image, describe_product, analyze_product_description, get_llm_metrics
     GEMINI_AVAILABLE = True
     logger.info("Gemini helper loaded successfully")
 except Exception as e:
     logger.error(f"Gemini helper not available: {e}")
     GEMINI_AVAILABLE = False
     def describe_image(image_path): return "Beautiful handmade craft with traditional artistry."
+    def describe_product(image_path): return extract_product_info(describe_image(image_path))
     def analyze_product_description(prompt): return '{"enhanced_description": "Handmade with care", "price_suggestions": [299,499,799]}'
-    def extract_price_from_description(desc): return 350
-    def extract_title_from_description(desc): return "Beautiful Handmade Craft"
-    def extract_category_from_description(desc): return "handmade"
+    def get_llm_metrics(): return {}
 
 try:
     from imagen_helper import remove_bg_and_upload, upload_video
@@ -46,13 +64,13 @@ except Exception as e:
     def upload_video(path): return f"https://storage.googleapis.com/craftlink-videos/fallback.mp4"
 
 try:
-    from deploy_shop import build_and_host, update_products_json, get_all_products, get_product_by_id, update_seller_profile, get_seller_profile, add_reel, get_all_reels, create_shop_index, deploy_to_firebase
+    from deploy_shop import publish_product, update_products_json, get_all_products, get_product_by_id, update_seller_profile, get_seller_profile, add_reel, get_all_reels, create_shop_index, publish_partitions, refresh_search_index
     DEPLOY_AVAILABLE = True
     logger.info("Deploy shop loaded successfully")
 except Exception as e:
     logger.error(f"Deploy shop not available: {e}")
     DEPLOY_AVAILABLE = False
-    def build_and_host(product_id, description, images, title, price): return f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
+    def publish_product(product): return f"https://neethi-saarathi-ids.web.app/product/{product['id']}.html"
     def update_products_json(data): pass
     def get_all_products(): return []
     def get_product_by_id(product_id): return None
@@ -61,10 +79,27 @@ except Exception as e:
     def add_reel(reel_data): pass
     def get_all_reels(): return []
     def create_shop_index(): pass
-    def deploy_to_firebase(): return True
+    def publish_partitions(products=None): pass
+    def refresh_search_index(changed, products=None): pass
+
+try:
+    from pricing import load_pricing_engine
+    PRICING_AVAILABLE = True
+    logger.info("Pricing engine loaded successfully")
+except Exception as e:
+    logger.error(f"Pricing engine not available: {e}")
+    PRICING_AVAILABLE = False
+
+try:
+    from page_server import page_server
+    PAGES_AVAILABLE = True
+    logger.info("Page server loaded successfully")
+except Exception as e:
+    logger.error(f"Page server not available: {e}")
+    PAGES_AVAILABLE = False
 
 try:
-    from ship import create_label
+    from ship import create_label, validate_orders, label_pool
     SHIPPING_AVAILABLE = True
     logger.info("Shipping helper loaded successfully")
 except Exception as e:
@@ -77,13 +112,13 @@ except Exception as e:
     }
 
 try:
-    from sms import send_tracking
+    from sms import send_tracking, notify_tracking, tracking_job_status
     SMS_AVAILABLE = True
     logger.info("SMS helper loaded successfully")
 except Exception as e:
     logger.error(f"SMS helper not available: {e}")
     SMS_AVAILABLE = False
-    def send_tracking(to, awb): print(f"Tracking sent to {to}: {awb}")
+    def send_tracking(to, awb, language="hi"): print(f"Tracking sent to {to}: {awb}")
 
 # Set Google credentials
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
@@ -91,7 +126,6 @@ os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "key.json"
 # Initialize Twilio client
 twilio_sid = os.getenv("TWILIO_ACCOUNT_SID")
 twilio_token = os.getenv("TWILIO_AUTH_TOKEN")
-twilio_client = Client(twilio_sid, twilio_token)
 
 app = FastAPI(title="KalaaSaarathi API")
 
@@ -129,6 +163,10 @@ def save_video(content: bytes, filename: str) -> str:
         f.write(content)
     return filepath
 
+def send_whatsapp(phone_number: str, text: str):
+    """Follow-up message for work finished after the webhook replied: queued, in order per number"""
+    outbound.send(phone_number, text)
+
 def get_product(product_id: str):
     """Get product data from products.json"""
     try:
@@ -148,32 +186,46 @@ def get_product(product_id: str):
 
 def update_product(product_id: str, field: str, value: any) -> bool:
     """Update product in products.json"""
+    return update_product_fields(product_id, {field: value})
+
+def update_product_fields(product_id: str, changes: dict) -> bool:
+    """Apply several field changes in one products.json write, then publish partitions and search once"""
     try:
         products_file = "../shop/out/products.json"
+        # Fitted before the write, so the edit is applied exactly once by update()
+        pricing = load_pricing_engine() if PRICING_AVAILABLE else None
         
-        # Read existing products or create empty array
-        if os.path.exists(products_file):
-            try:
-                with open(products_file, "r") as f:
-                    data = json.load(f)
-            except json.JSONDecodeError:
+        with catalog_write(os.path.dirname(products_file)) as home:
+            # Read existing products or create empty array
+            if os.path.exists(products_file):
+                try:
+                    with open(products_file, "r") as f:
+                        data = json.load(f)
+                except json.JSONDecodeError:
+                    data = {"products": []}
+            else:
                 data = {"products": []}
-        else:
-            data = {"products": []}
-        
-        # Find and update product
-        updated = False
-        for product in data.get("products", []):
-            if product.get("id") == product_id:
-                product[field] = value
-                updated = True
-                break
-        
-        if updated:
-            with open(products_file, "w") as f:
-                json.dump(data, f, indent=2)
-            return True
-        return False
+            
+            # Find and update product
+            updated = previous = None
+            for product in data.get("products", []):
+                if product.get("id") == product_id:
+                    previous = dict(product)
+                    product.update(changes)
+                    updated = product
+                    break
+            
+            if updated:
+                with open(products_file, "w") as f:
+                    json.dump(data, f, indent=2)
+                # Edited in place: the home-page aggregates keep its position
+                home.update_product(updated)
+                publish_partitions(data["products"])
+                refresh_search_index([updated], data["products"])
+                if pricing:
+                    pricing.update(previous, updated)
+                return True
+            return False
         
     except Exception as e:
         logger.error(f"Update product error: {e}")
@@ -229,11 +281,12 @@ def handle_edit_command(phone_number: str, message: str, media_url: str = None)
             product_data = get_product(product_id)
             if product_data:
                 if DEPLOY_AVAILABLE:
-                    build_and_host(product_id, product_data.get('description', ''), product_data.get('images', []), product_data.get('title', ''), product_data.get('price', 350))
-                    # Auto-deploy to Firebase
-                    deploy_to_firebase()
+                    # Re-renders this product's page, its seller page and the index if they changed
+                    create_shop_index()
+                    # Queue a coalesced deploy instead of deploying inline
+                    schedule_deploy("product edit via WhatsApp")
                 else:
-                    build_and_host(product_id, product_data.get('description', ''), product_data.get('images', []), product_data.get('title', ''), product_data.get('price', 350))
+                    publish_product(product_data)
             return f"✅ Updated {field} for product {product_id[:8]}"
         else:
             return "❌ Product not found. Check the product ID."
@@ -335,19 +388,19 @@ async def process_image_async(media_url: str, phone_number: str):
         logger.info(f"Async processing started for {phone_number}")
         
         # Download the image
-        image_content = download_twilio_media(media_url)
+        image_content = await asyncio.to_thread(download_twilio_media, media_url)
         image_filename = f"{uuid.uuid4().hex}.jpg"
-        image_path = save_image(image_content, image_filename)
+        image_path = await asyncio.to_thread(save_image, image_content, image_filename)
         logger.info(f"Image saved to: {image_path}")
         
         # Step 1: Analyze with Gemini
         try:
             if GEMINI_AVAILABLE:
-                analysis = describe_image(image_path)
-                # Extract title, price and category from analysis
-                title = extract_title_from_description(analysis)
-                price = extract_price_from_description(analysis)
-                category = extract_category_from_description(analysis)
+                # Run in a thread so waiting on the rate governor doesn't block the event loop
+                info = await asyncio.to_thread(describe_product, image_path)
+                # Title, price and category come from a single extraction pass
+                analysis = info.description
+                title, price, category = info.title, info.price, info.category
             else:
                 analysis = "Beautiful handmade craft with traditional artistry. Price band: ₹250-400 #handmade #craft #artisan"
                 title = "Beautiful Handmade Craft"
@@ -356,27 +409,19 @@ async def process_image_async(media_url: str, phone_number: str):
             logger.info(f"Analysis complete: {analysis[:100]}...")
             
             # Send analysis first
-            twilio_client.messages.create(
-                body=analysis,
-                from_="whatsapp:+14155238886",
-                to=phone_number
-            )
+            send_whatsapp(phone_number, analysis)
         except Exception as e:
             logger.error(f"Analysis error: {e}")
             analysis = "Beautiful handmade craft with traditional artistry. Price band: ₹250-400 #handmade #craft #artisan"
             title = "Beautiful Handmade Craft"
             price = 350
             category = "handmade"
-            twilio_client.messages.create(
-                body=analysis,
-                from_="whatsapp:+14155238886",
-                to=phone_number
-            )
+            send_whatsapp(phone_number, analysis)
         
         # Step 2: Process image
         try:
             if IMAGEN_AVAILABLE:
-                image_urls = remove_bg_and_upload(image_path)
+                image_urls = await asyncio.to_thread(remove_bg_and_upload, image_path)
             else:
                 image_urls = [f"https://storage.googleapis.com/craftlink-images/fallback{i}.jpg" for i in range(1,5)]
             logger.info(f"Image processing complete: {len(image_urls)} URLs")
@@ -384,21 +429,11 @@ async def process_image_async(media_url: str, phone_number: str):
             logger.error(f"Image processing failed: {e}")
             image_urls = [f"https://storage.googleapis.com/craftlink-images/fallback{i}.jpg" for i in range(1,5)]
         
-        # Step 3: Generate shop URL
         product_id = str(uuid.uuid4())
-        try:
-            if DEPLOY_AVAILABLE:
-                shop_url = build_and_host(product_id, analysis, image_urls, title, price)
-            else:
-                shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
-            logger.info(f"Shop URL generated: {shop_url}")
-        except Exception as e:
-            logger.error(f"Deployment failed: {e}")
-            shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
         
         # Get seller profile
         user_phone = phone_number.replace("whatsapp:", "")
-        seller_profile = get_seller_profile(user_phone) or {}
+        seller_profile = await asyncio.to_thread(get_seller_profile, user_phone) or {}
         
         # Update products.json with user reference
         product_data = {
@@ -418,27 +453,33 @@ async def process_image_async(media_url: str, phone_number: str):
             "orders_completed": uuid.uuid4().int % 50,
             "in_stock": True
         }
-        update_products_json(product_data)
+        pricing = await asyncio.to_thread(load_pricing_engine) if PRICING_AVAILABLE else None
+        await asyncio.to_thread(update_products_json, product_data)
+        if pricing:
+            pricing.add(product_data)
+        
+        # Step 3: Render the page from the record just saved, so it shows the real seller and category
+        try:
+            if DEPLOY_AVAILABLE:
+                shop_url = await asyncio.to_thread(publish_product, product_data)
+            else:
+                shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
+            logger.info(f"Shop URL generated: {shop_url}")
+        except Exception as e:
+            logger.error(f"Deployment failed: {e}")
+            shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
         
         # Update shop index to include new product
         if DEPLOY_AVAILABLE:
-            create_shop_index()
-            # Auto-deploy to Firebase
-            deploy_to_firebase()
+            await asyncio.to_thread(create_shop_index)
+            # Queue a coalesced deploy instead of deploying inline
+            schedule_deploy("new product")
         
         # Send shop link
-        twilio_client.messages.create(
-            body=f"🛍️ Your shop is ready: {shop_url}",
-            from_="whatsapp:+14155238886",
-            to=phone_number
-        )
+        send_whatsapp(phone_number, f"🛍️ Your shop is ready: {shop_url}")
         
         # Send final message with edit instructions
-        twilio_client.messages.create(
-            body=f"📦 We'll help you with shipping and payments!\n\nTo edit this product later:\n• edit {product_id[:8]} price NEW_PRICE\n• edit {product_id[:8]} description \"NEW_DESCRIPTION\"\n• edit {product_id[:8]} title \"NEW_TITLE\"\n• edit {product_id[:8]} category NEW_CATEGORY\n• edit {product_id[:8]} image + send new photo\n• Type 'myproducts' to see all your items\n• Type 'profile' to manage your seller profile",
-            from_="whatsapp:+14155238886",
-            to=phone_number
-        )
+        send_whatsapp(phone_number, f"📦 We'll help you with shipping and payments!\n\nTo edit this product later:\n• edit {product_id[:8]} price NEW_PRICE\n• edit {product_id[:8]} description \"NEW_DESCRIPTION\"\n• edit {product_id[:8]} title \"NEW_TITLE\"\n• edit {product_id[:8]} category NEW_CATEGORY\n• edit {product_id[:8]} image + send new photo\n• Type 'myproducts' to see all your items\n• Type 'profile' to manage your seller profile")
         
         logger.info(f"Async processing completed for {phone_number}")
         
@@ -447,11 +488,7 @@ async def process_image_async(media_url: str, phone_number: str):
         logger.error(traceback.format_exc())
         # Send error message
         try:
-            twilio_client.messages.create(
-                body="⚠️ Sorry, I encountered an error processing your image. Please try again.",
-                from_="whatsapp:+14155238886",
-                to=phone_number
-            )
+            send_whatsapp(phone_number, "⚠️ Sorry, I encountered an error processing your image. Please try again.")
         except Exception as send_error:
             logger.error(f"Failed to send error message: {send_error}")
 
@@ -461,15 +498,15 @@ async def process_video_async(media_url: str, phone_number: str, caption: str =
         logger.info(f"Async video processing started for {phone_number}")
         
         # Download the video
-        video_content = download_twilio_media(media_url)
+        video_content = await asyncio.to_thread(download_twilio_media, media_url)
         video_filename = f"{uuid.uuid4().hex}.mp4"
-        video_path = save_video(video_content, video_filename)
+        video_path = await asyncio.to_thread(save_video, video_content, video_filename)
         logger.info(f"Video saved to: {video_path}")
         
         # Upload video
         try:
             if IMAGEN_AVAILABLE:
-                video_url = upload_video(video_path)
+                video_url = await asyncio.to_thread(upload_video, video_path)
             else:
                 video_url = "https://storage.googleapis.com/craftlink-videos/fallback.mp4"
             logger.info(f"Video uploaded: {video_url}")
@@ -479,7 +516,7 @@ async def process_video_async(media_url: str, phone_number: str, caption: str =
         
         # Get seller profile
         user_phone = phone_number.replace("whatsapp:", "")
-        seller_profile = get_seller_profile(user_phone) or {}
+        seller_profile = await asyncio.to_thread(get_seller_profile, user_phone) or {}
         
         # Create reel data
         reel_id = str(uuid.uuid4())
@@ -496,20 +533,16 @@ async def process_video_async(media_url: str, phone_number: str, caption: str =
         }
         
         # Add to reels
-        add_reel(reel_data)
+        await asyncio.to_thread(add_reel, reel_data)
         
         # Update shop index to include new reel
         if DEPLOY_AVAILABLE:
-            create_shop_index()
-            # Auto-deploy to Firebase
-            deploy_to_firebase()
+            await asyncio.to_thread(create_shop_index)
+            # Queue a coalesced deploy instead of deploying inline
+            schedule_deploy("new reel")
         
         # Send confirmation
-        twilio_client.messages.create(
-            body=f"🎥 Your video has been added to our reels section! View it on the website.",
-            from_="whatsapp:+14155238886",
-            to=phone_number
-        )
+        send_whatsapp(phone_number, f"🎥 Your video has been added to our reels section! View it on the website.")
         
         logger.info(f"Async video processing completed for {phone_number}")
         
@@ -518,83 +551,11 @@ async def process_video_async(media_url: str, phone_number: str, caption: str =
         logger.error(traceback.format_exc())
         # Send error message
         try:
-            twilio_client.messages.create(
-                body="⚠️ Sorry, I encountered an error processing your video. Please try again.",
-                from_="whatsapp:+14155238886",
-                to=phone_number
-            )
+            send_whatsapp(phone_number, "⚠️ Sorry, I encountered an error processing your video. Please try again.")
         except Exception as send_error:
             logger.error(f"Failed to send error message: {send_error}")
 
-@app.post("/whatsapp")
-async def whatsapp_reply(
-    request: Request,
-    Body: str = Form(""),
-    NumMedia: str = Form("0"),
-    MediaUrl0: str = Form(None),
-    MediaContentType0: str = Form(None),
-    From: str = Form("")
-):
-    # Log the raw form data
-    form_data = await request.form()
-    logger.info(f"Received form data: {dict(form_data)}")
-    
-    resp = MessagingResponse()
-    phone_number = From
-    message_body = Body.strip().lower()
-    logger.info(f"Message from {phone_number}: Body='{Body}', MediaCount={NumMedia}")
-
-    try:
-        # Check for edit commands FIRST
-        if message_body.startswith("edit"):
-            logger.info(f"Processing edit command: {Body}")
-            if NumMedia != "0" and MediaUrl0:
-                response_text = handle_edit_command(phone_number, Body, MediaUrl0)
-            else:
-                response_text = handle_edit_command(phone_number, Body)
-            resp.message(response_text)
-            
-        elif message_body in ["myproducts", "mylist", "my items", "myproducts"]:
-            logger.info(f"Processing myproducts command: {Body}")
-            response_text = handle_myproducts_command(From)
-            resp.message(response_text)
-            
-        elif message_body.startswith("profile"):
-            logger.info(f"Processing profile command: {Body}")
-            response_text = handle_profile_command(From, Body)
-            resp.message(response_text)
-            
-        elif message_body.startswith("reel"):
-            logger.info(f"Processing reel command: {Body}")
-            if NumMedia != "0" and MediaUrl0 and MediaContentType0 and "video" in MediaContentType0:
-                caption = Body[4:].strip() if len(Body) > 4 else ""
-                # Send immediate response
-                resp.message("🎥 Processing your video for reels...")
-                # Process video in background
-                asyncio.create_task(process_video_async(MediaUrl0, From, caption))
-            else:
-                resp.message("❌ Please send a video with the reel command. Example: reel Check out my new craft!")
-            
-        elif message_body in ["categories", "category", "filter"]:
-            logger.info(f"Processing categories command: {Body}")
-            response_text = "🏷️ Available Categories:\n\n• pottery\n• textiles\n• jewelry\n• paintings\n• wooden\n• metalwork\n• leather\n• papercraft\n• home-decor\n• accessories\n\nUse: edit PRODUCT_ID category CATEGORY_NAME"
-            resp.message(response_text)
-            
-        elif NumMedia != "0" and MediaUrl0:
-            # Check if it's a video
-            if MediaContentType0 and "video" in MediaContentType0:
-                logger.info(f"Processing video: {MediaUrl0}")
-                resp.message("🎥 Got your video! Would you like to add it to reels? Reply 'reel' followed by a caption to add it.")
-            else:
-                logger.info(f"Processing image: {MediaUrl0}")
-                # Send immediate response to prevent timeout
-                resp.message("📸 Got your image! Processing it now with AI... I'll send the analysis and shop link in a moment.")
-                # Process image in background (async)
-                asyncio.create_task(process_image_async(MediaUrl0, From))
-            
-        else:
-            if message_body in ["hi", "hello", "hey", "start", "नमस्ते"]:
-                welcome_msg = """👋 नमस्ते! Welcome to KalaaSaarathi!
+WELCOME_MESSAGE = """👋 नमस्ते! Welcome to KalaaSaarathi!
 
 Send me a photo of your handmade craft and I'll:
 1. 📸 Analyze it with AI
@@ -614,19 +575,154 @@ Commands:
 • edit PRODUCT_ID image + send photo - Change image
 
 Just send a photo to get started!"""
-                resp.message(welcome_msg)
-            else:
-                resp.message("📸 Please send a photo of your craft to get started! I'll analyze it and create a shop for you.\n\nType 'help' for commands.")
 
+CATEGORIES_MESSAGE = "🏷️ Available Categories:\n\n• pottery\n• textiles\n• jewelry\n• paintings\n• wooden\n• metalwork\n• leather\n• papercraft\n• home-decor\n• accessories\n\nUse: edit PRODUCT_ID category CATEGORY_NAME"
+
+def twiml(text: str) -> bytes:
+    resp = MessagingResponse()
+    resp.message(text)
+    return str(resp).encode("utf-8")
+
+# Replies that never change, serialized to TwiML once instead of per message
+STATIC_TWIML = {
+    "welcome": twiml(WELCOME_MESSAGE),
+    "categories": twiml(CATEGORIES_MESSAGE),
+    "prompt": twiml("📸 Please send a photo of your craft to get started! I'll analyze it and create a shop for you.\n\nType 'help' for commands."),
+    "reel_processing": twiml("🎥 Processing your video for reels..."),
+    "reel_usage": twiml("❌ Please send a video with the reel command. Example: reel Check out my new craft!"),
+    "video": twiml("🎥 Got your video! Would you like to add it to reels? Reply 'reel' followed by a caption to add it."),
+    "image": twiml("📸 Got your image! Processing it now with AI... I'll send the analysis and shop link in a moment."),
+    "error": twiml("⚠️ Sorry, I encountered an error. Please try sending the photo again."),
+    "edit_media": twiml("⏳ Got it! Updating your product now... I'll message you when it's done."),
+    "busy": twiml("⏳ We're processing a lot of photos right now. Please send it again in a minute."),
+    "slow_down": twiml("⏳ You're sending messages faster than I can keep up. Please wait a minute, then send the rest."),
+}
+
+# Media processing and other heavy commands run here, never inside the webhook request, one sender at a time in turn
+media_jobs = BackgroundJobs(
+    workers=int(os.getenv("MEDIA_WORKERS", "4")),
+    max_pending=int(os.getenv("MEDIA_QUEUE", "100")),
+    max_per_sender=int(os.getenv("MEDIA_QUEUE_PER_SENDER", "20"))
+)
+
+# Per-phone token buckets, so one artisan's burst can't take everyone's processing and Gemini quota
+max_senders = int(os.getenv("SENDER_LIMIT_MAX", "10000"))
+whatsapp_limits = SenderLimiter(
+    per_minute=float(os.getenv("WHATSAPP_RATE_PER_MIN", "12")),
+    burst=float(os.getenv("WHATSAPP_BURST", "10")),
+    max_senders=max_senders
+)
+
+create_product_limits = SenderLimiter(
+    per_minute=float(os.getenv("CREATE_PRODUCT_RATE_PER_MIN", "6")),
+    burst=float(os.getenv("CREATE_PRODUCT_BURST", "3")),
+    max_senders=max_senders
+)
+
+# Largest batches /api/shipping/notify and /api/shipping/batch accept in one request
+NOTIFY_MAX_BATCH = int(os.getenv("NOTIFY_MAX_BATCH", "1000"))
+SHIP_MAX_BATCH = int(os.getenv("SHIP_MAX_BATCH", "500"))
+
+router = CommandRouter(media_jobs, deliver=send_whatsapp, busy_reply=STATIC_TWIML["busy"],
+                       threads=int(os.getenv("COMMAND_THREADS", "8")))
+
+# Downloading and uploading the new image is slow: acknowledge, then finish in the background
+@router.command("edit", heavy=True, ack=STATIC_TWIML["edit_media"], media="any")
+def edit_with_media(message: Message) -> str:
+    return handle_edit_command(message.phone, message.body, message.media_url)
+
+# Edits, listings and profiles read and write the catalog files: off the event loop, on the router's pool
+@router.command("edit", blocking=True)
+def edit_text(message: Message) -> str:
+    return handle_edit_command(message.phone, message.body)
+
+@router.command("myproducts", "mylist", "my items", "मेरे उत्पाद", blocking=True)
+def my_products(message: Message) -> str:
+    return handle_myproducts_command(message.phone)
+
+@router.command("profile", "प्रोफ़ाइल", "प्रोफाइल", blocking=True)
+def profile(message: Message) -> str:
+    return handle_profile_command(message.phone, message.body)
+
+@router.command("reel", "reels", heavy=True, ack=STATIC_TWIML["reel_processing"], media="video")
+async def reel_video(message: Message):
+    await process_video_async(message.media_url, message.phone, message.args)
+
+@router.command("reel", "reels")
+def reel_usage(message: Message) -> bytes:
+    return STATIC_TWIML["reel_usage"]
+
+@router.command("categories", "category", "filter", "श्रेणी", "श्रेणियाँ")
+def categories(message: Message) -> bytes:
+    return STATIC_TWIML["categories"]
+
+@router.command("welcome", "hi", "hello", "hey", "start", "help", "commands",
+                "नमस्ते", "नमस्कार", "मदद", "सहायता", media="none")
+def welcome(message: Message) -> bytes:
+    return STATIC_TWIML["welcome"]
+
+@router.fallback("video", media="video")
+def video_received(message: Message) -> bytes:
+    return STATIC_TWIML["video"]
+
+@router.fallback("image", media="image", heavy=True, ack=STATIC_TWIML["image"])
+async def new_product_from_image(message: Message):
+    await process_image_async(message.media_url, message.phone)
+
+@router.default()
+def prompt(message: Message) -> bytes:
+    return STATIC_TWIML["prompt"]
+
+@app.post("/whatsapp")
+async def whatsapp_reply(request: Request):
+    # The form is parsed once here; Form() parameters would validate it a second time
+    form = await request.form()
+    message = Message(
+        phone=form.get("From") or "",
+        body=form.get("Body") or "",
+        num_media=form.get("NumMedia") or "0",
+        media_url=form.get("MediaUrl0"),
+        media_type=form.get("MediaContentType0")
+    )
+    command = "message"
+
+    sid = form.get("MessageSid")
+    # A retry waits for (or reuses) the first delivery's reply rather than processing it again
+    content = await message_ledger.claim_or_wait(sid) if sid else None
+    if content is not None:
+        webhook_log.event("duplicate", phone=message.phone, sid=sid)
+        return Response(content=content, media_type="application/xml")
+
+    try:
+        if whatsapp_limits.allow(message.phone):
+            command, reply = await router.dispatch(message)
+            content = twiml(reply) if isinstance(reply, str) else reply
+        else:
+            command, content = "limited", STATIC_TWIML["slow_down"]
+        if sid:
+            message_ledger.complete(sid, content)
     except Exception as e:
-        logger.error(f"Error processing message: {e}")
-        logger.error(traceback.format_exc())
-        resp.message("⚠️ Sorry, I encountered an error. Please try sending the photo again.")
+        webhook_log.error("failed", phone=message.phone, command=command, error=str(e), trace=traceback.format_exc())
+        content = STATIC_TWIML["error"]
+        if sid:
+            message_ledger.fail(sid, content)
 
-    # Log the response
-    response_content = str(resp)
-    logger.info(f"Sending response: {response_content}")
-    return Response(content=response_content, media_type="application/xml")
+    webhook_log.event(command, phone=message.phone, body=message.body, media=message.num_media)
+    return Response(content=content, media_type="application/xml")
+
+@app.get("/api/jobs/status")
+async def jobs_status():
+    """Background media workers: queue depth, completed, failed and rejected jobs"""
+    return media_jobs.status()
+
+@app.get("/api/metrics/webhook")
+async def webhook_metrics():
+    """Twilio retries answered from the MessageSid ledger, and senders held back by their rate limits"""
+    return {
+        "dedup": message_ledger.status(),
+        "whatsapp_limits": whatsapp_limits.status(),
+        "create_product_limits": create_product_limits.status()
+    }
 
 @app.get("/health")
 async def health_check():
@@ -641,6 +737,66 @@ async def health_check():
         }
     }
 
+@app.get("/api/metrics/llm")
+async def llm_metrics():
+    """Gemini cache hit rates, rate governor waits and rejections"""
+    return get_llm_metrics()
+
+@app.get("/api/deploy/status")
+async def deploy_status():
+    """Pending site changes, the next scheduled deploy and recent deploy results"""
+    return deploy_scheduler.status()
+
+@app.get("/api/outbound/status")
+async def outbound_status():
+    """Queued WhatsApp replies, retries, failures and delivery latency"""
+    return outbound.status()
+
+def serve_shop_page(path: str, request: Request) -> Response:
+    """Serve a shop page rendered from the live catalog (cached, compressed, ETag-validated)"""
+    if not PAGES_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Page rendering not available")
+    status, body, headers = page_server.respond(
+        path, request.headers.get("accept-encoding"), request.headers.get("if-none-match")
+    )
+    return Response(content=body, status_code=status, headers=headers)
+
+# Plain def routes: FastAPI runs them in its threadpool, so a cache-miss render never blocks the event loop
+@app.get("/")
+def shop_home(request: Request):
+    return serve_shop_page("index.html", request)
+
+@app.get("/product/{product_id}.html")
+def shop_product_page(product_id: str, request: Request):
+    return serve_shop_page(f"product/{product_id}.html", request)
+
+@app.get("/seller/{phone}.html")
+def shop_seller_page(phone: str, request: Request):
+    return serve_shop_page(f"seller/{phone}.html", request)
+
+@app.get("/assets/{name}")
+def shop_asset(name: str, request: Request):
+    return serve_shop_page(f"assets/{name}", request)
+
+@app.get("/search/{name}")
+def shop_search_file(name: str, request: Request):
+    return serve_shop_page(f"search/{name}", request)
+
+@app.get("/products/{path:path}")
+def shop_product_partition(path: str, request: Request):
+    return serve_shop_page(f"products/{path}", request)
+
+@app.get("/api/pages/status")
+async def pages_status():
+    """Rendered-page cache size, hit and eviction counts"""
+    return page_server.status() if PAGES_AVAILABLE else {"available": False}
+
+@app.on_event("shutdown")
+async def flush_pending_deploy():
+    # Don't drop edits that were still waiting out the debounce window, or replies still queued
+    await asyncio.to_thread(deploy_scheduler.stop, flush=True, timeout=300)
+    await asyncio.to_thread(outbound.stop, flush=True, timeout=60)
+
 @app.post("/api/create-product")
 async def api_create_product(
     images: list[UploadFile] = File(...),
@@ -654,6 +810,10 @@ async def api_create_product(
     material: str = Form(None),
     dimensions: str = Form(None)
 ):
+    if not create_product_limits.allow(whatsapp_number):
+        retry_after = create_product_limits.retry_after(whatsapp_number)
+        raise HTTPException(status_code=429, detail="Too many products from this number, please wait",
+                            headers={"Retry-After": str(max(1, round(retry_after)))})
     try:
         logger.info("Web product creation started")
         
@@ -695,16 +855,20 @@ async def api_create_product(
             "in_stock": True
         }
         
-        # Update products.json
-        update_products_json(product_data)
-        
+        # Fit the pricing engine before the write, so add() is the only place the product is counted
+        pricing = await asyncio.to_thread(load_pricing_engine) if PRICING_AVAILABLE else None
+        # Update products.json (and the partitions and search index it feeds) off the event loop
+        await asyncio.to_thread(update_products_json, product_data)
+        if pricing:
+            pricing.add(product_data)
+
         # Build product page
         if DEPLOY_AVAILABLE:
-            shop_url = build_and_host(product_id, description, image_urls, title, int(price))
+            shop_url = await asyncio.to_thread(publish_product, product_data)
             # Update shop index to include new product
-            create_shop_index()
-            # Auto-deploy to Firebase
-            deploy_to_firebase()
+            await asyncio.to_thread(create_shop_index)
+            # Queue a coalesced deploy instead of deploying inline
+            schedule_deploy("new product via API")
         else:
             shop_url = f"https://neethi-saarathi-ids.web.app/product/{product_id}.html"
         
@@ -783,23 +947,20 @@ async def update_product_api(
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
-        updated = False
+        # Collected first and written together, so one edit is one catalog write and one publish
+        changes = {}
         
         if title:
-            update_product(product_id, "title", title)
-            updated = True
+            changes["title"] = title
             
         if description:
-            update_product(product_id, "description", description)
-            updated = True
+            changes["description"] = description
             
         if category:
-            update_product(product_id, "category", category)
-            updated = True
+            changes["category"] = category
             
         if price:
-            update_product(product_id, "price", int(price))
-            updated = True
+            changes["price"] = int(price)
             
         if image:
             content = await image.read()
@@ -812,19 +973,19 @@ async def update_product_api(
             else:
                 image_urls = [f"https://storage.googleapis.com/craftlink-images/fallback{i}.jpg" for i in range(1,5)]
                 
-            update_product(product_id, "images", image_urls)
+            changes["images"] = image_urls
             os.remove(temp_path)
-            updated = True
+        
+        updated = bool(changes) and await asyncio.to_thread(update_product_fields, product_id, changes)
         
         if updated:
             # Redeploy the shop with updated product
             product_data = get_product(product_id)
             if DEPLOY_AVAILABLE:
-                build_and_host(product_id, product_data.get('description', ''), product_data.get('images', []), product_data.get('title', ''), product_data.get('price', 350))
-                # Update shop index
-                create_shop_index()
-                # Auto-deploy to Firebase
-                deploy_to_firebase()
+                # Re-renders only the pages this edit affects
+                await asyncio.to_thread(create_shop_index)
+                # Queue a coalesced deploy instead of deploying inline
+                schedule_deploy("product update via API")
             
             return {
                 "success": True,
@@ -840,6 +1001,90 @@ async def update_product_api(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating product: {str(e)}")
 
+# Registered before /api/shipping/{product_id}, which would otherwise match "notify" and "batch"
+@app.post("/api/shipping/notify")
+async def notify_shipping_bulk(request: Request):
+    """Tracking messages for a batch of orders: {"items": [{"phone", "awb", "language"}]} -> a job id to poll"""
+    if not SMS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Notifications not available")
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected a JSON body")
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(items) > NOTIFY_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {NOTIFY_MAX_BATCH} items per batch")
+    return notify_tracking(items)
+
+@app.get("/api/shipping/notify/{job_id}")
+async def shipping_notify_status(job_id: str):
+    """Per-item status of a bulk notification: queued, sent, failed or invalid"""
+    status = tracking_job_status(job_id) if SMS_AVAILABLE else None
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.post("/api/shipping/batch")
+async def create_shipping_labels(request: Request):
+    """Labels for many orders: {"orders": [{"product_id", "buyer_name", "buyer_address", "buyer_phone", "language"}]}.
+
+    Streams one NDJSON line per order as its label is created, then a summary
+    line with the id of the tracking notification job for the buyers.
+    """
+    if not SHIPPING_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Shipping not available")
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected a JSON body")
+    orders = payload.get("orders") if isinstance(payload, dict) else payload
+    if not isinstance(orders, list) or not orders:
+        raise HTTPException(status_code=400, detail="orders must be a non-empty list")
+    if len(orders) > SHIP_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {SHIP_MAX_BATCH} orders per batch")
+
+    # One catalog read for the whole batch instead of a lookup per order
+    valid, invalid = validate_orders(orders, await asyncio.to_thread(get_all_products))
+
+    async def results():
+        def line(value: dict) -> bytes:
+            return (json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8")
+
+        for index, order, error in invalid:
+            yield line({"index": index, "product_id": order.get("product_id"), "status": "invalid", "error": error})
+
+        loop = asyncio.get_running_loop()
+        # The label pool bounds how many carrier calls run at once, across all batches
+        pending = {
+            loop.run_in_executor(label_pool, create_label, order["buyer_name"], order["buyer_address"]): (index, order)
+            for index, order, _ in valid
+        }
+        created, failed, notify = 0, 0, []
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index, order = pending.pop(future)
+                result = {"index": index, "product_id": order["product_id"]}
+                if future.exception():
+                    failed += 1
+                    result.update(status="failed", error=str(future.exception()))
+                else:
+                    created += 1
+                    # Any dict is a valid label: its keys never replace the line's own, so nothing it holds breaks the stream
+                    result = {**future.result(), **result, "status": "created"}
+                    if order.get("buyer_phone") and result.get("awb"):
+                        notify.append({"phone": order["buyer_phone"], "awb": result["awb"], "language": order.get("language")})
+                yield line(result)
+
+        summary = {"created": created, "failed": failed, "invalid": len(invalid)}
+        if notify and SMS_AVAILABLE:
+            summary["notify_job"] = notify_tracking(notify)["job_id"]
+        yield line({"summary": summary})
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @app.post("/api/shipping/{product_id}")
 async def create_shipping_label(
     product_id: str,
@@ -876,6 +1121,12 @@ async def get_categories():
     ]
     return {"categories": categories}
 
+@app.get("/api/pricing/suggest")
+async def suggest_price(category: str = None, material: str = None):
+    if not PRICING_AVAILABLE:
+        return {"budget": 299, "standard": 499, "premium": 799, "source": "static", "samples": 0}
+    return load_pricing_engine().suggest(category, material)
+
 @app.get("/api/sellers")
 async def get_sellers():
     try:
@@ -1049,11 +1300,11 @@ async def create_reel_api(
         }
         
         if DEPLOY_AVAILABLE:
-            add_reel(reel_data)
+            await asyncio.to_thread(add_reel, reel_data)
             # Update shop index to include new reel
-            create_shop_index()
-            # Auto-deploy to Firebase
-            deploy_to_firebase()
+            await asyncio.to_thread(create_shop_index)
+            # Queue a coalesced deploy instead of deploying inline
+            schedule_deploy("new reel via API")
         else:
             # Fallback implementation
             reels_file = "../shop/out/reels.json"
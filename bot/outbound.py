@@ -0,0 +1,273 @@
+# bot/outbound.py (queued WhatsApp sends: ordered per recipient, rate limited, retried)
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from rate_limit import BULK, INTERACTIVE, TokenBucket
+
+WHATSAPP_FROM = "whatsapp:+14155238886"
+# Twilio rejects WhatsApp bodies longer than this
+MAX_BODY = 1600
+
+
+class TwilioTransport:
+    """Sends through the Twilio REST API; the client is created on first use"""
+
+    def __init__(self, account_sid: str = None, auth_token: str = None, from_: str = WHATSAPP_FROM):
+        # TWILIO_SID/TWILIO_TOKEN are the names sms.py used to read
+        self.account_sid = account_sid or os.getenv("TWILIO_ACCOUNT_SID") or os.getenv("TWILIO_SID")
+        self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN") or os.getenv("TWILIO_TOKEN")
+        self.from_ = from_
+        self._client = None
+
+    def send(self, to: str, body: str) -> str:
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client.messages.create(body=body, from_=self.from_, to=to).sid
+
+
+class TransportError(Exception):
+    """A failed send with an HTTP-like status, as Twilio's REST errors carry"""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+class FakeTransport:
+    """Records messages instead of sending them, with optional latency and injected failures.
+
+    failures maps a recipient to a list of statuses its next sends fail with,
+    e.g. {"whatsapp:+91...": [429, 503]}.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: dict = None):
+        self.latency = latency
+        self.failures = {to: list(statuses) for to, statuses in (failures or {}).items()}
+        self.sent = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, to: str, body: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            statuses = self.failures.get(to)
+            if statuses:
+                raise TransportError(f"Simulated {statuses[0]}", statuses.pop(0))
+            self.sent.append((to, body))
+            return f"SMfake{self.calls:08d}"
+
+
+def make_transport(name: str = None):
+    """OUTBOUND_TRANSPORT: "twilio" (default) or "fake" to only record messages"""
+    name = name or os.getenv("OUTBOUND_TRANSPORT", "twilio")
+    return FakeTransport() if name == "fake" else TwilioTransport()
+
+
+def is_retryable(error: Exception) -> bool:
+    """429s, 5xx responses and network errors are worth another try; other 4xx are not"""
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(error, OSError)
+
+
+class OutboundDispatcher:
+    """Sends WhatsApp messages from a pool of worker threads.
+
+    send() only queues the message. Each recipient has a FIFO queue served by
+    at most one worker at a time, so their messages arrive in order, while
+    different recipients are sent to concurrently under one global TokenBucket.
+    A 429, 5xx or network error puts the message back at the head of its queue
+    and retries it after an exponential backoff; other recipients carry on
+    meanwhile. With merge, messages already queued for the same recipient go
+    out as one (up to MAX_BODY characters). Replies to a user's own message are
+    INTERACTIVE and always taken before BULK notifications, so a batch of
+    shipping updates never delays them.
+    """
+
+    def __init__(self, transport=None, workers: int = 4, rate: float = 10, burst: float = None,
+                 max_retries: int = 4, retry_backoff: float = 1.0, merge: bool = False):
+        # Resolved on first send, so importing this module never creates a Twilio client
+        self.transport = transport
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst or rate)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.merge = merge
+
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._queues = {}        # recipient -> deque of [body, future, attempts, queued at, priority]
+        # Recipients with messages, not in flight and not backing off, by the priority of their next message
+        self._ready = {INTERACTIVE: deque(), BULK: deque()}
+        self._delayed = []       # heap of (retry at, seq, recipient)
+        self._seq = itertools.count()
+        self._busy = set()       # recipients in flight or backing off
+        self._in_flight = 0
+        self._recent_latency = deque(maxlen=1000)
+        self.stats = {"queued": 0, "sent": 0, "requests": 0, "merged": 0, "retried": 0, "failed": 0}
+
+    def start(self):
+        with self._cond:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            self._stopping = False
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"outbound-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, flush: bool = False, timeout: float = None):
+        if flush:
+            self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def send(self, to: str, body: str, priority: int = INTERACTIVE) -> Future:
+        """Queue body for to; returns immediately with a Future of the message sid"""
+        if not self._threads:
+            self.start()
+        future = Future()
+        with self._cond:
+            queue = self._queues.get(to)
+            if queue is None:
+                queue = self._queues[to] = deque()
+            queue.append([body, future, 0, time.monotonic(), priority])
+            if len(queue) == 1 and to not in self._busy:
+                self._make_ready(to)
+            self.stats["queued"] += 1
+            self._cond.notify()
+        return future
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every queued message was sent or gave up; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queues or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _make_ready(self, to: str):
+        self._ready[self._queues[to][0][4]].append(to)
+
+    def _take(self, to: str) -> list:
+        queue = self._queues[to]
+        batch = [queue.popleft()]
+        if self.merge:
+            size = len(batch[0][0])
+            while queue and size + 2 + len(queue[0][0]) <= MAX_BODY:
+                size += 2 + len(queue[0][0])
+                batch.append(queue.popleft())
+        return batch
+
+    def _next(self):
+        """(recipient, batch) for a worker, or None when stopping. Called with the lock held."""
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                to = heapq.heappop(self._delayed)[2]
+                self._busy.discard(to)
+                self._make_ready(to)
+            lane = self._ready[INTERACTIVE] or self._ready[BULK]
+            if lane:
+                to = lane.popleft()
+                self._busy.add(to)
+                self._in_flight += 1
+                return to, self._take(to)
+            if self._stopping:
+                return None
+            self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = self._next()
+            if job is None:
+                return
+            to, batch = job
+            while not self.bucket.try_consume(1):
+                time.sleep(self.bucket.time_until(1))
+
+            error = None
+            try:
+                if self.transport is None:
+                    self.transport = make_transport()
+                sid = self.transport.send(to, "\n\n".join(entry[0] for entry in batch))
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                self._in_flight -= 1
+                self.stats["requests"] += 1
+                queue = self._queues[to]
+                attempts = max(entry[2] for entry in batch) + 1
+                retrying = error is not None and is_retryable(error) and attempts <= self.max_retries
+                if error is None:
+                    now = time.monotonic()
+                    for entry in batch:
+                        entry[1].set_result(sid)
+                        self._recent_latency.append(now - entry[3])
+                    self.stats["sent"] += len(batch)
+                    self.stats["merged"] += len(batch) - 1
+                elif retrying:
+                    # Back at the head of the queue, so later messages still wait their turn
+                    for entry in reversed(batch):
+                        entry[2] = attempts
+                        queue.appendleft(entry)
+                    self.stats["retried"] += 1
+                    delay = self.retry_backoff * 2 ** (attempts - 1) * (0.5 + random.random())
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), to))
+                else:
+                    print(f"❌ WhatsApp message to {to} failed after {attempts} attempt(s): {error}")
+                    for entry in batch:
+                        entry[1].set_exception(error)
+                    self.stats["failed"] += len(batch)
+
+                # A recipient backing off is made ready again by _next when its delay is up
+                if not retrying:
+                    self._busy.discard(to)
+                    if queue:
+                        self._make_ready(to)
+                    else:
+                        del self._queues[to]
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        with self._cond:
+            latency = sorted(self._recent_latency)
+            return {
+                "recipients": len(self._queues),
+                "pending": sum(len(queue) for queue in self._queues.values()),
+                "in_flight": self._in_flight,
+                "backing_off": len(self._delayed),
+                "p95_delivery_ms": round(latency[int(len(latency) * 0.95) - 1] * 1000, 1) if latency else 0.0,
+                **self.stats,
+            }
+
+
+outbound = OutboundDispatcher(
+    workers=int(os.getenv("OUTBOUND_WORKERS", "4")),
+    rate=float(os.getenv("OUTBOUND_RATE", "10")),
+    max_retries=int(os.getenv("OUTBOUND_RETRIES", "4")),
+    retry_backoff=float(os.getenv("OUTBOUND_BACKOFF", "1.0")),
+    merge=os.getenv("OUTBOUND_MERGE", "0") == "1",
+)
+
+
+def send_message(to: str, body: str, priority: int = INTERACTIVE) -> Future:
+    return outbound.send(to, body, priority)
@@ -0,0 +1,155 @@
+# bot/partitions.py (products.json split into fixed-size category and month pages for the storefront)
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+PARTITION_DIR = "products"
+INDEX_NAME = "index.json"
+PAGE_SIZE = 48
+UNDATED = "undated"
+
+_MONTH = re.compile(r"^(\d{4}-\d{2})")
+
+
+def category_slug(category) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(category or "handmade").lower()).strip("-") or "handmade"
+
+
+def product_month(product: dict) -> str:
+    match = _MONTH.match(str(product.get("created_at") or ""))
+    return match.group(1) if match else UNDATED
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+# path -> (page products, serialized page); a page whose products compare equal reuses its bytes
+_page_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _page_content(path: str, key: str, number: int, products: list) -> str:
+    with _memo_lock:
+        memo = _page_memo.get(path)
+    if memo is not None and memo[0] == products:
+        return memo[1]
+    content = _dump({"partition": key, "page": number, "products": products})
+    with _memo_lock:
+        # A parsed copy, not the caller's dicts, which may later be edited in place
+        _page_memo[path] = (json.loads(content)["products"], content)
+    return content
+
+
+def build_partitions(products: list, page_size: int = PAGE_SIZE) -> tuple:
+    """(index, {relative path: content}) for the catalog.
+
+    Pages are cut from the oldest product of each partition, in catalog order, so
+    a new product only changes the last page of its category and month, and an
+    edit only changes the pages holding that product; every other page comes out
+    byte-identical to the previous build.
+    """
+    partitions = {"category": {}, "month": {}}
+    names = {}
+    for product in products:
+        if not isinstance(product, dict) or not product.get("id"):
+            continue
+        slug = category_slug(product.get("category"))
+        names.setdefault(slug, product.get("category") or "handmade")
+        partitions["category"].setdefault(slug, []).append(product)
+        partitions["month"].setdefault(product_month(product), []).append(product)
+
+    files = {}
+    index = {"page_size": page_size, "total": 0, "artisans": 0, "categories": {}, "months": {}}
+    for kind, groups in partitions.items():
+        for key, members in sorted(groups.items()):
+            versions = []
+            for number, start in enumerate(range(0, len(members), page_size)):
+                path = f"{kind}/{key}/{number}.json"
+                content = _page_content(path, key, number, members[start:start + page_size])
+                files[path] = content
+                versions.append(hashlib.sha256(content.encode("utf-8")).hexdigest()[:8])
+            entry = {"count": len(members), "versions": versions}
+            if kind == "category":
+                entry["name"] = names[key]
+            index["categories" if kind == "category" else "months"][key] = entry
+
+    index["total"] = sum(entry["count"] for entry in index["months"].values())
+    index["artisans"] = len({p.get("artisan_phone") for p in products if isinstance(p, dict) and p.get("artisan_phone")})
+    # Newest month's last page: all first paint needs
+    dated = [month for month in index["months"] if month != UNDATED]
+    latest = max(dated) if dated else (UNDATED if index["months"] else None)
+    index["latest"] = f"month/{latest}/{len(index['months'][latest]['versions']) - 1}.json" if latest else None
+    index["version"] = hashlib.sha256(_dump([index["categories"], index["months"]]).encode("utf-8")).hexdigest()[:16]
+    return index, files
+
+
+@dataclass
+class PartitionReport:
+    pages: int = 0
+    bytes: int = 0
+    written: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (f"{self.pages} pages, {self.bytes / 1024:.0f} KB; {len(self.written)} written, "
+                f"{len(self.removed)} removed in {self.elapsed:.2f}s")
+
+
+def write_partitions(products: list, out_dir: str = "../shop/out", page_size: int = PAGE_SIZE) -> PartitionReport:
+    """Write out/products/{category,month}/<key>/<page>.json and index.json, touching only changed files"""
+    start = time.perf_counter()
+    index, files = build_partitions(products, page_size)
+    root = os.path.join(out_dir, PARTITION_DIR)
+    report = PartitionReport(pages=len(files))
+
+    for path, content in files.items():
+        data = content.encode("utf-8")
+        report.bytes += len(data)
+        full_path = os.path.join(root, path)
+        if _read_bytes(full_path) != data:
+            _write_bytes(full_path, data)
+            report.written.append(path)
+
+    # The index goes last, so it never points at a page that is not there yet
+    index_data = _dump(index).encode("utf-8")
+    index_path = os.path.join(root, INDEX_NAME)
+    if _read_bytes(index_path) != index_data:
+        _write_bytes(index_path, index_data)
+        report.written.append(INDEX_NAME)
+
+    for kind in ("category", "month"):
+        kind_dir = os.path.join(root, kind)
+        if not os.path.isdir(kind_dir):
+            continue
+        for key in os.listdir(kind_dir):
+            for name in os.listdir(os.path.join(kind_dir, key)):
+                path = f"{kind}/{key}/{name}"
+                if path not in files and not name.endswith(".tmp"):
+                    os.remove(os.path.join(root, path))
+                    report.removed.append(path)
+            if not os.listdir(os.path.join(kind_dir, key)):
+                os.rmdir(os.path.join(kind_dir, key))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _read_bytes(path: str):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_bytes(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
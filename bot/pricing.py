@@ -0,0 +1,270 @@
+# bot/pricing.py (data-driven price suggestions from the live catalog)
+import json
+import os
+import threading
+
+import numpy as np
+
+# Fallback table used until the catalog has enough samples for a group
+BASE_PRICES = {
+    "pottery": {"clay": 399, "terracotta": 499, "ceramic": 699},
+    "textiles": {"cotton": 599, "silk": 1299, "wool": 899},
+    "jewelry": {"silver": 799, "gold": 2999, "beads": 399},
+    "paintings": {"canvas": 999, "paper": 499, "wall": 1499},
+    "wooden": {"teak": 899, "rosewood": 1299, "bamboo": 499},
+}
+DEFAULT_PRICE = 499
+
+MATERIALS = sorted(
+    {material for materials in BASE_PRICES.values() for material in materials}
+    | {"brass", "copper", "bronze", "leather", "jute", "khadi", "linen", "glass", "stone", "wax", "sandalwood"},
+    key=len, reverse=True
+)
+
+# Band percentiles: budget / standard / premium
+BANDS = (("budget", 25), ("standard", 50), ("premium", 75))
+TRIM = 0.1
+
+
+def normalize_material(material: str) -> str:
+    """Map free-text material ("Pure Silk, hand-dyed") to a known material key"""
+    material = (material or "").lower()
+    for known in MATERIALS:
+        if known in material:
+            return known
+    return ""
+
+
+def round_price(value: float) -> int:
+    """Round to the shop's ...99 price points"""
+    return max(49, int(round(value / 50.0)) * 50 - 1)
+
+
+def static_price(category: str, material: str) -> int:
+    """The old hard-coded lookup, with the default case fixed"""
+    category_data = BASE_PRICES.get(category)
+    if not category_data:
+        return DEFAULT_PRICE
+    material = (material or "").lower()
+    for mat, price in category_data.items():
+        if mat in material:
+            return price
+    return DEFAULT_PRICE
+
+
+class _GroupPrices:
+    """Growable float buffer for one group, with its stats cached until the next append"""
+
+    __slots__ = ("values", "size", "stats")
+
+    def __init__(self):
+        self.values = np.empty(16, dtype=np.float64)
+        self.size = 0
+        self.stats = None
+
+    def append(self, price: float):
+        if self.size == len(self.values):
+            self.values = np.resize(self.values, self.size * 2)
+        self.values[self.size] = price
+        self.size += 1
+        self.stats = None
+
+    def remove(self, price: float) -> bool:
+        matches = np.flatnonzero(self.values[:self.size] == price)
+        if not len(matches):
+            return False
+        # Order does not matter: compute() sorts
+        self.size -= 1
+        self.values[matches[0]] = self.values[self.size]
+        self.stats = None
+        return True
+
+    def compute(self) -> dict:
+        if self.stats is None:
+            data = np.sort(self.values[:self.size])
+            bands = np.percentile(data, [p for _, p in BANDS])
+            cut = int(self.size * TRIM)
+            trimmed = data[cut:self.size - cut] if self.size - 2 * cut > 0 else data
+            self.stats = _stats_dict(self.size, bands, float(trimmed.mean()))
+        return self.stats
+
+
+def _stats_dict(count: int, bands, trimmed_mean: float) -> dict:
+    stats = {name: float(value) for (name, _), value in zip(BANDS, bands)}
+    stats["count"] = int(count)
+    stats["trimmed_mean"] = trimmed_mean
+    return stats
+
+
+def _priced_groups(product: dict):
+    """(price, group keys) for a catalog record, or None when it has no usable price"""
+    try:
+        price = float(product.get("price"))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+    return price, _group_keys(product.get("category") or "", normalize_material(product.get("material")))
+
+
+def _group_keys(category: str, material: str) -> list:
+    keys = [("all",)]
+    if category:
+        keys.append(("category", category))
+    if material:
+        keys.append(("material", material))
+    if category and material:
+        keys.append(("category+material", category, material))
+    return keys
+
+
+class PricingEngine:
+    """Per-category and per-material price distributions (percentiles, trimmed means).
+
+    fit() computes every group in one vectorized pass; add() updates a single
+    product incrementally. suggest() reads cached stats, so it is a handful of
+    dict lookups once the groups are warm.
+    """
+
+    def __init__(self, min_samples: int = 5):
+        self.min_samples = min_samples
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def fit(self, products: list):
+        """Rebuild all groups from catalog records"""
+        key_codes = {}
+        codes, prices = [], []
+        for product in products:
+            try:
+                price = float(product.get("price"))
+            except (TypeError, ValueError):
+                continue
+            if price <= 0:
+                continue
+            category = product.get("category") or ""
+            material = normalize_material(product.get("material"))
+            for key in _group_keys(category, material):
+                codes.append(key_codes.setdefault(key, len(key_codes)))
+                prices.append(price)
+
+        groups = {}
+        if prices:
+            codes = np.array(codes, dtype=np.int64)
+            prices = np.array(prices, dtype=np.float64)
+
+            # Sort by (group, price) once, then read every group's percentiles from its segment
+            order = np.lexsort((prices, codes))
+            sorted_prices = prices[order]
+            counts = np.bincount(codes, minlength=len(key_codes))
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            bands = []
+            for _, percentile in BANDS:
+                position = starts + (counts - 1) * (percentile / 100.0)
+                lower = np.floor(position).astype(np.int64)
+                upper = np.minimum(lower + 1, starts + counts - 1)
+                fraction = position - lower
+                bands.append(sorted_prices[lower] * (1 - fraction) + sorted_prices[upper] * fraction)
+            cut = (counts * TRIM).astype(np.int64)
+            cut = np.where(counts - 2 * cut > 0, cut, 0)
+            cumulative = np.concatenate(([0.0], np.cumsum(sorted_prices)))
+            trimmed_means = (cumulative[starts + counts - cut] - cumulative[starts + cut]) / (counts - 2 * cut)
+
+            for key, code in key_codes.items():
+                group = _GroupPrices()
+                segment = sorted_prices[starts[code]:starts[code] + counts[code]]
+                group.values = np.array(segment, dtype=np.float64)
+                group.size = int(counts[code])
+                group.stats = _stats_dict(counts[code], [band[code] for band in bands], float(trimmed_means[code]))
+                groups[key] = group
+
+        with self._lock:
+            self._groups = groups
+
+    def add(self, product: dict):
+        """Fold one newly added product into the running statistics"""
+        self.update(None, product)
+
+    def remove(self, product: dict):
+        """Take a deleted product out of the running statistics"""
+        self.update(product, None)
+
+    def update(self, old: dict, new: dict):
+        """Replace a product's old record with its edited one (either may be None)"""
+        removed = _priced_groups(old) if old else None
+        added = _priced_groups(new) if new else None
+        with self._lock:
+            if removed:
+                price, keys = removed
+                for key in keys:
+                    group = self._groups.get(key)
+                    if group is not None and group.remove(price) and not group.size:
+                        del self._groups[key]
+            if added:
+                price, keys = added
+                for key in keys:
+                    group = self._groups.get(key)
+                    if group is None:
+                        group = self._groups[key] = _GroupPrices()
+                    group.append(price)
+
+    def stats(self, *key) -> dict:
+        with self._lock:
+            group = self._groups.get(key)
+            return group.compute() if group else None
+
+    def suggest(self, category: str, material: str = None) -> dict:
+        """Budget / standard / premium prices, from the most specific group with enough data"""
+        material = normalize_material(material)
+        category = category or ""
+        candidates = []
+        if category and material:
+            candidates.append(("category+material", category, material))
+        if category:
+            candidates.append(("category", category))
+        if material:
+            candidates.append(("material", material))
+        candidates.append(("all",))
+
+        with self._lock:
+            for key in candidates:
+                group = self._groups.get(key)
+                if group is not None and group.size >= self.min_samples:
+                    stats = group.compute()
+                    suggestion = {name: round_price(stats[name]) for name, _ in BANDS}
+                    suggestion["source"] = key[0]
+                    suggestion["samples"] = stats["count"]
+                    return suggestion
+
+        base = static_price(category, material)
+        return {
+            "budget": round_price(base * 0.75),
+            "standard": base,
+            "premium": round_price(base * 1.5),
+            "source": "static",
+            "samples": 0
+        }
+
+
+pricing_engine = PricingEngine()
+_loaded_from = None
+
+
+def load_pricing_engine(products_file: str = "../shop/out/products.json") -> PricingEngine:
+    """Fit the shared engine from products.json once per process.
+
+    Writers call this before changing the file and apply add()/update() after,
+    so the first fit never already holds the product they are about to add.
+    """
+    global _loaded_from
+    if _loaded_from != products_file:
+        products = []
+        if os.path.exists(products_file):
+            try:
+                with open(products_file, "r") as f:
+                    products = json.load(f).get("products", [])
+            except (OSError, ValueError) as e:
+                print(f"❌ Failed to load products for pricing: {e}")
+        pricing_engine.fit(products)
+        _loaded_from = products_file
+    return pricing_engine
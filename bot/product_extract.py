@@ -0,0 +1,224 @@
+# bot/product_extract.py (title, price, category and tags extracted from a description in one call)
+import json
+import re
+from dataclasses import dataclass, field, asdict
+
+from category_classifier import CATEGORIES, DEFAULT_CATEGORY, classify_category
+
+DEFAULT_TITLE = "Beautiful Handmade Craft"
+DEFAULT_PRICE = 350
+
+# Hashtag words too generic to name a product
+GENERIC_TAG_WORDS = {
+    "handmade", "hand", "made", "craft", "crafts", "crafted", "indian", "india", "art", "arts",
+    "artisan", "artisans", "artist", "traditional", "tradition", "heritage", "culture", "life",
+    "desi", "local", "vocal", "for", "shop", "buy", "gift", "gifts", "love", "beautiful"
+}
+
+_CURRENCY = r"(?:₹|rs\.?|inr)"
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+
+# Hashtags and numbers in one scan. Every token starts with "#" or a digit,
+# so the engine jumps straight between them; hashtags come first so digits
+# inside tags (#Top10Crafts) are never read as prices.
+_TOKEN = re.compile(
+    r"#(?P<tag>\w+)"
+    rf"|(?P<lo>{_NUMBER})(?:\s*(?:-|–|—|to)\s*{_CURRENCY}?\s*(?P<hi>{_NUMBER}))?",
+    re.IGNORECASE
+)
+# A number is a price when a currency marker or a "Price" label (at most 12
+# characters back, with no other number in between) comes right before it
+_PRICE_CONTEXT = re.compile(r"(?:(?:₹|\brs\.?|\binr)\s*|\bprice\b\D{0,12})$", re.IGNORECASE)
+_PRICE_LOOKBACK = 20
+# First sentence end: a run of stops followed by whitespace
+_STOP = re.compile(r"[.!?।…](?<![.!?।…].)[.!?।…]*(?=\s|$)")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_MARKDOWN = re.compile(r"[*_`]+")
+
+
+@dataclass
+class ProductInfo:
+    title: str = DEFAULT_TITLE
+    price_low: int = None
+    price_high: int = None
+    category: str = DEFAULT_CATEGORY
+    hashtags: list = field(default_factory=list)
+    language: str = "en"
+    description: str = ""
+
+    @property
+    def price(self) -> int:
+        """Midpoint of the price band, or the default price"""
+        if self.price_low and self.price_high:
+            return (self.price_low + self.price_high) // 2
+        return self.price_low or self.price_high or DEFAULT_PRICE
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["price"] = self.price
+        return data
+
+
+def _to_int(number: str) -> int:
+    return int(float(number.replace(",", "")))
+
+
+def _title_from_hashtags(hashtags: list) -> str:
+    """Pick the most specific hashtag and split its CamelCase into words"""
+    best, best_score = None, 0
+    for tag in hashtags:
+        parts = _CAMEL.findall(tag)
+        score = sum(1 for part in parts if not part.isdigit() and part.lower() not in GENERIC_TAG_WORDS)
+        if score > best_score:
+            best, best_score = parts, score
+    if not best:
+        return None
+    return " ".join(part if part.isupper() else part.capitalize() for part in best)
+
+
+def _title_from_sentence(sentence: str) -> str:
+    title = _MARKDOWN.sub("", sentence)
+    title = re.sub(r"\s+", " ", title).strip(" ,;:-")
+    if len(title) <= 5:
+        return None
+    if len(title) > 50:
+        title = title[:50].rsplit(" ", 1)[0]
+    return title
+
+
+def _first_sentence(description: str) -> str:
+    # Stops in the first 10 characters are abbreviations or initials, not a sentence end
+    stop = _STOP.search(description, 11)
+    return description[:stop.start()] if stop else description.split("\n", 1)[0]
+
+
+def extract_product_info(description: str) -> ProductInfo:
+    """Title, price band, category, hashtags and language from one scan for tokens and one category scan"""
+    info = ProductInfo(description=description or "")
+    if not description:
+        return info
+
+    ranges, amounts = [], []
+    for match in _TOKEN.finditer(description):
+        tag = match.group("tag")
+        if tag:
+            info.hashtags.append(tag)
+            continue
+        start = match.start()
+        if not _PRICE_CONTEXT.search(description[max(0, start - _PRICE_LOOKBACK):start]):
+            continue
+        if match.group("hi"):
+            ranges.append((_to_int(match.group("lo")), _to_int(match.group("hi"))))
+        else:
+            amounts.append(_to_int(match.group("lo")))
+
+    if ranges:
+        low, high = ranges[0]
+        info.price_low, info.price_high = min(low, high), max(low, high)
+    elif amounts:
+        info.price_low = info.price_high = amounts[0]
+
+    info.category = classify_category(description)
+
+    deva_chars = 0 if description.isascii() else len(_DEVANAGARI.findall(description))
+    if deva_chars and deva_chars * 2 >= len(description.replace(" ", "")):
+        info.language = "hi"
+    elif deva_chars:
+        info.language = "mixed"
+
+    info.title = (
+        _title_from_hashtags(info.hashtags)
+        or _title_from_sentence(_first_sentence(description))
+        or DEFAULT_TITLE
+    )
+    return info
+
+
+STRUCTURED_PROMPT = """You are a nostalgic Indian grandparent who appreciates handmade crafts.
+Look at this craft and reply with ONLY a JSON object, no other text:
+{"description": "60 words describing this craft with love and emotion",
+ "title": "short product name, max 6 words",
+ "price_low": 0, "price_high": 0,
+ "category": "one of: pottery, textiles, jewelry, paintings, wooden, metalwork, leather, papercraft, home-decor, accessories",
+ "hashtags": ["5 SEO hashtags without #"],
+ "language": "en, hi or mixed"}
+Prices are in Indian rupees."""
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _find_json_object(text: str) -> str:
+    """Return the first balanced {...} block, ignoring braces inside strings"""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def _loads_tolerant(block: str):
+    for candidate in (block, _TRAILING_COMMA.sub(r"\1", block)):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    # Last resort for single-quoted pseudo-JSON
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", block).replace("'", '"'))
+    except ValueError:
+        return None
+
+
+def parse_structured_response(text: str) -> ProductInfo:
+    """Parse a JSON-mode model reply, falling back to free-text extraction"""
+    block = _find_json_object(_FENCE.sub("", text or ""))
+    data = _loads_tolerant(block) if block else None
+    if not isinstance(data, dict):
+        return extract_product_info(text)
+
+    description = str(data.get("description") or "").strip()
+    hashtags = [str(tag).lstrip("#").strip() for tag in data.get("hashtags") or [] if str(tag).strip()]
+    # Free-text pass over description + tags fills anything the model left out
+    info = extract_product_info(description + "\n" + " ".join(f"#{tag}" for tag in hashtags))
+    info.description = description or text
+    info.hashtags = hashtags or info.hashtags
+
+    title = str(data.get("title") or "").strip()
+    if title:
+        info.title = title[:50]
+
+    try:
+        low = _to_int(str(data.get("price_low"))) if data.get("price_low") else None
+        high = _to_int(str(data.get("price_high"))) if data.get("price_high") else None
+        if low or high:
+            info.price_low, info.price_high = low or high, high or low
+    except ValueError:
+        pass
+
+    category = str(data.get("category") or "").strip().lower()
+    if category in CATEGORIES:
+        info.category = category
+
+    language = str(data.get("language") or "").strip().lower()
+    if language in ("en", "hi", "mixed"):
+        info.language = language
+    return info
@@ -0,0 +1,304 @@
+# bot/publish.py (differential publish of shop/out against the last published manifest)
+import fnmatch
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Published with the site so a deployment can be verified by comparing manifests
+SITE_MANIFEST = "publish-manifest.json"
+STATE_NAME = ".publish-state.json"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def firebase_ignores(config_file: str = "../shop/firebase.json") -> list:
+    """hosting.ignore globs from firebase.json: files the Firebase CLI never uploads"""
+    try:
+        with open(config_file, "r", encoding="utf-8") as f:
+            return list(json.load(f).get("hosting", {}).get("ignore", []))
+    except (OSError, ValueError):
+        return []
+
+
+def is_ignored(path: str, patterns) -> bool:
+    """Glob match as Firebase does it, where a leading "**/" also matches at the top level"""
+    return any(fnmatch.fnmatchcase(path, pattern)
+               or (pattern.startswith("**/") and fnmatch.fnmatchcase(path, pattern[3:]))
+               for pattern in patterns)
+
+
+def scan_tree(root: str, previous: dict = None, ignore=()) -> dict:
+    """path -> {hash, size, mtime} for every file under root not matching an ignore glob.
+
+    Files whose size and mtime match the previous scan keep their old hash, so
+    only new or touched files are read.
+    """
+    previous = previous or {}
+    manifest = {}
+    for folder, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".tmp") or name == SITE_MANIFEST:
+                continue
+            full = os.path.join(folder, name)
+            rel = os.path.relpath(full, root).replace(os.sep, "/")
+            if ignore and is_ignored(rel, ignore):
+                continue
+            stat = os.stat(full)
+            old = previous.get(rel)
+            if old and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime_ns:
+                manifest[rel] = old
+            else:
+                manifest[rel] = {"hash": file_hash(full), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+    return manifest
+
+
+def hashes(manifest: dict) -> dict:
+    return {path: entry["hash"] for path, entry in manifest.items()}
+
+
+def diff_manifests(old: dict, new: dict) -> tuple:
+    """(added, changed, deleted) paths between two {path: hash} maps"""
+    added = sorted(path for path in new if path not in old)
+    changed = sorted(path for path in new if path in old and old[path] != new[path])
+    deleted = sorted(path for path in old if path not in new)
+    return added, changed, deleted
+
+
+def read_site_manifest(out_dir: str) -> dict:
+    """The {path: hash} manifest last written into out_dir, or {}"""
+    try:
+        with open(os.path.join(out_dir, SITE_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_site_manifest(out_dir: str, ignore=()) -> dict:
+    """Write {path: hash} into the site itself, for targets that can only be read over HTTP.
+
+    ignore takes the target's own exclusion globs, so the manifest lists only
+    files that are actually uploaded.
+    """
+    manifest = hashes(scan_tree(out_dir, ignore=ignore))
+    tmp_path = os.path.join(out_dir, f"{SITE_MANIFEST}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True)
+    os.replace(tmp_path, os.path.join(out_dir, SITE_MANIFEST))
+    return manifest
+
+
+def spot_check(base_url: str, manifest: dict, paths: list, timeout: float = 30) -> list:
+    """Fetch paths from the live site; returns those whose body does not hash to the manifest entry"""
+    session = requests.Session()
+    mismatched = []
+    for path in paths:
+        try:
+            response = session.get(f"{base_url.rstrip('/')}/{urllib.parse.quote(path)}",
+                                   headers={"Cache-Control": "no-cache"}, timeout=timeout)
+            ok = response.status_code == 200 and hashlib.sha256(response.content).hexdigest() == manifest.get(path)
+        except requests.RequestException:
+            ok = False
+        if not ok:
+            mismatched.append(path)
+    return mismatched
+
+
+class DirectoryTarget:
+    """Publish into a local directory (a stand-in for hosting, and for tests)"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._scanned = {}
+
+    def put(self, path: str, data: bytes):
+        full = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp_path = f"{full}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full)
+
+    def delete(self, path: str):
+        full = os.path.join(self.root, path)
+        if os.path.exists(full):
+            os.remove(full)
+
+    def manifest(self) -> dict:
+        """{path: hash} of the files actually under root; unchanged files keep their hash from the last call"""
+        self._scanned = scan_tree(self.root, self._scanned)
+        return hashes(self._scanned)
+
+    def commit(self, manifest: dict):
+        self.put(SITE_MANIFEST, json.dumps(manifest, sort_keys=True).encode("utf-8"))
+
+
+class HttpTarget:
+    """Publish over a small REST API: PUT/DELETE /files/<path>, PUT /manifest to record a publish,
+    GET /manifest for {path: sha256} of the files the host actually serves"""
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/files/{urllib.parse.quote(path)}"
+
+    def put(self, path: str, data: bytes):
+        self.session.put(self._url(path), data=data, timeout=self.timeout).raise_for_status()
+
+    def delete(self, path: str):
+        response = self.session.delete(self._url(path), timeout=self.timeout)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def manifest(self) -> dict:
+        response = self.session.get(f"{self.base_url}/manifest", timeout=self.timeout)
+        return response.json() if response.status_code == 200 else {}
+
+    def commit(self, manifest: dict):
+        self.session.put(f"{self.base_url}/manifest", json=manifest, timeout=self.timeout).raise_for_status()
+
+
+class StandInHttpServer:
+    """In-process server implementing the HttpTarget API over a dict, for tests and benchmarks"""
+
+    def __init__(self):
+        self.files = {}
+        self.published_manifest = {}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: bytes = b""):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_PUT(self):
+                server.requests += 1
+                if self.path == "/manifest":
+                    server.published_manifest = json.loads(self._body())
+                else:
+                    server.files[urllib.parse.unquote(self.path[len("/files/"):])] = self._body()
+                self._reply(204)
+
+            def do_DELETE(self):
+                server.requests += 1
+                found = server.files.pop(urllib.parse.unquote(self.path[len("/files/"):]), None)
+                self._reply(204 if found is not None else 404)
+
+            def do_GET(self):
+                server.requests += 1
+                if self.path == "/manifest":
+                    held = {path: hashlib.sha256(data).hexdigest() for path, data in server.files.items()}
+                    self._reply(200, json.dumps(held).encode("utf-8"))
+                else:
+                    self._reply(404)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@dataclass
+class PublishReport:
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    bytes_sent: int = 0
+    verified: bool = False
+    mismatched: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (f"{len(self.added)} added, {len(self.changed)} changed, {len(self.deleted)} deleted, "
+                f"{self.bytes_sent / 1024:.0f} KB sent in {self.elapsed:.2f}s, "
+                f"{'verified' if self.verified else f'{len(self.mismatched)} mismatched'}")
+
+
+class Publisher:
+    """Pushes only the files that differ from the last successful publish to a target"""
+
+    def __init__(self, target, source: str = "../shop/out", state_file: str = None):
+        self.target = target
+        self.source = source
+        self.state_file = state_file or os.path.join(os.path.dirname(os.path.abspath(source)), STATE_NAME)
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, manifest: dict):
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.state_file)
+
+    def plan(self) -> tuple:
+        """(local manifest, added, changed, deleted) relative to the last publish"""
+        previous = self._load_state()
+        local = scan_tree(self.source, previous)
+        return (local, *diff_manifests(hashes(previous), hashes(local)))
+
+    def publish(self) -> PublishReport:
+        start = time.perf_counter()
+        report = PublishReport()
+        with self._lock:
+            local, report.added, report.changed, report.deleted = self.plan()
+            for path in report.added + report.changed:
+                with open(os.path.join(self.source, path), "rb") as f:
+                    data = f.read()
+                self.target.put(path, data)
+                report.bytes_sent += len(data)
+            for path in report.deleted:
+                self.target.delete(path)
+
+            published = hashes(local)
+            self.target.commit(published)
+            # Verify against the hashes of the files the target holds, not the manifest just committed
+            remote = self.target.manifest()
+            report.mismatched = sorted(p for p in set(published) | set(remote) if published.get(p) != remote.get(p))
+            report.verified = not report.mismatched
+            if report.verified:
+                self._save_state(local)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def __call__(self) -> bool:
+        """Deployer protocol for the deploy scheduler"""
+        report = self.publish()
+        print(f"{'✅' if report.verified else '❌'} Published: {report.summary()}")
+        return report.verified
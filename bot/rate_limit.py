@@ -0,0 +1,248 @@
+# bot/rate_limit.py (token buckets and a shared rate governor for Vertex AI calls)
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from llm_cache import FakeModel
+
+# Priority lanes: lower value is served first
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller waited longer than the governor allows"""
+
+
+class QuotaExceededError(Exception):
+    """Raised by the simulated quota-limited model"""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Best-effort detection of Vertex AI 429 / ResourceExhausted errors"""
+    name = type(error).__name__
+    message = str(error).lower()
+    return name in ("ResourceExhausted", "TooManyRequests", "QuotaExceededError") or "429" in message or "quota" in message
+
+
+def estimate_tokens(prompt: str, has_image: bool = False, output_tokens: int = 300) -> int:
+    """Rough token estimate: ~4 characters per token, 258 tokens per image, plus expected output"""
+    return len(prompt or "") // 4 + (258 if has_image else 0) + output_tokens
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float = 1) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def try_consume(self, amount: float = 1) -> bool:
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+
+class SenderLimiter:
+    """One TokenBucket per sender (a phone number), `per_minute` sustained and `burst` at once.
+
+    Buckets live in an LRU bounded to max_senders. A bucket left idle long
+    enough to refill completely is no different from a new one, so it is
+    evicted; memory follows the number of recently active senders only.
+    """
+
+    def __init__(self, per_minute: float = 12, burst: float = 8, max_senders: int = 10000):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_senders = max_senders
+        # Time for an empty bucket to refill completely
+        self.idle = burst / self.rate if self.rate else float("inf")
+        self._buckets = OrderedDict()    # sender -> TokenBucket, least recently used first
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "limited": 0, "evicted": 0}
+
+    def _bucket(self, sender: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(sender)
+        if bucket is None:
+            bucket = self._buckets[sender] = TokenBucket(self.rate, self.burst)
+        else:
+            self._buckets.move_to_end(sender)
+        while self._buckets:
+            oldest_sender, oldest = next(iter(self._buckets.items()))
+            if oldest is bucket or (len(self._buckets) <= self.max_senders and now - oldest.updated < self.idle):
+                break
+            del self._buckets[oldest_sender]
+            self.stats["evicted"] += 1
+        return bucket
+
+    def allow(self, sender: str, amount: float = 1) -> bool:
+        with self._lock:
+            allowed = self._bucket(sender, time.monotonic()).try_consume(amount)
+            self.stats["allowed" if allowed else "limited"] += 1
+        return allowed
+
+    def retry_after(self, sender: str, amount: float = 1) -> float:
+        """Seconds until sender may send again"""
+        with self._lock:
+            bucket = self._buckets.get(sender)
+        return bucket.time_until(amount) if bucket else 0.0
+
+    def status(self) -> dict:
+        return {"senders": len(self._buckets), "per_minute": self.rate * 60, "burst": self.burst, **self.stats}
+
+
+class LaneStats:
+    def __init__(self):
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=1000)
+
+    def as_dict(self) -> dict:
+        waits = sorted(self.recent_waits)
+        p95 = waits[int(len(waits) * 0.95) - 1] if waits else 0.0
+        return {
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 1),
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class RateGovernor:
+    """Shared limiter for model calls: RPM and TPM buckets, max concurrency and priority lanes.
+
+    Waiters queue in priority order; only the head of the queue may take a
+    slot, so interactive requests are always served before bulk ones.
+    """
+
+    def __init__(self, rpm: int = 60, tpm: int = 60000, max_concurrency: int = 4,
+                 max_wait: float = 30.0, quota_retries: int = 3, burst: int = None):
+        self.requests = TokenBucket(rpm / 60.0, burst or rpm)
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.quota_retries = quota_retries
+        self.in_flight = 0
+        self.quota_errors = 0
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._stats = {lane: LaneStats() for lane in LANE_NAMES}
+
+    def acquire(self, tokens: int = 1, priority: int = BULK, timeout: float = None):
+        """Block until a slot is free and both buckets allow the call"""
+        start = time.monotonic()
+        deadline = start + (self.max_wait if timeout is None else timeout)
+        entry = (priority, next(self._seq))
+        stats = self._stats.setdefault(priority, LaneStats())
+
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == entry and self.in_flight < self.max_concurrency:
+                        wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                        if wait == 0 and self.requests.try_consume(1) and self.tokens.try_consume(tokens):
+                            self.in_flight += 1
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        stats.rejected += 1
+                        raise RateLimitExceeded(f"Waited {time.monotonic() - start:.1f}s for a model slot")
+                    self._cond.wait(min(wait, remaining) if wait else remaining)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats.acquired += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            stats.recent_waits.append(waited)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 1, priority: int = BULK):
+        self.acquire(tokens, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def call(self, fn, tokens: int = 1, priority: int = BULK):
+        """Run fn() under the governor, backing off and retrying on quota errors"""
+        for attempt in range(self.quota_retries + 1):
+            try:
+                with self.slot(tokens, priority):
+                    return fn()
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.quota_retries:
+                    raise
+                with self._cond:
+                    self.quota_errors += 1
+                time.sleep(min(8.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "queued": len(self._waiting),
+                "quota_errors": self.quota_errors,
+                "lanes": {LANE_NAMES.get(lane, str(lane)): stats.as_dict() for lane, stats in self._stats.items()},
+            }
+
+
+class QuotaLimitedModel(FakeModel):
+    """FakeModel that rejects calls beyond `rpm` per sliding minute, like a Vertex AI quota"""
+
+    def __init__(self, rpm: int, latency: float = 0.05, window: float = 60.0, responder=None):
+        super().__init__(latency=latency, responder=responder)
+        self.rpm = rpm
+        self.window = window
+        self.rejections = 0
+        self._calls = deque()
+
+    def generate_content(self, contents):
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.window:
+                self._calls.popleft()
+            if len(self._calls) >= self.rpm:
+                self.rejections += 1
+                raise QuotaExceededError("429 Quota exceeded for aiplatform.googleapis.com")
+            self._calls.append(now)
+        return super().generate_content(contents)
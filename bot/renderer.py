@@ -0,0 +1,86 @@
+# bot/renderer.py (Jinja2 page templates for the static shop, compiled once at import)
+import hashlib
+import json
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from asset_pipeline import build_bundles
+from category_classifier import CATEGORIES
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+FALLBACK_IMAGE = "https://storage.googleapis.com/craftlink-images/fallback1.jpg"
+INDEX_CATEGORIES = ["all"] + CATEGORIES
+
+# Filled in ahead of rendering so the template only does plain item lookups
+PRODUCT_DEFAULTS = {
+    "reviews_count": 12,
+    "category": "Handmade",
+    "material": "Natural Materials",
+    "artisan_name": "Local Artisan",
+    "artisan_region": "India",
+    "orders_completed": 25,
+    "rating": 4.8,
+    "original_price": None,
+}
+
+
+# Shared CSS/JS, built once per process; pages link them by content-hashed name
+ASSET_BUNDLES = build_bundles(TEMPLATE_DIR)
+ASSET_NAMES = {kind: name for kind, (name, _) in ASSET_BUNDLES.items()}
+
+
+def _template_version() -> str:
+    """Hash of every template file and bundle name, so a template or asset edit invalidates all built pages"""
+    digest = hashlib.sha256(json.dumps(ASSET_NAMES, sort_keys=True).encode())
+    for folder, _, files in sorted(os.walk(TEMPLATE_DIR)):
+        for name in sorted(files):
+            path = os.path.join(folder, name)
+            digest.update(os.path.relpath(path, TEMPLATE_DIR).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+TEMPLATE_VERSION = _template_version()
+
+
+def clip(value, length: int) -> str:
+    """Cut text to length with a trailing ellipsis, like the old f-string slices"""
+    value = str(value or "")
+    return value[:length] + "..." if len(value) > length else value
+
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+    auto_reload=False,
+)
+env.filters["clip"] = clip
+env.globals["fallback_image"] = FALLBACK_IMAGE
+env.globals["assets"] = ASSET_NAMES
+
+# Parsed and compiled to Python once; every render afterwards only runs the compiled code
+product_template = env.get_template("product.html")
+seller_template = env.get_template("seller.html")
+index_template = env.get_template("index.html")
+
+
+def render_product(product: dict, images: list = None) -> str:
+    """Product detail page"""
+    images = images or product.get("images") or [FALLBACK_IMAGE]
+    return product_template.render(product={**PRODUCT_DEFAULTS, **product}, images=images)
+
+
+def render_seller(seller: dict, products: list) -> str:
+    """Seller profile page with up to 9 of their products"""
+    return seller_template.render(seller=seller, products=products)
+
+
+def render_index(products: list, reels: list, sellers: list, category_counts: dict = None) -> str:
+    """Home page; sellers is a list of (phone, summary) pairs, category_counts feeds the filter buttons"""
+    return index_template.render(categories=INDEX_CATEGORIES, products=products, reels=reels, sellers=sellers,
+                                 category_counts=category_counts or {})
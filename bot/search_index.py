@@ -0,0 +1,380 @@
+# bot/search_index.py (static inverted index in prefix shards, searched in the browser)
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+
+from renderer import FALLBACK_IMAGE, clip
+
+SEARCH_DIR = "search"
+MANIFEST_NAME = "manifest.json"
+# Terms are sharded by their first PREFIX_LENGTH characters; a query term fetches one shard
+PREFIX_LENGTH = 2
+# Result rows are fetched in chunks of this many products
+DOC_CHUNK = 100
+INDEXED_FIELDS = ("title", "description", "category", "material", "artisan_name", "artisan_region")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its", "of",
+    "on", "or", "our", "that", "the", "this", "to", "with", "you", "your",
+}
+
+
+def _word_pattern():
+    """Runs of letters, digits and combining marks: the same words the browser's p{L}p{M}p{N} regex finds.
+
+    Python's \\w leaves out marks, which would split Kannada or Hindi words at every vowel sign.
+    """
+    marks = [code for code in range(0x10000) if unicodedata.category(chr(code)).startswith("M")]
+    ranges = []
+    for code in marks:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    # One character class is much faster than an alternation; callers turn "_" into a space first
+    return re.compile(r"[\w" + "".join(f"\\u{a:04x}-\\u{b:04x}" for a, b in ranges) + "]+")
+
+
+_WORD = _word_pattern()
+
+
+def tokenize(text: str) -> list:
+    return [word for word in _WORD.findall(str(text or "").lower().replace("_", " ")) if len(word) >= PREFIX_LENGTH and word not in STOPWORDS]
+
+
+def _doc_row(product: dict) -> list:
+    """What a result card needs: [id, title, price, first image, category, description]"""
+    return [product["id"], clip(product.get("title"), 50), product.get("price"),
+            (product.get("images") or [FALLBACK_IMAGE])[0], product.get("category") or "handmade",
+            clip(product.get("description"), 80)]
+
+
+def _delta(postings: list) -> list:
+    """Sorted doc numbers as gaps, with a run of n consecutive docs written as -n.
+
+    [3, 4, 5, 6, 9] becomes [3, -3, 3]: start at 3, the next three docs, then 3 further on.
+    """
+    encoded = [postings[0]]
+    for previous, number in zip(postings, postings[1:]):
+        gap = number - previous
+        if gap == 1 and encoded[-1] < 0:
+            encoded[-1] -= 1
+        else:
+            encoded.append(-1 if gap == 1 else gap)
+    return encoded
+
+
+def _undelta(gaps: list) -> list:
+    numbers = []
+    for gap in gaps:
+        if gap < 0:
+            numbers.extend(range(numbers[-1] + 1, numbers[-1] - gap + 1))
+        else:
+            numbers.append(numbers[-1] + gap if numbers else gap)
+    return numbers
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def _hashed(stem: str, content: str) -> str:
+    return f"{stem}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]}.json"
+
+
+def _terms(product: dict) -> set:
+    # One regex pass over all fields, deduplicated before filtering
+    text = " ".join(str(product.get(name) or "") for name in INDEXED_FIELDS)
+    return {term for term in _WORD.findall(text.lower().replace("_", " "))
+            if len(term) >= PREFIX_LENGTH and term not in STOPWORDS}
+
+
+class SearchIndex:
+    """The index in memory, so a changed product re-renders only the files it touches.
+
+    upsert() re-tokenizes just the given products: the shards of terms they
+    gained or lost and the doc chunks holding their rows are rebuilt, every
+    other file keeps its name. An edited product keeps its doc number; a new
+    one is appended, so it still ranks as the newest.
+    """
+
+    def __init__(self, products: list):
+        docs = [product for product in products if isinstance(product, dict) and product.get("id")]
+        self.numbers = {}
+        self.terms = []
+        self.rows = []
+        self.postings = {}
+        self.prefixes = {}
+        # term -> its gaps and its '"term":[gaps]' JSON, so a shard re-encodes only the terms that
+        # changed, and appending a doc to a long posting list only touches the end of both
+        self._gaps = {}
+        self._encoded = {}
+        for product in docs:
+            if product["id"] in self.numbers:
+                continue
+            self._append(product)
+        self.shard_names = {prefix: _hashed("terms", self._shard(prefix)) for prefix in self.prefixes}
+        self.chunk_names = [_hashed("docs", self._chunk(number)) for number in range(len(self.chunk_starts()))]
+
+    def chunk_starts(self) -> range:
+        return range(0, len(self.rows), DOC_CHUNK)
+
+    def _append(self, product: dict):
+        number = len(self.rows)
+        self.numbers[product["id"]] = number
+        self.rows.append(_doc_row(product))
+        self.terms.append(_terms(product))
+        for term in self.terms[number]:
+            self._post(term, number)
+
+    def _post(self, term: str, number: int):
+        postings = self.postings.get(term)
+        if postings is None:
+            self.postings[term] = [number]
+            self.prefixes.setdefault(term[:PREFIX_LENGTH], set()).add(term)
+        elif postings[-1] < number:
+            gap = number - postings[-1]
+            postings.append(number)
+            gaps, encoded = self._gaps.get(term), self._encoded.get(term)
+            if gaps is not None:
+                if gap == 1 and gaps[-1] < 0:
+                    gaps[-1] -= 1
+                    if encoded is not None:
+                        # Terms are word characters, so the last "," or "[" starts the last gap
+                        cut = max(encoded.rfind(","), encoded.rfind("["))
+                        self._encoded[term] = f"{encoded[:cut + 1]}{gaps[-1]}]"
+                else:
+                    gaps.append(-1 if gap == 1 else gap)
+                    if encoded is not None:
+                        self._encoded[term] = f"{encoded[:-1]},{gaps[-1]}]"
+            return
+        else:
+            bisect.insort(postings, number)
+        self._gaps.pop(term, None)
+        self._encoded.pop(term, None)
+
+    def _unpost(self, term: str, number: int):
+        self._gaps.pop(term, None)
+        self._encoded.pop(term, None)
+        postings = self.postings[term]
+        postings.pop(bisect.bisect_left(postings, number))
+        if not postings:
+            del self.postings[term]
+            prefix = self.prefixes[term[:PREFIX_LENGTH]]
+            prefix.discard(term)
+            if not prefix:
+                del self.prefixes[term[:PREFIX_LENGTH]]
+
+    def _shard(self, prefix: str) -> str:
+        """The same text as _dump({term: gaps}): keys sorted, no spaces"""
+        parts = []
+        for term in sorted(self.prefixes[prefix]):
+            encoded = self._encoded.get(term)
+            if encoded is None:
+                gaps = self._gaps.get(term)
+                if gaps is None:
+                    gaps = self._gaps[term] = _delta(self.postings[term])
+                encoded = self._encoded[term] = f"{_dump(term)}:{_dump(gaps)}"
+            parts.append(encoded)
+        return "{" + ",".join(parts) + "}"
+
+    def _chunk(self, chunk: int) -> str:
+        return _dump(self.rows[chunk * DOC_CHUNK:(chunk + 1) * DOC_CHUNK])
+
+    def upsert(self, products: list) -> dict:
+        """Apply new or edited products; returns {file name: content} for the files that changed"""
+        dirty_prefixes, dirty_chunks = set(), set()
+        for product in products:
+            if not isinstance(product, dict) or not product.get("id"):
+                continue
+            number = self.numbers.get(product["id"])
+            if number is None:
+                self._append(product)
+                number = len(self.rows) - 1
+                changed = self.terms[number]
+            else:
+                row, terms = _doc_row(product), _terms(product)
+                if row != self.rows[number]:
+                    self.rows[number] = row
+                    dirty_chunks.add(number // DOC_CHUNK)
+                old = self.terms[number]
+                for term in old - terms:
+                    self._unpost(term, number)
+                for term in terms - old:
+                    self._post(term, number)
+                self.terms[number] = terms
+                changed = old ^ terms
+            if number == len(self.rows) - 1:
+                dirty_chunks.add(number // DOC_CHUNK)
+            dirty_prefixes.update(term[:PREFIX_LENGTH] for term in changed)
+
+        files = {}
+        for prefix in dirty_prefixes:
+            if prefix in self.prefixes:
+                content = self._shard(prefix)
+                self.shard_names[prefix] = _hashed("terms", content)
+                files[self.shard_names[prefix]] = content
+            else:
+                self.shard_names.pop(prefix, None)
+        for chunk in sorted(dirty_chunks):
+            content = self._chunk(chunk)
+            name = _hashed("docs", content)
+            if chunk < len(self.chunk_names):
+                self.chunk_names[chunk] = name
+            else:
+                self.chunk_names.append(name)
+            files[name] = content
+        return files
+
+    def files(self) -> dict:
+        files = {self.shard_names[prefix]: self._shard(prefix) for prefix in self.prefixes}
+        files.update({name: self._chunk(chunk) for chunk, name in enumerate(self.chunk_names)})
+        return files
+
+    def manifest(self) -> dict:
+        shard_names = dict(sorted(self.shard_names.items()))
+        return {
+            "version": hashlib.sha256(_dump([shard_names, self.chunk_names]).encode("utf-8")).hexdigest()[:16],
+            "docs": len(self.rows),
+            "doc_chunk": DOC_CHUNK,
+            "prefix": PREFIX_LENGTH,
+            "stopwords": sorted(STOPWORDS),
+            "shards": shard_names,
+            "doc_chunks": list(self.chunk_names),
+        }
+
+
+def build_search_index(products: list) -> tuple:
+    """(manifest, {file name: content}) for the catalog; doc numbers follow catalog order, newest last"""
+    index = SearchIndex(products)
+    return index.manifest(), index.files()
+
+
+@dataclass
+class SearchIndexReport:
+    docs: int = 0
+    terms: int = 0
+    shards: int = 0
+    bytes: int = 0
+    largest_shard: int = 0
+    written: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (f"{self.docs} products, {self.terms} terms in {self.shards} shards, {self.bytes / 1024:.0f} KB "
+                f"(largest shard {self.largest_shard / 1024:.1f} KB); {len(self.written)} files written, "
+                f"{len(self.removed)} removed in {self.elapsed:.2f}s")
+
+
+# out_dir -> the SearchIndex last written there, for incremental updates; writes hold the lock
+_live = {}
+_live_lock = threading.Lock()
+
+
+def write_search_index(products: list, out_dir: str = "../shop/out") -> SearchIndexReport:
+    """Write shards and doc chunks under out/search, then the manifest.
+
+    File names carry a content hash, so unchanged shards are neither rewritten nor
+    re-published and can be cached forever; only manifest.json is revalidated.
+    """
+    start = time.perf_counter()
+    with _live_lock:
+        index = SearchIndex(products)
+        files = index.files()
+        report = _publish(index, files, out_dir, prune=True)
+        _live[out_dir] = index
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def update_search_index(changed: list, out_dir: str = "../shop/out", load_products=None) -> SearchIndexReport:
+    """Apply new or edited products to the index last written to out_dir, writing only the files they touch.
+
+    Without an index in memory yet (first change since start), load_products()
+    is indexed in full once.
+    """
+    start = time.perf_counter()
+    with _live_lock:
+        index = _live.get(out_dir)
+        if index is None:
+            index = SearchIndex(load_products() if load_products else changed)
+            files = index.files()
+            report = _publish(index, files, out_dir, prune=True)
+            _live[out_dir] = index
+        else:
+            replaced = set(index.shard_names.values()) | set(index.chunk_names)
+            files = index.upsert(changed)
+            report = _publish(index, files, out_dir, prune=False)
+            # Old versions of the rewritten files, now that the manifest no longer names them
+            current = set(index.shard_names.values()) | set(index.chunk_names)
+            for name in sorted(replaced - current):
+                try:
+                    os.remove(os.path.join(out_dir, SEARCH_DIR, name))
+                    report.removed.append(name)
+                except OSError:
+                    pass
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _publish(index: SearchIndex, files: dict, out_dir: str, prune: bool) -> SearchIndexReport:
+    search_dir = os.path.join(out_dir, SEARCH_DIR)
+    os.makedirs(search_dir, exist_ok=True)
+    manifest = index.manifest()
+
+    report = SearchIndexReport(docs=manifest["docs"], shards=len(manifest["shards"]), terms=len(index.postings))
+    for name, content in files.items():
+        size = len(content.encode("utf-8"))
+        report.bytes += size
+        if name.startswith("terms."):
+            report.largest_shard = max(report.largest_shard, size)
+        path = os.path.join(search_dir, name)
+        if not os.path.exists(path):
+            _write_text(path, content)
+            report.written.append(name)
+
+    # The manifest goes last, so a client never sees it reference a missing shard
+    manifest_text = _dump(manifest)
+    report.bytes += len(manifest_text.encode("utf-8"))
+    manifest_path = os.path.join(search_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path) or open(manifest_path, encoding="utf-8").read() != manifest_text:
+        _write_text(manifest_path, manifest_text)
+        report.written.append(MANIFEST_NAME)
+    if prune:
+        for name in os.listdir(search_dir):
+            if name != MANIFEST_NAME and name not in files and not name.endswith(".tmp"):
+                os.remove(os.path.join(search_dir, name))
+                report.removed.append(name)
+    return report
+
+
+def _write_text(path: str, content: str):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def search(query: str, manifest: dict, files: dict, limit: int = 48) -> list:
+    """Reference implementation of the browser's lookup, for tests and benchmarks: product ids, newest first"""
+    matches = None
+    for word in tokenize(query):
+        shard = files.get(manifest["shards"].get(word[:manifest["prefix"]]))
+        docs = set()
+        for term, gaps in (json.loads(shard) if shard else {}).items():
+            if term.startswith(word):
+                docs.update(_undelta(gaps))
+        matches = docs if matches is None else matches & docs
+    if not matches:
+        return []
+    rows = []
+    for number in sorted(matches, reverse=True)[:limit]:
+        chunk = json.loads(files[manifest["doc_chunks"][number // manifest["doc_chunk"]]])
+        rows.append(chunk[number % manifest["doc_chunk"]][0])
+    return rows
@@ -1,11 +1,62 @@
-import requests
+# bot/ship.py (shipping labels through a pluggable carrier, one at a time or in batches)
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DemoCarrier:
+    """Generates demo AWBs locally: the stand-in until a real carrier is integrated"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def create_label(self, buyer_name: str, buyer_addr: str) -> dict:
+        # In production, integrate with Delhivery/Shippo API
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            "awb": f"DL{os.urandom(4).hex().upper()}",
+            "label_url": "https://demo.delhivery.com/label/sample",
+            "tracking_url": "https://demo.delhivery.com/track/"
+        }
+
+
+def make_carrier(name: str = None):
+    """SHIP_CARRIER: "demo" (default). A carrier is any object with create_label(buyer_name, buyer_addr) -> dict"""
+    name = name or os.getenv("SHIP_CARRIER", "demo")
+    if name != "demo":
+        raise ValueError(f"Unknown carrier: {name}")
+    return DemoCarrier(latency=float(os.getenv("SHIP_DEMO_LATENCY", "0")))
+
+
+carrier = make_carrier()
+
+# Bounds concurrent carrier API calls across all batches
+label_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SHIP_WORKERS", "8")), thread_name_prefix="label")
+
 
 def create_label(buyer_name: str, buyer_addr: str) -> dict:
     """Create shipping label (demo version)"""
-    # In production, integrate with Delhivery/Shippo API
-    return {
-        "awb": f"DL{os.urandom(4).hex().upper()}",
-        "label_url": "https://demo.delhivery.com/label/sample",
-        "tracking_url": "https://demo.delhivery.com/track/"
-    }
\ No newline at end of file
+    return carrier.create_label(buyer_name, buyer_addr)
+
+
+def validate_orders(orders: list, products: list) -> tuple:
+    """(valid, invalid): orders checked against the catalog with one id index built in a single pass.
+
+    valid holds (index, order, product); invalid holds (index, order, error).
+    """
+    by_id = {product.get("id"): product for product in products if isinstance(product, dict)}
+    valid, invalid = [], []
+    for index, order in enumerate(orders):
+        if not isinstance(order, dict):
+            invalid.append((index, {}, "order must be an object"))
+            continue
+        missing = [name for name in ("product_id", "buyer_name", "buyer_address") if not str(order.get(name) or "").strip()]
+        product = by_id.get(order.get("product_id"))
+        if missing:
+            invalid.append((index, order, f"missing {', '.join(missing)}"))
+        elif product is None:
+            invalid.append((index, order, "product not found"))
+        else:
+            valid.append((index, order, product))
+    return valid, invalid
@@ -0,0 +1,274 @@
+# bot/site_build.py (incremental static site build driven by a content-hash manifest)
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from asset_pipeline import OUTPUT_VERSION, minify_html, remove_with_variants, write_assets, write_precompressed
+from catalog import HomeAggregates
+from renderer import TEMPLATE_VERSION, FALLBACK_IMAGE, ASSET_BUNDLES, render_product, render_seller, render_index
+
+MANIFEST_NAME = ".build-manifest.json"
+INDEX_PAGE = "index.html"
+# Below this many dirty pages a process pool costs more than it saves (with
+# PRECOMPRESS=1, brotli at quality 11 dominates at ~15 ms a page)
+PARALLEL_MIN_PAGES = 32
+
+_manifest_lock = threading.Lock()
+
+
+def page_digest(*inputs) -> str:
+    """Hash of everything a page is rendered from, plus the template and output-stage versions"""
+    payload = json.dumps([TEMPLATE_VERSION, OUTPUT_VERSION, inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def manifest_path(out_dir: str) -> str:
+    # Kept next to out/ rather than inside it, so it is never deployed
+    return os.path.join(os.path.dirname(os.path.abspath(out_dir)), MANIFEST_NAME)
+
+
+def load_manifest(out_dir: str) -> dict:
+    path = manifest_path(out_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("pages"), dict):
+                return manifest
+        except (OSError, ValueError) as e:
+            print(f"❌ Ignoring unreadable build manifest: {e}")
+    return {"template": None, "pages": {}}
+
+
+def save_manifest(out_dir: str, manifest: dict):
+    path = manifest_path(out_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def write_page(path: str, html: str) -> dict:
+    """Minify a rendered page and write it plus any .br/.gz siblings (PRECOMPRESS=1), each atomically.
+
+    Returns byte counts: "rendered" before minification, "raw" as written, and one
+    per compressed encoding.
+    """
+    data = minify_html(html).encode("utf-8")
+    return {"rendered": len(html.encode("utf-8")), **write_precompressed(path, data)}
+
+
+def seller_card(product: dict, products_count: int) -> dict:
+    """Card data for the index's artisan section, from the seller's earliest product"""
+    return {
+        "name": product.get("artisan_name", "Local Artisan"),
+        "region": product.get("artisan_region", "India"),
+        "products_count": products_count,
+        "image": product.get("images", [])[0] if product.get("images") else FALLBACK_IMAGE
+    }
+
+
+def product_page(product: dict) -> tuple:
+    """(digest, render args) for one product's page"""
+    images = product.get("images") or [FALLBACK_IMAGE]
+    return page_digest(product, images), ("product", product, images)
+
+
+def seller_page(seller: dict, seller_products: list) -> tuple:
+    """(digest, render args) for a seller's page; the page shows their first 9 products, so only those are inputs"""
+    shown = seller_products[:9]
+    return page_digest(seller, shown), ("seller", seller, shown)
+
+
+def index_page(home: HomeAggregates) -> tuple:
+    """(digest, render args) for the home page, read from the aggregates in O(items shown)"""
+    latest, recent_reels = home.latest_products(), home.latest_reels()
+    featured = [(phone, seller_card(product, count)) for phone, product, count in home.featured_sellers()]
+    counts = home.category_counts()
+    return (page_digest(latest, recent_reels, featured, counts),
+            ("index", latest, recent_reels, featured, counts))
+
+
+def plan_pages(products: list, sellers: list, reels: list, kinds: tuple = ("product", "seller", "index"),
+               home: HomeAggregates = None) -> dict:
+    """path -> (digest, render args) for every page the catalog should produce.
+
+    home supplies the index's aggregates; without it they are computed from the lists.
+    """
+    pages = {}
+    if "product" in kinds:
+        for product in products:
+            if product.get("id"):
+                pages[f"product/{product['id']}.html"] = product_page(product)
+
+    if "seller" in kinds:
+        products_by_seller = {}
+        for product in products:
+            products_by_seller.setdefault(product.get("artisan_phone"), []).append(product)
+        for seller in sellers:
+            phone = seller.get("phone")
+            if phone:
+                pages[f"seller/{phone}.html"] = seller_page(seller, products_by_seller.get(phone, []))
+
+    if "index" in kinds:
+        pages[INDEX_PAGE] = index_page(home or HomeAggregates().fit(products, reels))
+    return pages
+
+
+def render_page(args: tuple) -> str:
+    kind = args[0]
+    if kind == "product":
+        return render_product(args[1], args[2])
+    if kind == "seller":
+        return render_seller(args[1], args[2])
+    return render_index(args[1], args[2], args[3], args[4])
+
+
+def _render_batch(out_dir: str, batch: list, write=write_page) -> list:
+    """Pool worker: render, minify and compress a batch of (path, render args); returns (path, sizes) pairs"""
+    return [(path, write(os.path.join(out_dir, path), render_page(args))) for path, args in batch]
+
+
+def _render_pages(out_dir: str, todo: list, jobs: int, progress=None, write=write_page):
+    """Render (path, args) pairs serially or sharded across a process pool; yields (path, sizes) as pages finish"""
+    for folder in {os.path.dirname(os.path.join(out_dir, path)) for path, _ in todo}:
+        os.makedirs(folder, exist_ok=True)
+
+    if jobs <= 1 or len(todo) < PARALLEL_MIN_PAGES:
+        for done, (path, args) in enumerate(todo, 1):
+            yield path, write(os.path.join(out_dir, path), render_page(args))
+            if progress and (done % 100 == 0 or done == len(todo)):
+                progress(done, len(todo))
+        return
+
+    # Several small batches per worker keep the pool busy and progress updates frequent
+    size = max(1, min(500, len(todo) // (jobs * 8)))
+    done = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_render_batch, out_dir, todo[i:i + size], write) for i in range(0, len(todo), size)]
+        for future in as_completed(futures):
+            pages = future.result()
+            yield from pages
+            done += len(pages)
+            if progress:
+                progress(done, len(todo))
+
+
+def _dirty_pages(planned: dict, built: dict, out_dir: str, force: bool, report) -> list:
+    """(path, render args) for planned pages whose digest changed or whose file is missing"""
+    todo = []
+    for path, (digest, args) in planned.items():
+        if not force and built.get(path) == digest and os.path.exists(os.path.join(out_dir, path)):
+            report.unchanged += 1
+        else:
+            report.dirty.append(path)
+            todo.append((path, args))
+    return todo
+
+
+def _page_kind(path: str) -> str:
+    return "index" if path == INDEX_PAGE else path.split("/", 1)[0]
+
+
+@dataclass
+class BuildReport:
+    dirty: list = field(default_factory=list)
+    unchanged: int = 0
+    removed: list = field(default_factory=list)
+    elapsed: float = 0.0
+    # Totals over the pages written: rendered HTML, minified output and each precompressed variant
+    bytes: dict = field(default_factory=dict)
+
+    def count_bytes(self, sizes: dict):
+        for name, size in sizes.items():
+            self.bytes[name] = self.bytes.get(name, 0) + size
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes.get("rendered", 0) - self.bytes.get("raw", 0)
+
+    @property
+    def pages_per_second(self) -> float:
+        return len(self.dirty) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        summary = (f"{len(self.dirty)} pages rebuilt, {self.unchanged} unchanged, "
+                   f"{len(self.removed)} removed in {self.elapsed:.2f}s ({self.pages_per_second:.0f} pages/s)")
+        if self.bytes.get("rendered"):
+            compressed = "".join(f", {name} {size / 1024:.0f} KB" for name, size in self.bytes.items()
+                                 if name not in ("rendered", "raw"))
+            summary += (f"; {self.bytes['rendered'] / 1024:.0f} KB -> {self.bytes['raw'] / 1024:.0f} KB minified "
+                        f"({self.bytes_saved / 1024:.0f} KB saved){compressed}")
+        return summary
+
+
+def rebuild_site(products: list, sellers: list, reels: list, out_dir: str = "../shop/out",
+                 kinds: tuple = ("product", "seller", "index"), force: bool = False,
+                 dry_run: bool = False, jobs: int = 1, progress=None, home: HomeAggregates = None,
+                 write=write_page) -> BuildReport:
+    """Re-render only pages whose inputs changed and delete pages of removed products/sellers.
+
+    With jobs > 1 large rebuilds are sharded across a process pool; progress(done, total)
+    is called as pages finish. write(path, html) -> sizes stores each page (write_page by
+    default; it must be a module-level function when jobs > 1).
+    """
+    start = time.perf_counter()
+    report = BuildReport()
+    with _manifest_lock:
+        manifest = load_manifest(out_dir)
+        built = manifest["pages"]
+        planned = plan_pages(products, sellers, reels, kinds, home)
+        todo = _dirty_pages(planned, built, out_dir, force, report)
+
+        # Only pages this build wrote are candidates, so hand-made files are left alone
+        report.removed = [p for p in built if p not in planned and _page_kind(p) in kinds]
+        if dry_run:
+            report.elapsed = time.perf_counter() - start
+            return report
+
+        try:
+            # Pages link the bundles by hashed name, so they must exist before any page does
+            write_assets(out_dir, ASSET_BUNDLES)
+            for path, sizes in _render_pages(out_dir, todo, jobs, progress, write):
+                built[path] = planned[path][0]
+                report.count_bytes(sizes)
+            for path in report.removed:
+                remove_with_variants(os.path.join(out_dir, path))
+                del built[path]
+        finally:
+            # Record whatever did get written, even if a worker failed part-way
+            manifest["template"] = TEMPLATE_VERSION
+            save_manifest(out_dir, manifest)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def render_products(products: list, out_dir: str = "../shop/out", force: bool = False, jobs: int = 1,
+                    write=write_page) -> BuildReport:
+    """Render product pages straight from the given records, recording them in the manifest.
+
+    Unlike rebuild_site this touches only these products' pages and never reads the
+    catalog, so callers that already hold the record (a new upload, an API create)
+    can publish it before or without a full rebuild.
+    """
+    start = time.perf_counter()
+    report = BuildReport()
+    with _manifest_lock:
+        manifest = load_manifest(out_dir)
+        built = manifest["pages"]
+        planned = plan_pages(products, [], [], ("product",))
+        todo = _dirty_pages(planned, built, out_dir, force, report)
+        try:
+            write_assets(out_dir, ASSET_BUNDLES)
+            for path, sizes in _render_pages(out_dir, todo, jobs, write=write):
+                built[path] = planned[path][0]
+                report.count_bytes(sizes)
+        finally:
+            manifest["template"] = TEMPLATE_VERSION
+            save_manifest(out_dir, manifest)
+    report.elapsed = time.perf_counter() - start
+    return report
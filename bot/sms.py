@@ -1,16 +1,115 @@
-from twilio.rest import Client
-import os
-
-client = Client(os.getenv("TWILIO_SID"), os.getenv("TWILIO_TOKEN"))
-
-def send_tracking(to: str, awb: str):
-    """Send tracking information via WhatsApp"""
-    try:
-        message = client.messages.create(
-            body=f"आपका ऑर्डर भेज दिया गया है। ट्रैकिंग: {awb}",
-            from_="whatsapp:+14155238886",
-            to=f"whatsapp:{to}"
-        )
-        print(f"Tracking sent: {message.sid}")
-    except Exception as e:
-        print(f"Failed to send tracking: {e}")
\ No newline at end of file
+# bot/sms.py (shipping notifications over WhatsApp, through the shared outbound dispatcher)
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from string import Template
+
+from outbound import send_message
+from rate_limit import BULK
+
+DEFAULT_LANGUAGE = "hi"
+TRACKING_TEMPLATES = {
+    "hi": "आपका ऑर्डर भेज दिया गया है। ट्रैकिंग: $awb",
+    "en": "Your order has been shipped. Tracking: $awb",
+    "kn": "ನಿಮ್ಮ ಆರ್ಡರ್ ಕಳುಹಿಸಲಾಗಿದೆ. ಟ್ರ್ಯಾಕಿಂಗ್: $awb",
+}
+
+_PHONE = re.compile(r"^\+?\d{10,15}$")
+
+
+@lru_cache(maxsize=None)
+def _template(language: str) -> Template:
+    return Template(TRACKING_TEMPLATES.get(language) or TRACKING_TEMPLATES[DEFAULT_LANGUAGE])
+
+
+def render_tracking(awb: str, language: str = DEFAULT_LANGUAGE) -> str:
+    return _template(str(language or DEFAULT_LANGUAGE).lower()).substitute(awb=awb)
+
+
+def whatsapp_address(phone: str) -> str:
+    phone = str(phone or "").strip()
+    return phone if phone.startswith("whatsapp:") else f"whatsapp:{phone}"
+
+
+def send_tracking(to: str, awb: str, language: str = DEFAULT_LANGUAGE):
+    """Queue tracking information via WhatsApp"""
+    future = send_message(whatsapp_address(to), render_tracking(awb, language))
+    future.add_done_callback(lambda f: print(
+        f"Failed to send tracking: {f.exception()}" if f.exception() else f"Tracking sent: {f.result()}"
+    ))
+
+
+class NotificationJobs:
+    """Batches of tracking messages, each item's status kept under a job id until max_jobs newer batches arrive.
+
+    Items are queued on the outbound dispatcher's BULK lane, so they share its
+    worker pool and rate limit without delaying replies to users.
+    """
+
+    def __init__(self, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, items: list) -> dict:
+        job_id = uuid.uuid4().hex[:12]
+        job = {"job_id": job_id, "created_at": time.time(), "items": []}
+        queued = []
+        for item in items:
+            item = item if isinstance(item, dict) else {}
+            phone = str(item.get("phone") or "").replace("whatsapp:", "").replace(" ", "")
+            awb = str(item.get("awb") or "").strip()
+            language = str(item.get("language") or DEFAULT_LANGUAGE).lower()
+            entry = {"phone": phone, "awb": awb, "language": language, "status": "queued"}
+            if not _PHONE.match(phone) or not awb:
+                entry.update(status="invalid", error="phone and awb are required")
+            else:
+                queued.append(entry)
+            job["items"].append(entry)
+
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        for entry in queued:
+            future = send_message(whatsapp_address(entry["phone"]), render_tracking(entry["awb"], entry["language"]), BULK)
+            future.add_done_callback(lambda f, entry=entry: self._done(entry, f))
+        return {"job_id": job_id, "accepted": len(queued), "invalid": len(items) - len(queued)}
+
+    def _done(self, entry: dict, future):
+        with self._lock:
+            if future.exception():
+                entry.update(status="failed", error=str(future.exception()))
+            else:
+                entry.update(status="sent", sid=future.result())
+
+    def status(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            counts = {}
+            for entry in job["items"]:
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return {
+                "job_id": job_id,
+                "created_at": job["created_at"],
+                "total": len(job["items"]),
+                "done": not counts.get("queued"),
+                "counts": counts,
+                "items": [dict(entry) for entry in job["items"]],
+            }
+
+
+notification_jobs = NotificationJobs()
+
+
+def notify_tracking(items: list) -> dict:
+    return notification_jobs.submit(items)
+
+
+def tracking_job_status(job_id: str):
+    return notification_jobs.status(job_id)
@@ -0,0 +1,88 @@
+# bot/static_server.py (local preview of shop/out that serves precompressed .br/.gz variants)
+import mimetypes
+import os
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from asset_pipeline import ASSET_DIR, ENCODINGS, IMMUTABLE_CACHE
+
+PAGE_CACHE = "public, max-age=0, must-revalidate"
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings a client accepts from its Accept-Encoding header (q=0 means refused)"""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()[2:] if params.strip().startswith("q=") else "1"
+        try:
+            if float(q) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            continue
+    return accepted
+
+
+def pick_variant(path: str, accept_encoding: str) -> tuple:
+    """(file to send, Content-Encoding or None): the best precompressed sibling the client accepts"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if (encoding in accepted or "*" in accepted) and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def cache_control(url_path: str) -> str:
+    if url_path.startswith(f"/{ASSET_DIR}/"):
+        return IMMUTABLE_CACHE
+    # Search shards are named by their content hash; only the manifest pointing at them changes
+    if url_path.startswith("/search/") and not url_path.endswith("/manifest.json"):
+        return IMMUTABLE_CACHE
+    return PAGE_CACHE
+
+
+class PrecompressedHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler that prefers page.html.br / .gz when the client accepts them"""
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        variant, encoding = pick_variant(path, self.headers.get("Accept-Encoding"))
+        f = open(variant, "rb")
+        try:
+            stat = os.fstat(f.fileno())
+            self.send_response(200)
+            self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+            self.send_header("Content-Length", str(stat.st_size))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Cache-Control", cache_control(self.path))
+            self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(root: str = "../shop/out", host: str = "127.0.0.1", port: int = 8080) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), partial(PrecompressedHandler, directory=root))
+
+
+def serve(root: str = "../shop/out", host: str = "127.0.0.1", port: int = 8080):
+    server = make_server(root, host, port)
+    print(f"✅ Serving {root} at http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,172 @@
+// Shop page behaviour, loaded deferred from every page; each part checks for its elements
+
+// Product page: swap the main image when a thumbnail is clicked
+function changeImage(src) {
+    document.getElementById('mainImage').src = src;
+}
+
+// Home page: search box and category filter
+let currentCategory = 'all';
+
+// Search covers the whole catalog through the static index in /search/: the manifest
+// names one shard per two-letter term prefix, so a query fetches only the shards and
+// result rows it needs. Without the index it falls back to filtering the cards shown.
+const searchIndex = {manifest: null, files: {}};
+const WORD = /[\p{L}\p{M}\p{N}]+/gu;
+const SEARCH_LIMIT = 48;
+
+function fetchSearchFile(name) {
+    if (!searchIndex.files[name]) {
+        searchIndex.files[name] = fetch('/search/' + name).then(response => {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        });
+    }
+    return searchIndex.files[name];
+}
+
+function searchTerms(text, manifest) {
+    return (text.toLowerCase().match(WORD) || [])
+        .filter(word => word.length >= manifest.prefix && !manifest.stopwords.includes(word));
+}
+
+async function searchCatalog(text) {
+    if (!searchIndex.manifest) {
+        searchIndex.manifest = fetchSearchFile('manifest.json');
+    }
+    const manifest = await searchIndex.manifest;
+    const words = searchTerms(text, manifest);
+    if (!words.length) return null;
+
+    let matches = null;
+    for (const word of words) {
+        const shardName = manifest.shards[word.slice(0, manifest.prefix)];
+        const shard = shardName ? await fetchSearchFile(shardName) : {};
+        const docs = new Set();
+        for (const term in shard) {
+            if (term.startsWith(word)) {
+                // Gaps between doc numbers; -n stands for the next n docs in a row
+                let doc = -1;
+                shard[term].forEach(gap => {
+                    if (gap < 0) {
+                        for (let i = 0; i < -gap; i++) docs.add(++doc);
+                    } else {
+                        doc = doc < 0 ? gap : doc + gap;
+                        docs.add(doc);
+                    }
+                });
+            }
+        }
+        matches = matches === null ? docs : new Set([...matches].filter(doc => docs.has(doc)));
+    }
+
+    // Newest first, as on the home page
+    const numbers = [...matches].sort((a, b) => b - a).slice(0, SEARCH_LIMIT);
+    const rows = [];
+    for (const number of numbers) {
+        const chunk = await fetchSearchFile(manifest.doc_chunks[Math.floor(number / manifest.doc_chunk)]);
+        rows.push(chunk[number % manifest.doc_chunk]);
+    }
+    return rows;
+}
+
+function resultCard(row) {
+    const [id, title, price, image, category, description] = row;
+    const card = document.createElement('div');
+    card.className = 'product-card search-result bg-white rounded-xl shadow-md overflow-hidden';
+    card.setAttribute('data-category', category);
+    card.innerHTML = '<img class="w-full h-48 object-cover"><div class="p-4">' +
+        '<h3 class="font-semibold text-lg mb-2"></h3><p class="text-gray-600 text-sm mb-3"></p>' +
+        '<div class="flex items-center justify-between"><span class="text-amber-600 font-bold"></span>' +
+        '<a class="text-amber-500 hover:text-amber-600">View →</a></div></div>';
+    card.querySelector('img').src = image;
+    card.querySelector('img').alt = title;
+    card.querySelector('h3').textContent = title;
+    card.querySelector('p').textContent = description;
+    card.querySelector('span').textContent = '₹' + price;
+    card.querySelector('a').href = '/product/' + id + '.html';
+    return card;
+}
+
+function showResults(rows) {
+    const container = document.getElementById('productsContainer');
+    container.querySelectorAll('.search-result').forEach(card => card.remove());
+    container.querySelectorAll('.product-card').forEach(card => { card.style.display = 'none'; });
+    let visibleCount = 0;
+    rows.forEach(row => {
+        if (currentCategory === 'all' || row[4] === currentCategory) {
+            container.appendChild(resultCard(row));
+            visibleCount++;
+        }
+    });
+    return visibleCount;
+}
+
+function filterShownProducts(searchTerm) {
+    document.querySelectorAll('.search-result').forEach(card => card.remove());
+    const products = document.querySelectorAll('.product-card');
+    let visibleCount = 0;
+
+    products.forEach(product => {
+        const title = product.querySelector('h3').textContent.toLowerCase();
+        const description = product.querySelector('p').textContent.toLowerCase();
+        const category = product.getAttribute('data-category');
+
+        if ((title.includes(searchTerm) || description.includes(searchTerm)) &&
+            (currentCategory === 'all' || category === currentCategory)) {
+            product.style.display = 'block';
+            visibleCount++;
+        } else {
+            product.style.display = 'none';
+        }
+    });
+    return visibleCount;
+}
+
+async function searchProducts() {
+    const searchTerm = document.getElementById('searchInput').value.toLowerCase();
+    let visibleCount;
+    try {
+        const rows = searchTerm.trim() ? await searchCatalog(searchTerm) : null;
+        visibleCount = rows ? showResults(rows) : filterShownProducts(searchTerm);
+    } catch (e) {
+        visibleCount = filterShownProducts(searchTerm);
+    }
+
+    // Show message if no products found
+    const noResults = document.getElementById('noResults');
+    if (visibleCount === 0) {
+        noResults.style.display = 'block';
+    } else {
+        noResults.style.display = 'none';
+    }
+}
+
+function filterByCategory(category) {
+    currentCategory = category;
+    searchProducts(); // This will apply both category filter and search term
+
+    // Update active category button
+    document.querySelectorAll('.category-btn').forEach(btn => {
+        if (btn.getAttribute('data-category') === category) {
+            btn.classList.add('bg-amber-500', 'text-white');
+            btn.classList.remove('bg-amber-100', 'text-amber-700');
+        } else {
+            btn.classList.remove('bg-amber-500', 'text-white');
+            btn.classList.add('bg-amber-100', 'text-amber-700');
+        }
+    });
+}
+
+const searchInput = document.getElementById('searchInput');
+if (searchInput) {
+    // Make search work on Enter key
+    searchInput.addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            searchProducts();
+        }
+    });
+
+    // Initialize with all products shown
+    filterByCategory('all');
+}
@@ -0,0 +1,37 @@
+# bot/test_deploy_shop.py (products.json writes never lose the existing catalog)
+import json
+
+import pytest
+
+import deploy_shop
+
+
+@pytest.fixture
+def shop(tmp_path, monkeypatch):
+    (tmp_path / "bot").mkdir()
+    (tmp_path / "shop" / "out").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / "bot")
+    return tmp_path / "shop" / "out" / "products.json"
+
+
+def test_failure_after_write_keeps_catalog(shop, monkeypatch):
+    shop.write_text(json.dumps({"products": [{"id": f"p{i}", "price": 100} for i in range(60)]}))
+
+    def broken(products):
+        raise RuntimeError("partition writer failed")
+    monkeypatch.setattr(deploy_shop, "publish_partitions", broken)
+    deploy_shop.update_products_json({"id": "new", "price": 200})
+
+    ids = [p["id"] for p in json.loads(shop.read_text())["products"]]
+    assert len(ids) == 61 and ids[-1] == "new"
+
+
+def test_unreadable_catalog_is_left_alone(shop):
+    shop.write_text('{"products": [')
+    deploy_shop.update_products_json({"id": "new", "price": 200})
+    assert shop.read_text() == '{"products": ['
+
+
+def test_missing_catalog_starts_with_the_product(shop):
+    deploy_shop.update_products_json({"id": "new", "price": 200})
+    assert json.loads(shop.read_text()) == {"products": [{"id": "new", "price": 200}]}
@@ -0,0 +1,72 @@
+# bot/test_idempotency.py (Twilio webhook retries answered once per MessageSid)
+import asyncio
+import threading
+
+from idempotency import MessageLedger
+
+
+async def _deliver(ledger: MessageLedger, sid: str, processed: list, release: asyncio.Event = None):
+    """What whatsapp_reply does with a delivery: process it once, or answer with the stored reply"""
+    content = await ledger.claim_or_wait(sid)
+    if content is not None:
+        return content
+    processed.append(sid)
+    if release is not None:
+        await release.wait()
+    reply = f"<Response>{sid} #{len(processed)}</Response>".encode("utf-8")
+    ledger.complete(sid, reply)
+    return reply
+
+
+def test_retry_gets_first_reply():
+    async def run():
+        ledger = MessageLedger()
+        processed = []
+        first = await _deliver(ledger, "SM1", processed)
+        retry = await _deliver(ledger, "SM1", processed)
+        return processed, first, retry
+
+    processed, first, retry = asyncio.run(run())
+    assert processed == ["SM1"]
+    assert retry == first
+
+
+def test_concurrent_retries_after_eviction_process_once():
+    async def run():
+        ledger = MessageLedger(max_entries=1)
+        processed = []
+        release = asyncio.Event()
+        first = asyncio.create_task(_deliver(ledger, "SM1", processed, release))
+        await asyncio.sleep(0)
+        retries = [asyncio.create_task(_deliver(ledger, "SM1", processed, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # Another message pushes SM1 out while its first delivery is still running
+        assert ledger.claim("SM2") is None
+        await asyncio.sleep(0.01)
+        release.set()
+        return processed, await asyncio.gather(first, *retries)
+
+    processed, (first, *retries) = asyncio.run(run())
+    # The first delivery and exactly one of the two retries ran; the other retry reused a reply
+    assert processed == ["SM1", "SM1"]
+    assert retries[0] == retries[1]
+
+
+def test_disk_is_only_touched_off_the_event_loop(tmp_path):
+    async def run(ledger, threads):
+        get, set_ = ledger.disk.get, ledger.disk.set
+        ledger.disk.get = lambda *args: threads.append(threading.current_thread()) or get(*args)
+        ledger.disk.set = lambda *args: threads.append(threading.current_thread()) or set_(*args)
+        return await _deliver(ledger, "SM1", [])
+
+    threads = []
+    ledger = MessageLedger(disk_dir=str(tmp_path))
+    first = asyncio.run(run(ledger, threads))
+    ledger._disk_writes.shutdown(wait=True)
+
+    # A restart: a fresh ledger on the same directory answers the retry from disk
+    restarted = MessageLedger(disk_dir=str(tmp_path))
+    assert asyncio.run(run(restarted, threads)) == first
+    assert restarted.stats["disk_hits"] == 1
+    assert len(threads) == 3 and threading.main_thread() not in threads
@@ -0,0 +1,33 @@
+# bot/test_pricing.py (incremental updates to the catalog price statistics)
+import json
+
+import pricing
+from pricing import PricingEngine
+
+
+def test_new_product_counted_once(tmp_path, monkeypatch):
+    products_file = tmp_path / "products.json"
+    products_file.write_text(json.dumps({"products": [{"price": 400, "category": "pottery"}]}))
+    monkeypatch.setattr(pricing, "pricing_engine", PricingEngine())
+    monkeypatch.setattr(pricing, "_loaded_from", None)
+
+    # What the create paths do: fit, write the file, then add
+    engine = pricing.load_pricing_engine(str(products_file))
+    product = {"price": 600, "category": "pottery"}
+    products_file.write_text(json.dumps({"products": [{"price": 400, "category": "pottery"}, product]}))
+    engine.add(product)
+
+    assert pricing.load_pricing_engine(str(products_file)).stats("category", "pottery")["count"] == 2
+
+
+def test_update_moves_price_between_groups():
+    engine = PricingEngine()
+    engine.fit([{"price": 100, "category": "pottery"}, {"price": 300, "category": "pottery"}])
+    engine.update({"price": 300, "category": "pottery"}, {"price": 900, "category": "textiles"})
+
+    assert engine.stats("category", "pottery")["count"] == 1
+    assert engine.stats("category", "textiles")["standard"] == 900
+    assert engine.stats("all")["count"] == 2
+
+    engine.remove({"price": 900, "category": "textiles"})
+    assert engine.stats("category", "textiles") is None
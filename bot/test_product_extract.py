@@ -0,0 +1,34 @@
+# bot/test_product_extract.py (price, title and category extraction from free-text descriptions)
+from product_extract import DEFAULT_PRICE, extract_product_info
+
+
+def test_labelled_bare_price():
+    assert extract_product_info("Price: 500").price == 500
+
+
+def test_labelled_bare_range():
+    info = extract_product_info("Terracotta diya set. Price: 300 - 600")
+    assert (info.price_low, info.price_high) == (300, 600)
+
+
+def test_currency_marked_amounts():
+    assert extract_product_info("Hand-thrown kulhad, Rs. 1,200 only").price == 1200
+    assert extract_product_info("Brass lamp for INR 999").price == 999
+    assert extract_product_info("Costs ₹ 250 – ₹ 400.").price == 325
+
+
+def test_unlabelled_numbers_are_not_prices():
+    assert extract_product_info("Made in 2 weeks by 3 artisans").price == DEFAULT_PRICE
+    assert extract_product_info("Soft colors 500 threads").price == DEFAULT_PRICE
+
+
+def test_hashtag_digits_are_not_prices():
+    info = extract_product_info("Clay pot #Top10Crafts ₹450")
+    assert info.price == 450
+    assert info.hashtags == ["Top10Crafts"]
+
+
+def test_title_and_category():
+    info = extract_product_info("Wheel thrown clay pot. Fired in a wood kiln. #HandmadePottery")
+    assert info.title == "Handmade Pottery"
+    assert info.category == "pottery"
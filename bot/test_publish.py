@@ -0,0 +1,35 @@
+# bot/test_publish.py (differential publish verified against what the target holds)
+import os
+
+from publish import DirectoryTarget, HttpTarget, Publisher, StandInHttpServer
+
+
+def _site(tmp_path):
+    source = tmp_path / "out"
+    (source / "product").mkdir(parents=True)
+    (source / "index.html").write_text("<h1>Shop</h1>")
+    (source / "product" / "p1.html").write_text("<h1>Clay pot</h1>")
+    return str(source)
+
+
+def test_corrupted_file_on_directory_target_fails_verification(tmp_path):
+    target = DirectoryTarget(str(tmp_path / "published"))
+    publisher = Publisher(target, _site(tmp_path), str(tmp_path / "state.json"))
+    assert publisher.publish().verified
+
+    with open(os.path.join(target.root, "product", "p1.html"), "w") as f:
+        f.write("<h1>truncated")
+    report = publisher.publish()
+    assert not report.verified
+    assert report.mismatched == ["product/p1.html"]
+
+
+def test_corrupted_file_on_http_target_fails_verification(tmp_path):
+    with StandInHttpServer() as server:
+        publisher = Publisher(HttpTarget(server.url), _site(tmp_path), str(tmp_path / "state.json"))
+        assert publisher.publish().verified
+
+        server.files["index.html"] = b""
+        report = publisher.publish()
+    assert not report.verified
+    assert report.mismatched == ["index.html"]
@@ -0,0 +1,66 @@
+# bot/webhook_log.py (sampled, redacted, lazily formatted logging for the WhatsApp webhook)
+import json
+import logging
+import random
+import re
+
+# Long digit runs with an optional leading + (WhatsApp numbers, phones typed into messages)
+_PHONE = re.compile(r"\+?\d[\d\s-]{6,}\d")
+
+
+def redact_phone(value: str) -> str:
+    """Keep the channel prefix, country code and last 4 digits: whatsapp:+91******3210"""
+    value = str(value or "")
+    prefix, _, number = value.rpartition(":")
+    digits = re.sub(r"\D", "", number)
+    if len(digits) <= 6:
+        return value
+    masked = f"{'+' if number.startswith('+') else ''}{digits[:2]}{'*' * (len(digits) - 6)}{digits[-4:]}"
+    return f"{prefix}:{masked}" if prefix else masked
+
+
+def redact_text(text: str, limit: int = 120) -> str:
+    """Message text with any phone-like numbers masked, clipped to limit characters"""
+    text = str(text or "")
+    if len(text) > limit:
+        text = text[:limit] + "..."
+    return _PHONE.sub(lambda m: redact_phone(m.group(0)), text)
+
+
+class _Fields:
+    """Rendered as key=value JSON only if the record is actually emitted"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+    def __str__(self):
+        return json.dumps(self.fields, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+class WebhookLogger:
+    """Structured webhook events: one JSON line per event, INFO events sampled.
+
+    Nothing is formatted unless the event is logged, phone numbers are masked,
+    and warnings/errors are always kept whatever the sample rate.
+    """
+
+    def __init__(self, logger: logging.Logger, sample_rate: float = 1.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def event(self, name: str, level: int = logging.INFO, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if "phone" in fields:
+            fields["phone"] = redact_phone(fields["phone"])
+        if "body" in fields:
+            fields["body"] = redact_text(fields["body"])
+        fields["event"] = name
+        self.logger.log(level, "webhook %s", _Fields(fields))
+
+    def error(self, name: str, **fields):
+        self.event(name, logging.ERROR, **fields)
@@ -1,5 +1,5 @@
 'use client'
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import Image from "next/image";
 import Link from "next/link";
 
@@ -12,37 +12,88 @@ interface Product {
   created_at: string;
 }
 
+interface Partition {
+  count: number;
+  versions: string[];
+}
+
+// products/index.json, written by the publisher next to the category and month pages
+interface PartitionIndex {
+  version: string;
+  total: number;
+  artisans: number;
+  latest: string | null;
+  months: Record<string, Partition>;
+}
+
+// Month pages newest first, so "Load more" walks back through the catalog
+function monthPages(index: PartitionIndex): string[] {
+  const months = Object.keys(index.months).sort((a, b) =>
+    a === 'undated' ? 1 : b === 'undated' ? -1 : b.localeCompare(a));
+  return months.flatMap(month =>
+    index.months[month].versions.map((_, page) => `month/${month}/${page}.json`).reverse());
+}
+
+async function fetchPage(path: string): Promise<Product[]> {
+  const response = await fetch('/products/' + path, { cache: 'no-cache' });
+  if (!response.ok) throw new Error('Failed to fetch products');
+  const data = await response.json();
+  // Pages hold a partition's products oldest first
+  return (data.products || []).slice().reverse();
+}
+
 export default function Home() {
   const [products, setProducts] = useState<Product[]>([]);
+  const [index, setIndex] = useState<PartitionIndex | null>(null);
+  const [pagesShown, setPagesShown] = useState(1);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const lastVersion = useRef('');
 
   useEffect(() => {
     const fetchProducts = async () => {
       try {
-        // Fetch from public JSON file (updated by deploy script)
-        const response = await fetch('/products.json?t=' + Date.now());
+        // Only the small index is polled; pages are refetched when its version changes
+        const response = await fetch('/products/index.json', { cache: 'no-cache' });
         if (!response.ok) throw new Error('Failed to fetch products');
-        
-        const data = await response.json();
-        setProducts(data.products || []);
+
+        const data: PartitionIndex = await response.json();
+        if (data.version !== lastVersion.current) {
+          lastVersion.current = data.version;
+          // First paint needs only the newest month's last page
+          setProducts(data.latest ? await fetchPage(data.latest) : []);
+          setIndex(data);
+          setPagesShown(1);
+        }
+        setError('');
       } catch (err) {
         setError('Failed to load products');
-        setProducts([]);
       } finally {
         setLoading(false);
       }
     };
 
     fetchProducts();
-    
+
     // Refresh every 30 seconds
     const interval = setInterval(fetchProducts, 30000);
     return () => clearInterval(interval);
   }, []);
 
-  const totalProducts = products.length;
-  const totalArtisans = new Set(products.map(p => p.id.slice(0, 8))).size;
+  const loadMore = async () => {
+    if (!index) return;
+    try {
+      const older = await fetchPage(monthPages(index)[pagesShown]);
+      setProducts(shown => [...shown, ...older]);
+      setPagesShown(pagesShown + 1);
+    } catch (err) {
+      setError('Failed to load products');
+    }
+  };
+
+  const totalProducts = index ? index.total : products.length;
+  const totalArtisans = index ? index.artisans : 0;
+  const hasMore = index !== null && pagesShown < monthPages(index).length;
 
   if (loading) {
     return (
@@ -103,6 +154,16 @@ export default function Home() {
                 </Link>
               ))}
             </div>
+            {hasMore && (
+              <div className="text-center mt-8">
+                <button
+                  onClick={loadMore}
+                  className="bg-orange-100 text-orange-800 px-6 py-2 rounded-full font-semibold hover:bg-orange-200 transition-colors"
+                >
+                  Load more
+                </button>
+              </div>
+            )}
           </div>
         ) : (
           <div className="bg-yellow-50 p-8 rounded-lg text-center mb-8">